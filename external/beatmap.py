@@ -24,53 +24,101 @@
 #
 # For more information, please refer to <http://unlicense.org/>
 
+import collections
 import collections.abc
-import json
 import os
+import struct
 
-import pydantic
-
+import npps4.beatmap
 import npps4.config.config
 
-from typing import Literal
+BEATMAP_DIR = os.path.join(npps4.config.config.ROOT_DIR, "beatmaps")
+# Optional packed beatmaps created by `scripts/compile_beatmaps.py`. It's memory-mapped so server workers share it
+# and it's used as long as the beatmap file is unchanged (or removed) since the packed beatmaps is created.
+PACK_FILE = os.path.join(BEATMAP_DIR, "beatmaps.pack")
+
+
+# Implementation must return an object that has the attributes of `npps4.beatmap.Note` in their classes.
+BeatmapData = npps4.beatmap.Note
+
+# Recently used beatmaps, keyed by "livejson", with the mtime of the beatmap file.
+_cache: collections.OrderedDict[str, tuple[int | None, list[BeatmapData]]] = collections.OrderedDict()
+_pack: npps4.beatmap.PackedBeatmaps | None = None
 
 
-# Implementation must return an object that has these attributes in their classes.
-class BeatmapData(pydantic.BaseModel):
-    timing_sec: float
-    notes_attribute: int
-    notes_level: int
-    effect: int
-    effect_value: float
-    position: int
-    speed: float = 1.0  # Beatmap speed multipler
-    vanish: Literal[0, 1, 2] = 0  # 0 = Normal; 1 = Note hidden as it approaches; 2 = Note shows just before its timing.
+def _close_pack():
+    global _pack
+
+    if _pack is not None:
+        _pack.close()
+        _pack = None
+
+
+def _get_pack():
+    global _pack
+
+    try:
+        mtime_ns = os.stat(PACK_FILE).st_mtime_ns
+    except OSError:
+        _close_pack()
+        return None
+
+    if _pack is None or _pack.mtime_ns != mtime_ns:
+        # Unmap the old packed beatmaps so its pages aren't kept alive.
+        _close_pack()
+        try:
+            _pack = npps4.beatmap.PackedBeatmaps(PACK_FILE)
+        except (OSError, ValueError, struct.error):
+            pass
+
+    return _pack
+
+
+def _load_packed(livejson: str, mtime_ns: int | None):
+    pack = _get_pack()
+    if pack is None:
+        return None
+
+    packed = pack.get(livejson)
+    if packed is None or (mtime_ns is not None and packed[0] != mtime_ns):
+        return None
+
+    # Already validated when the packed beatmaps is created.
+    return [BeatmapData.model_construct(**dict(zip(npps4.beatmap.NOTE_FIELDS, note))) for note in packed[1]]
 
 
 # Beatmap provider file must define "get_beatmap_data" async function with these parameters:
 # * "livejson" (str) of the beatmap as in their live_setting_m
 # * "context" (npps4.idol.BasicSchoolIdolContext) to access the database.
 #
-# It then returns an iterable of BeatmapData above or None if the beatmap is not found:
+# It then returns an iterable of BeatmapData above or None if the beatmap is not found.
+# The returned iterable may be shared between calls, so it must not be modified.
 async def get_beatmap_data(livejson: str, context) -> collections.abc.Iterable[BeatmapData] | None:
+    path = os.path.join(BEATMAP_DIR, livejson)
     try:
-        with open(os.path.join(npps4.config.config.ROOT_DIR, "beatmaps", livejson), "r", encoding="UTF-8") as f:
-            jsondata = f.read()
-    except IOError:
-        return None
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        mtime_ns = None
 
-    try:
-        jsondata = json.loads(jsondata)
-    except json.JSONDecodeError:
-        return None
+    cached = _cache.get(livejson)
+    if cached is not None and cached[0] == mtime_ns:
+        _cache.move_to_end(livejson)
+        return cached[1]
 
-    result: list[BeatmapData] = []
-    try:
-        for jdata in jsondata:
-            beatmap = BeatmapData.model_validate(jdata)
-            result.append(beatmap)
-    except pydantic.ValidationError:
-        return None
+    result = _load_packed(livejson, mtime_ns)
+    if result is None:
+        if mtime_ns is None:
+            return None
+
+        result = npps4.beatmap.load_json(path)
+        if result is None:
+            return None
+
+    cache_size = npps4.config.config.get_beatmap_cache_size()
+    if cache_size > 0:
+        _cache[livejson] = (mtime_ns, result)
+        while len(_cache) > cache_size:
+            _cache.popitem(last=False)
 
     return result
 
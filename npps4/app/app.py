@@ -1,3 +1,5 @@
+import collections.abc
+import contextlib
 import os
 import traceback
 import urllib.parse
@@ -14,7 +16,39 @@ from .. import util
 from .. import version
 from ..config import config
 
-core = fastapi.FastAPI(title="NPPS4", version="%d.%d.%d" % version.NPPS4_VERSION, docs_url="/main.php/api")
+from typing import Callable
+
+_STARTUP_HOOKS: list[Callable[[], collections.abc.Awaitable[None]]] = []
+_SHUTDOWN_HOOKS: list[Callable[[], collections.abc.Awaitable[None]]] = []
+
+
+@contextlib.asynccontextmanager
+async def _lifespan(_: fastapi.FastAPI):
+    for hook in _STARTUP_HOOKS:
+        await hook()
+
+    try:
+        yield
+    finally:
+        for hook in reversed(_SHUTDOWN_HOOKS):
+            await hook()
+
+
+def on_startup(f: Callable[[], collections.abc.Awaitable[None]]):
+    """Register function to be called when the server worker starts."""
+    _STARTUP_HOOKS.append(f)
+    return f
+
+
+def on_shutdown(f: Callable[[], collections.abc.Awaitable[None]]):
+    """Register function to be called when the server worker stops."""
+    _SHUTDOWN_HOOKS.append(f)
+    return f
+
+
+core = fastapi.FastAPI(
+    title="NPPS4", version="%d.%d.%d" % version.NPPS4_VERSION, docs_url="/main.php/api", lifespan=_lifespan
+)
 main = fastapi.APIRouter(prefix="/main.php")
 webview = fastapi.APIRouter(prefix="/webview.php", default_response_class=fastapi.responses.HTMLResponse)
 templates = fastapi.templating.Jinja2Templates(os.path.join(config.ROOT_DIR, "templates"))
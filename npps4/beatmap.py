@@ -0,0 +1,118 @@
+import collections.abc
+import mmap
+import os
+import struct
+
+import pydantic
+
+from .config import cfgtype
+
+from typing import Literal
+
+# Packed beatmap file layout, all little-endian:
+# * Header: magic, amount of beatmaps.
+# * Index, for each beatmap: name length, UTF-8 name, source file mtime (ns), notes offset, amount of notes.
+# * Notes, as contiguous array of NOTE structure.
+MAGIC = b"NPPS4BM1"
+HEADER = struct.Struct("<8sI")
+INDEX_ENTRY = struct.Struct("<qQI")
+NOTE = struct.Struct("<diiididB")
+NOTE_FIELDS = (
+    "timing_sec",
+    "notes_attribute",
+    "notes_level",
+    "effect",
+    "effect_value",
+    "position",
+    "speed",
+    "vanish",
+)
+
+
+class Note(pydantic.BaseModel):
+    """Note of beatmap JSON file, as read by the default beatmap provider."""
+
+    timing_sec: float
+    notes_attribute: int
+    notes_level: int
+    effect: int
+    effect_value: float
+    position: int
+    speed: float = 1.0  # Beatmap speed multipler
+    vanish: Literal[0, 1, 2] = 0  # 0 = Normal; 1 = Note hidden as it approaches; 2 = Note shows just before its timing.
+
+
+_note_list_adapter = pydantic.TypeAdapter(list[Note])
+
+
+def load_json(path: str):
+    """Load and validate beatmap JSON file. Returns None if it's invalid."""
+    try:
+        with open(path, "rb") as f:
+            return _note_list_adapter.validate_json(f.read())
+    except (IOError, pydantic.ValidationError):
+        return None
+
+
+class PackedBeatmaps:
+    """Memory-mapped packed beatmap file. The pages are shared between all server workers."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            self.data.close()
+            raise ValueError(f"'{path}' is not a packed beatmap file")
+
+        self.index: dict[str, tuple[int, int, int]] = {}
+        pos = HEADER.size
+        # Slicing memoryview doesn't copy. It must be released before the mmap can be closed.
+        with memoryview(self.data) as view:
+            for _ in range(count):
+                (name_length,) = struct.unpack_from("<H", view, pos)
+                pos = pos + 2
+                name = str(view[pos : pos + name_length], "UTF-8")
+                pos = pos + name_length
+                self.index[name] = INDEX_ENTRY.unpack_from(view, pos)
+                pos = pos + INDEX_ENTRY.size
+
+    def get(self, name: str):
+        """Get source file mtime and note tuples (in `NOTE_FIELDS` order) of a beatmap."""
+        entry = self.index.get(name)
+        if entry is None:
+            return None
+
+        mtime_ns, offset, count = entry
+        with memoryview(self.data) as view:
+            return mtime_ns, list(NOTE.iter_unpack(view[offset : offset + count * NOTE.size]))
+
+    def close(self):
+        self.data.close()
+
+
+def write_pack(
+    path: str, beatmaps: collections.abc.Iterable[tuple[str, int, collections.abc.Sequence[cfgtype.BeatmapData]]]
+):
+    """Write packed beatmap file from (name, source file mtime in ns, notes) tuples."""
+    beatmaps = list(beatmaps)
+    index_size = sum(2 + len(name.encode("UTF-8")) + INDEX_ENTRY.size for name, _, _ in beatmaps)
+    offset = HEADER.size + index_size
+
+    with open(path + ".tmp", "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(beatmaps)))
+        for name, mtime_ns, notes in beatmaps:
+            encoded_name = name.encode("UTF-8")
+            f.write(struct.pack("<H", len(encoded_name)))
+            f.write(encoded_name)
+            f.write(INDEX_ENTRY.pack(mtime_ns, offset, len(notes)))
+            offset = offset + len(notes) * NOTE.size
+
+        for _, _, notes in beatmaps:
+            for note in notes:
+                f.write(NOTE.pack(*(getattr(note, field) for field in NOTE_FIELDS)))
+
+    # Replace atomically so workers that still map the old file keep working.
+    os.replace(path + ".tmp", path)
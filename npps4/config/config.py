@@ -234,3 +234,88 @@ def is_account_export_enabled():
 def store_backup_of_notes_list():
     global CONFIG_DATA
     return CONFIG_DATA.main.save_notes_list
+
+
+def is_master_data_preloaded():
+    global CONFIG_DATA
+    return CONFIG_DATA.performance.preload_master_data
+
+
+def get_master_db_pool_size():
+    global CONFIG_DATA
+    return CONFIG_DATA.performance.master_db_pool_size
+
+
+def get_master_db_mmap_size():
+    global CONFIG_DATA
+    return CONFIG_DATA.performance.master_db_mmap_size
+
+
+def get_signing_threads():
+    global CONFIG_DATA
+    return CONFIG_DATA.performance.signing_threads
+
+
+def get_signature_cache_size():
+    global CONFIG_DATA
+    return CONFIG_DATA.performance.signature_cache_size
+
+
+def get_replay_cache_backend():
+    global CONFIG_DATA
+    return CONFIG_DATA.performance.replay_cache
+
+
+def get_replay_cache_memory():
+    global CONFIG_DATA
+    return CONFIG_DATA.performance.replay_cache_memory
+
+
+def get_replay_cache_ttl():
+    global CONFIG_DATA
+    return CONFIG_DATA.performance.replay_cache_ttl
+
+
+def get_replay_cache_flush_interval():
+    global CONFIG_DATA
+    return CONFIG_DATA.performance.replay_cache_flush_interval
+
+
+def get_session_cache_interval():
+    global CONFIG_DATA
+    return CONFIG_DATA.performance.session_cache_interval
+
+
+def get_metrics_snapshot_interval():
+    global CONFIG_DATA
+    return CONFIG_DATA.performance.metrics_snapshot_interval
+
+
+def is_metrics_endpoint_enabled():
+    global CONFIG_DATA
+    return CONFIG_DATA.performance.metrics_endpoint
+
+
+def get_beatmap_cache_size():
+    global CONFIG_DATA
+    return CONFIG_DATA.performance.beatmap_cache_size
+
+
+def get_leaderboard_cache_size():
+    global CONFIG_DATA
+    return CONFIG_DATA.performance.leaderboard_cache_size
+
+
+def get_leaderboard_refresh_interval():
+    global CONFIG_DATA
+    return CONFIG_DATA.performance.leaderboard_refresh_interval
+
+
+def get_center_unit_cache_ttl():
+    global CONFIG_DATA
+    return CONFIG_DATA.performance.center_unit_cache_ttl
+
+
+def get_maintenance_interval():
+    global CONFIG_DATA
+    return CONFIG_DATA.performance.maintenance_interval
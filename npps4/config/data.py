@@ -5,7 +5,7 @@ import re
 import pydantic
 import pydantic_settings
 
-from typing import Annotated
+from typing import Annotated, Literal
 
 _VERSION_TEST = re.compile(r"^\d+\.\d+$")
 
@@ -141,6 +141,62 @@ class _Gameplay(pydantic.BaseModel):
     ] = 1
 
 
+class _Performance(pydantic.BaseModel):
+    preload_master_data: Annotated[
+        bool, pydantic.Field(validation_alias=pydantic.AliasChoices("preload_master_data", "preload"))
+    ] = True
+    master_db_pool_size: Annotated[
+        int, pydantic.Field(validation_alias=pydantic.AliasChoices("master_db_pool_size", "masterdbpool"))
+    ] = 5
+    master_db_mmap_size: Annotated[
+        int, pydantic.Field(validation_alias=pydantic.AliasChoices("master_db_mmap_size", "masterdbmmap"))
+    ] = 67108864
+    signing_threads: Annotated[
+        int, pydantic.Field(validation_alias=pydantic.AliasChoices("signing_threads", "signthreads"))
+    ] = 2
+    signature_cache_size: Annotated[
+        int, pydantic.Field(validation_alias=pydantic.AliasChoices("signature_cache_size", "sigcache"))
+    ] = 256
+    replay_cache: Annotated[
+        Literal["none", "memory", "sql"],
+        pydantic.Field(validation_alias=pydantic.AliasChoices("replay_cache", "replaycache")),
+    ] = "memory"
+    replay_cache_memory: Annotated[
+        int, pydantic.Field(validation_alias=pydantic.AliasChoices("replay_cache_memory", "replaycachemem"))
+    ] = 33554432
+    replay_cache_ttl: Annotated[
+        int, pydantic.Field(validation_alias=pydantic.AliasChoices("replay_cache_ttl", "replaycachettl"))
+    ] = 300
+    replay_cache_flush_interval: Annotated[
+        float, pydantic.Field(validation_alias=pydantic.AliasChoices("replay_cache_flush_interval", "replaycacheflush"))
+    ] = 2
+    session_cache_interval: Annotated[
+        int, pydantic.Field(validation_alias=pydantic.AliasChoices("session_cache_interval", "sessioncache"))
+    ] = 15
+    metrics_snapshot_interval: Annotated[
+        int, pydantic.Field(validation_alias=pydantic.AliasChoices("metrics_snapshot_interval", "metricsinterval"))
+    ] = 30
+    metrics_endpoint: Annotated[
+        bool, pydantic.Field(validation_alias=pydantic.AliasChoices("metrics_endpoint", "metricsendpoint"))
+    ] = False
+    beatmap_cache_size: Annotated[
+        int, pydantic.Field(validation_alias=pydantic.AliasChoices("beatmap_cache_size", "beatmapcache"))
+    ] = 128
+    leaderboard_cache_size: Annotated[
+        int, pydantic.Field(validation_alias=pydantic.AliasChoices("leaderboard_cache_size", "leaderboardcache"))
+    ] = 64
+    leaderboard_refresh_interval: Annotated[
+        int,
+        pydantic.Field(validation_alias=pydantic.AliasChoices("leaderboard_refresh_interval", "leaderboardrefresh")),
+    ] = 60
+    center_unit_cache_ttl: Annotated[
+        int, pydantic.Field(validation_alias=pydantic.AliasChoices("center_unit_cache_ttl", "centerunitcache"))
+    ] = 10
+    maintenance_interval: Annotated[
+        int, pydantic.Field(validation_alias=pydantic.AliasChoices("maintenance_interval", "maintenanceinterval"))
+    ] = 300
+
+
 class ConfigData(pydantic_settings.BaseSettings):
     model_config = pydantic_settings.SettingsConfigDict(
         env_prefix="NPPS4_CONFIG_",
@@ -156,6 +212,7 @@ class ConfigData(pydantic_settings.BaseSettings):
     gameplay: _Gameplay = pydantic.Field(default_factory=_Gameplay)
     advanced: _Advanced = pydantic.Field(default_factory=_Advanced)
     iex: _ImportExport = pydantic.Field(default_factory=_ImportExport)
+    performance: _Performance = pydantic.Field(default_factory=_Performance)
 
     @classmethod
     def settings_customise_sources(
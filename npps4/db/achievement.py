@@ -1,7 +1,6 @@
 import sqlalchemy
 import sqlalchemy.ext.asyncio
 import sqlalchemy.orm
-import sqlalchemy.pool
 
 from . import common
 from ..download import download
@@ -182,11 +181,7 @@ class UnitTypeGroup(common.GameDBBase):
     __table_args__ = (sqlalchemy.PrimaryKeyConstraint(achievement_unit_type_group_id, unit_type_id),)
 
 
-engine = sqlalchemy.ext.asyncio.create_async_engine(
-    f"sqlite+aiosqlite:///file:{download.get_db_path('achievement')}?mode=ro&uri=true",
-    poolclass=sqlalchemy.pool.NullPool,
-    connect_args={"check_same_thread": False},
-)
+engine = common.create_master_engine(download.get_db_path("achievement"))
 sessionmaker = sqlalchemy.ext.asyncio.async_sessionmaker(engine)
 
 
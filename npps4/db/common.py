@@ -1,12 +1,19 @@
+import os
 import re
 
 import sqlalchemy
+import sqlalchemy.engine.interfaces
+import sqlalchemy.event
+import sqlalchemy.ext.asyncio
 import sqlalchemy.orm
+import sqlalchemy.pool
 import sqlalchemy.dialects.postgresql
 import sqlalchemy.dialects.mysql
 import sqlalchemy.dialects.oracle
 import sqlalchemy.dialects.sqlite
 
+from ..config import config
+
 IDInteger = sqlalchemy.BigInteger().with_variant(sqlalchemy.dialects.sqlite.INTEGER(), "sqlite")
 
 
@@ -64,3 +71,45 @@ class Base(sqlalchemy.orm.MappedAsDataclass, sqlalchemy.orm.DeclarativeBase):
 class MaybeEncrypted:
     release_tag: sqlalchemy.orm.Mapped[str | None] = sqlalchemy.orm.mapped_column()
     _encryption_release_id: sqlalchemy.orm.Mapped[int | None] = sqlalchemy.orm.mapped_column()
+
+
+def create_master_engine(path: str):
+    """Create engine for read-only master data database (the `.db_` files)."""
+    pool_size = config.get_master_db_pool_size()
+
+    if pool_size <= 0:
+        # Open new connection every time a session needs it.
+        return sqlalchemy.ext.asyncio.create_async_engine(
+            f"sqlite+aiosqlite:///file:{path}?mode=ro&uri=true",
+            poolclass=sqlalchemy.pool.NullPool,
+            connect_args={"check_same_thread": False},
+        )
+
+    # The master databases never change while the server is running, so tell SQLite to skip file locking and
+    # change detection altogether and keep the connections open for the whole worker lifetime.
+    engine = sqlalchemy.ext.asyncio.create_async_engine(
+        f"sqlite+aiosqlite:///file:{path}?mode=ro&immutable=1&uri=true",
+        poolclass=sqlalchemy.pool.AsyncAdaptedQueuePool,
+        pool_size=pool_size,
+        max_overflow=pool_size,
+        pool_recycle=-1,
+        connect_args={"check_same_thread": False},
+    )
+    mmap_size = config.get_master_db_mmap_size()
+
+    @sqlalchemy.event.listens_for(engine.sync_engine, "connect")
+    def _set_master_db_pragma(
+        dbapi_connection: sqlalchemy.engine.interfaces.DBAPIConnection,
+        connection_record: sqlalchemy.pool.ConnectionPoolEntry,
+    ):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA query_only=1")
+        if mmap_size > 0:
+            cursor.execute(f"PRAGMA mmap_size={mmap_size}")
+        cursor.close()
+
+    if hasattr(os, "register_at_fork"):
+        # Pooled connections must not be shared with forked worker processes (e.g. gunicorn --preload).
+        os.register_at_fork(after_in_child=lambda: engine.sync_engine.dispose(close=False))
+
+    return engine
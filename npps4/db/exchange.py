@@ -1,7 +1,6 @@
 import sqlalchemy
 import sqlalchemy.ext.asyncio
 import sqlalchemy.orm
-import sqlalchemy.pool
 
 from . import common
 from ..download import download
@@ -74,11 +73,7 @@ class ExchangePoint(common.GameDBBase, common.MaybeEncrypted):
     end_date: sqlalchemy.orm.Mapped[str] = sqlalchemy.orm.mapped_column()
 
 
-engine = sqlalchemy.ext.asyncio.create_async_engine(
-    f"sqlite+aiosqlite:///file:{download.get_db_path('exchange')}?mode=ro&uri=true",
-    poolclass=sqlalchemy.pool.NullPool,
-    connect_args={"check_same_thread": False},
-)
+engine = common.create_master_engine(download.get_db_path("exchange"))
 sessionmaker = sqlalchemy.ext.asyncio.async_sessionmaker(engine)
 
 
@@ -1,7 +1,6 @@
 import sqlalchemy
 import sqlalchemy.ext.asyncio
 import sqlalchemy.orm
-import sqlalchemy.pool
 
 from . import common
 from ..download import download
@@ -209,11 +208,7 @@ def load_client_setting():
 
 GAME_SETTING, STRINGS = load_client_setting()
 
-engine = sqlalchemy.ext.asyncio.create_async_engine(
-    f"sqlite+aiosqlite:///file:{game_mater}?mode=ro&uri=true",
-    poolclass=sqlalchemy.pool.NullPool,
-    connect_args={"check_same_thread": False},
-)
+engine = common.create_master_engine(game_mater)
 sessionmaker = sqlalchemy.ext.asyncio.async_sessionmaker(engine)
 
 
@@ -1,7 +1,6 @@
 import sqlalchemy
 import sqlalchemy.ext.asyncio
 import sqlalchemy.orm
-import sqlalchemy.pool
 
 from . import common
 from ..download import download
@@ -411,11 +410,7 @@ class Memories(common.GameDBBase, common.MaybeEncrypted):
     background_flash_param_id: sqlalchemy.orm.Mapped[int | None] = sqlalchemy.orm.mapped_column()
 
 
-engine = sqlalchemy.ext.asyncio.create_async_engine(
-    f"sqlite+aiosqlite:///file:{download.get_db_path('item')}?mode=ro&uri=true",
-    poolclass=sqlalchemy.pool.NullPool,
-    connect_args={"check_same_thread": False},
-)
+engine = common.create_master_engine(download.get_db_path("item"))
 sessionmaker = sqlalchemy.ext.asyncio.async_sessionmaker(engine)
 
 
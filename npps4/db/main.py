@@ -98,6 +98,8 @@ class RequestCache(common.Base, kw_only=True):
     endpoint: sqlalchemy.orm.Mapped[str] = sqlalchemy.orm.mapped_column()
     nonce: sqlalchemy.orm.Mapped[int] = sqlalchemy.orm.mapped_column(common.IDInteger, index=True)
     response: sqlalchemy.orm.Mapped[bytes] = sqlalchemy.orm.mapped_column()
+    token: sqlalchemy.orm.Mapped[str | None] = sqlalchemy.orm.mapped_column()  # Session token of the request
+    expire_date: sqlalchemy.orm.Mapped[int] = sqlalchemy.orm.mapped_column(common.IDInteger, index=True)
 
     __table_args__ = (sqlalchemy.UniqueConstraint(user_id, nonce),)
 
@@ -255,6 +257,13 @@ class Incentive(common.Base, kw_only=True):
     unit_rarity: sqlalchemy.orm.Mapped[int | None] = sqlalchemy.orm.mapped_column(default=None, index=True)
     unit_attribute: sqlalchemy.orm.Mapped[int | None] = sqlalchemy.orm.mapped_column(default=None, index=True)
 
+    __table_args__ = (
+        # Present box orderings. Expiry date ordering uses the last index in both directions.
+        sqlalchemy.Index("ix_incentive_presentbox_insert_desc", user_id, insert_date.desc(), id.desc()),
+        sqlalchemy.Index("ix_incentive_presentbox_insert_asc", user_id, insert_date.asc(), id.desc()),
+        sqlalchemy.Index("ix_incentive_presentbox_expire", user_id, expire_date, id),
+    )
+
     def get_message(self, language: idoltype.Language = idoltype.Language.en):
         if language == idoltype.Language.jp:
             return self.message_jp
@@ -295,7 +304,11 @@ class LiveClear(common.Base, kw_only=True):
     hi_combo_cnt: sqlalchemy.orm.Mapped[int] = sqlalchemy.orm.mapped_column(common.IDInteger, default=0)
     clear_cnt: sqlalchemy.orm.Mapped[int] = sqlalchemy.orm.mapped_column(common.IDInteger, default=0, index=True)
 
-    __table_args__ = (sqlalchemy.UniqueConstraint(user_id, live_difficulty_id),)
+    __table_args__ = (
+        sqlalchemy.UniqueConstraint(user_id, live_difficulty_id),
+        # Covers live show leaderboard query.
+        sqlalchemy.Index("ix_live_clear_leaderboard", live_difficulty_id, hi_score, user_id, clear_cnt),
+    )
 
 
 class MuseumUnlock(common.Base, kw_only=True):
@@ -344,6 +357,10 @@ class LiveInProgress(common.Base, kw_only=True):
     lp_factor: sqlalchemy.orm.Mapped[int] = sqlalchemy.orm.mapped_column()
     unit_deck_id: sqlalchemy.orm.Mapped[int] = sqlalchemy.orm.mapped_column()
     deck_data: sqlalchemy.orm.Mapped[bytes] = sqlalchemy.orm.mapped_column()  # JSON-encoded LiveDeckInfo
+    # Beatmap played, so the live show can be finished without reloading the beatmap.
+    notes_count: sqlalchemy.orm.Mapped[int] = sqlalchemy.orm.mapped_column(default=0)
+    notes_crc32: sqlalchemy.orm.Mapped[int] = sqlalchemy.orm.mapped_column(common.IDInteger, default=0)
+    notes_sha256: sqlalchemy.orm.Mapped[bytes] = sqlalchemy.orm.mapped_column(default=b"")  # Empty if unknown
 
 
 class Item(common.Base, kw_only=True):
@@ -461,9 +478,31 @@ class PlayerRanking(common.Base, kw_only=True):
     __table_args__ = (
         sqlalchemy.UniqueConstraint(user_id, day),
         sqlalchemy.Index(None, user_id.asc(), day.desc(), score.desc()),
+        # Covers daily leaderboard query.
+        sqlalchemy.Index("ix_player_ranking_leaderboard", day, score, user_id),
     )
 
 
+class UserCounter(common.Base, kw_only=True):
+    """Contain per-user counters, such as incrementally-maintained aggregate counts.
+
+    Missing row means the counter hasn't been computed yet."""
+
+    user_id: sqlalchemy.orm.Mapped[int] = sqlalchemy.orm.mapped_column(
+        common.IDInteger, sqlalchemy.ForeignKey(User.id), primary_key=True
+    )
+    name: sqlalchemy.orm.Mapped[str] = sqlalchemy.orm.mapped_column(primary_key=True)
+    value: sqlalchemy.orm.Mapped[int] = sqlalchemy.orm.mapped_column(common.IDInteger, default=0)
+
+
+class MaintenanceLease(common.Base, kw_only=True):
+    """Elects single server process that runs the periodic maintenance."""
+
+    name: sqlalchemy.orm.Mapped[str] = sqlalchemy.orm.mapped_column(primary_key=True)
+    owner: sqlalchemy.orm.Mapped[str] = sqlalchemy.orm.mapped_column()
+    expire_date: sqlalchemy.orm.Mapped[int] = sqlalchemy.orm.mapped_column(common.IDInteger)
+
+
 class MigrationFixes(common.Base, kw_only=True):
     revision: sqlalchemy.orm.Mapped[str] = sqlalchemy.orm.mapped_column(primary_key=True)
 
@@ -55,14 +55,14 @@ def sort_by_unit_id(data: AlbumInfo):
     return data.unit_id
 
 
-@idol.register("album", "albumAll")
+@idol.register("album", "albumAll", side_effect_free=True)
 async def album_albumall(context: idol.SchoolIdolUserParams) -> AlbumAllResponse:
     current_user = await user.get_current(context)
     all_album = await album.all(context, current_user)
     return AlbumAllResponse.model_validate([album_to_response(a) for a in all_album])
 
 
-@idol.register("album", "seriesAll")
+@idol.register("album", "seriesAll", side_effect_free=True)
 async def album_seriesall(context: idol.SchoolIdolUserParams) -> AlbumSeriesAllResponse:
     current_user = await user.get_current(context)
     all_album = await album.all(context, current_user)
@@ -21,7 +21,7 @@ class AwardSetRequest(pydantic.BaseModel):
     award_id: int
 
 
-@idol.register("award", "awardInfo")
+@idol.register("award", "awardInfo", side_effect_free=True)
 async def award_awardinfo(context: idol.SchoolIdolUserParams) -> AwardInfoResponse:
     current_user = await user.get_current(context)
     awards = await award.get_awards(context, current_user)
@@ -21,7 +21,7 @@ class BackgroundSetRequest(pydantic.BaseModel):
     background_id: int
 
 
-@idol.register("background", "backgroundInfo")
+@idol.register("background", "backgroundInfo", side_effect_free=True)
 async def background_backgroundinfo(context: idol.SchoolIdolUserParams) -> BackgroundInfoResponse:
     current_user = await user.get_current(context)
     backgrounds = await background.get_backgrounds(context, current_user)
@@ -8,7 +8,7 @@ class CustomeListResponse(pydantic.BaseModel):
     costume_list: list
 
 
-@idol.register("costume", "costumeList")
+@idol.register("costume", "costumeList", side_effect_free=True)
 async def costume_costumelist(context: idol.SchoolIdolUserParams) -> CustomeListResponse:
     # TODO
     util.stub("costume", "costumeList", context.raw_request_data)
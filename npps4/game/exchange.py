@@ -56,7 +56,7 @@ class ExchangeUsePointResponse(common.TimestampMixin, user.UserDiffMixin):
     """Amount of items in present box."""
 
 
-@idol.register("exchange", "owningPoint")
+@idol.register("exchange", "owningPoint", side_effect_free=True)
 async def exchange_owningpoint(context: idol.SchoolIdolUserParams) -> ExchangePointResponse:
     return ExchangePointResponse(
         exchange_point_list=await exchange.get_exchange_points_response(context, await user.get_current(context))
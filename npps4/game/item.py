@@ -36,7 +36,7 @@ class ItemListResponse(pydantic.BaseModel):
     )
 
 
-@idol.register("item", "list")
+@idol.register("item", "list", side_effect_free=True)
 async def item_list(context: idol.SchoolIdolUserParams) -> ItemListResponse:
     current_user = await user.get_current(context=context)
     general_item_list, buff_item_list, reinforce_item_list = await item.get_item_list(context, current_user)
@@ -1,3 +1,4 @@
+import asyncio
 import copy
 import itertools
 import json
@@ -9,6 +10,8 @@ from .. import const
 from .. import idol
 from .. import util
 from ..config import config
+from ..db import main
+from ..idol import serializer
 from ..system import achievement
 from ..system import advanced
 from ..system import class_system as class_system_module
@@ -174,10 +177,9 @@ class LivePreciseScoreRequest(pydantic.BaseModel):
     live_difficulty_id: int
 
 
-class LivePreciseScoreResponse(common.TimestampMixin):
+class LivePreciseScoreResponse(common.TimestampMixin, serializer.SplicedModel):
     rank_info: list[LivePlayRankInfo]
-    on: dict[str, Any]  # TODO: Use LivePreciseScore(WithData)
-    off: dict[str, Any]  # TODO: Use LivePreciseScore(WithData)
+    # "on" and "off" are spliced as pre-encoded JSON. TODO: Use LivePreciseScore(WithData)
     can_activate_effect: bool = False
 
 
@@ -315,7 +317,7 @@ class LiveRewardResponse(achievement.AchievementMixin, common.TimestampMixin, us
     present_cnt: int
 
 
-@idol.register("live", "liveStatus")
+@idol.register("live", "liveStatus", side_effect_free=True)
 async def live_livestatus(context: idol.SchoolIdolUserParams) -> LiveStatusResponse:
     current_user = await user.get_current(context)
     return LiveStatusResponse(
@@ -328,7 +330,7 @@ async def live_livestatus(context: idol.SchoolIdolUserParams) -> LiveStatusRespo
     )
 
 
-@idol.register("live", "schedule")
+@idol.register("live", "schedule", side_effect_free=True)
 async def live_schedule(context: idol.SchoolIdolUserParams) -> LiveScheduleResponse:
     ts = util.time()
     special_live_rotation = await live.get_special_live_rotation_difficulty_id(context)
@@ -392,10 +394,9 @@ async def live_partylist(context: idol.SchoolIdolUserParams, request: LivePartyL
     if beatmap_data is None:
         raise idol.error.by_code(idol.error.ERROR_CODE_LIVE_NOTES_LIST_NOT_FOUND)
 
-    party_list = [
-        await advanced.get_user_guest_party_info(context, u)
-        for u in await advanced.get_random_user_for_partylist(context, current_user)
-    ]
+    party_list = await advanced.get_user_guest_party_info_many(
+        context, await advanced.get_random_user_for_partylist(context, current_user)
+    )
 
     # DEBUG live score
     if DEBUG_SERVER_SCORE_CALCULATE:
@@ -427,6 +428,32 @@ async def live_partylist(context: idol.SchoolIdolUserParams, request: LivePartyL
     )
 
 
+async def _pull_precise_score(
+    context: idol.SchoolIdolUserParams, current_user: main.User, live_difficulty_id: int, use_skill: bool
+):
+    # Each replay is pulled using its own database session so both can be pulled concurrently.
+    async with context.fork() as forked_context:
+        return await live.pull_precise_score_json(forked_context, current_user, live_difficulty_id, use_skill)
+
+
+def _encode_precise_score(live_info_json: bytes, record: tuple[bytes, bytes, int] | None):
+    if record is None:
+        return serializer.encode_object(
+            [("has_record", b"false"), ("can_replay", b"false"), ("live_info", live_info_json)]
+        )
+
+    precise_log_json, notes_list_json, timestamp = record
+    return serializer.encode_object(
+        [
+            ("has_record", b"true"),
+            ("can_replay", b"true"),
+            ("live_info", serializer.encode_object([("notes_list", notes_list_json)], live_info_json)),
+            ("update_date", serializer.dumps(util.timestamp_to_datetime(timestamp))),
+        ],
+        precise_log_json,
+    )
+
+
 @idol.register("live", "preciseScore")
 async def live_precisescore(
     context: idol.SchoolIdolUserParams, request: LivePreciseScoreRequest
@@ -438,39 +465,16 @@ async def live_precisescore(
         raise idol.error.by_code(idol.error.ERROR_CODE_LIVE_NOT_FOUND)
     live_info = await live.get_live_info_without_notes(context, request.live_difficulty_id, live_setting)
 
-    with_skill_record = await live.pull_precise_score_with_beatmap(
-        context, current_user, request.live_difficulty_id, True
-    )
-    without_skill_record = await live.pull_precise_score_with_beatmap(
-        context, current_user, request.live_difficulty_id, False
+    with_skill_record, without_skill_record = await asyncio.gather(
+        _pull_precise_score(context, current_user, request.live_difficulty_id, True),
+        _pull_precise_score(context, current_user, request.live_difficulty_id, False),
     )
 
     if with_skill_record is None and without_skill_record is None:
         raise idol.error.by_code(idol.error.ERROR_CODE_LIVE_PRECISE_LIST_NOT_FOUND)
 
-    if with_skill_record is None:
-        on_dict = {"has_record": False, "can_replay": False, "live_info": live_info.model_dump(mode="json")}
-    else:
-        live_info_json = live_info.model_dump()
-        live_info_json["notes_list"] = live.NotesListRoot(with_skill_record[1]).model_dump()
-        on_dict = with_skill_record[0]
-        on_dict["has_record"] = True
-        on_dict["can_replay"] = True
-        on_dict["live_info"] = live_info_json
-        on_dict["update_date"] = util.timestamp_to_datetime(with_skill_record[2])
-
-    if without_skill_record is None:
-        off_dict = {"has_record": False, "can_replay": False, "live_info": live_info.model_dump(mode="json")}
-    else:
-        live_info_json = live_info.model_dump()
-        live_info_json["notes_list"] = live.NotesListRoot(without_skill_record[1]).model_dump()
-        off_dict = without_skill_record[0]
-        off_dict["has_record"] = True
-        off_dict["can_replay"] = True
-        off_dict["live_info"] = live_info_json
-        off_dict["update_date"] = util.timestamp_to_datetime(without_skill_record[2])
-
-    return LivePreciseScoreResponse(
+    live_info_json = serializer.encode_model(live_info)
+    response = LivePreciseScoreResponse(
         rank_info=[
             LivePlayRankInfo(rank=5, rank_min=0, rank_max=live_setting.c_rank_score - 1),
             LivePlayRankInfo(rank=4, rank_min=live_setting.c_rank_score, rank_max=live_setting.b_rank_score - 1),
@@ -478,10 +482,11 @@ async def live_precisescore(
             LivePlayRankInfo(rank=2, rank_min=live_setting.a_rank_score, rank_max=live_setting.s_rank_score - 1),
             LivePlayRankInfo(rank=1, rank_min=live_setting.s_rank_score, rank_max=0),
         ],
-        on=on_dict,
-        off=off_dict,
         can_activate_effect=True,  # TODO
     )
+    response.splice("on", _encode_precise_score(live_info_json, with_skill_record))
+    response.splice("off", _encode_precise_score(live_info_json, without_skill_record))
+    return response
 
 
 @idol.register("live", "play", xmc_verify=idol.XMCVerifyMode.CROSS)
@@ -513,8 +518,8 @@ async def live_play(context: idol.SchoolIdolUserParams, request: LivePlayRequest
     if live_setting is None:
         raise idol.error.by_code(idol.error.ERROR_CODE_LIVE_NOT_FOUND)
 
-    beatmap_data = await live.get_live_info(context, request.live_difficulty_id, live_setting)
-    if beatmap_data is None:
+    beatmap = await live.get_beatmap(context, live_setting)
+    if beatmap is None:
         raise idol.error.by_code(idol.error.ERROR_CODE_LIVE_NOTES_LIST_NOT_FOUND)
 
     deck_data = await unit.load_unit_deck(context, current_user, request.unit_deck_id)
@@ -541,7 +546,13 @@ async def live_play(context: idol.SchoolIdolUserParams, request: LivePlayRequest
 
     # Register live in progress
     await live.register_live_in_progress(
-        context, current_user, guest, request.lp_factor, request.unit_deck_id, stats.model_dump_json().encode("utf-8")
+        context,
+        current_user,
+        guest,
+        request.lp_factor,
+        request.unit_deck_id,
+        stats.model_dump_json().encode("utf-8"),
+        beatmap,
     )
 
     return LivePlayResponse(
@@ -555,7 +566,12 @@ async def live_play(context: idol.SchoolIdolUserParams, request: LivePlayRequest
         energy_full_time=util.timestamp_to_datetime(current_user.energy_full_time),
         over_max_energy=current_user.over_max_energy,
         # TODO: Medley Festival
-        live_list=[LivePlayList(live_info=beatmap_data, deck_info=stats)],
+        live_list=[
+            LivePlayList(
+                live_info=live.get_live_info_with_beatmap(request.live_difficulty_id, live_setting, beatmap),
+                deck_info=stats,
+            )
+        ],
     )
 
 
@@ -583,11 +599,19 @@ async def live_reward(context: idol.SchoolIdolUserParams, request: LiveRewardReq
     if live_setting is None:
         raise idol.error.by_code(idol.error.ERROR_CODE_LIVE_NOT_FOUND)
 
-    beatmap_data = await live.get_live_info(context, request.live_difficulty_id, live_setting)
-    if beatmap_data is None:
-        raise idol.error.by_code(idol.error.ERROR_CODE_LIVE_NOTES_LIST_NOT_FOUND)
-
-    if request.max_combo > len(beatmap_data.notes_list):
+    notes_crc32 = live_in_progress.notes_crc32
+    notes_sha256 = live_in_progress.notes_sha256
+    notes_count = live_in_progress.notes_count
+    if not notes_sha256:
+        # Live show started before the beatmap is recorded in live in progress.
+        beatmap = await live.get_beatmap(context, live_setting)
+        if beatmap is None:
+            raise idol.error.by_code(idol.error.ERROR_CODE_LIVE_NOTES_LIST_NOT_FOUND)
+        notes_crc32 = beatmap.notes_list_crc32
+        notes_sha256 = beatmap.notes_list_sha256
+        notes_count = len(beatmap.notes_list)
+
+    if request.max_combo > notes_count:
         raise idol.error.IdolError(detail="...", http_code=423)
 
     # Get old data
@@ -645,22 +669,22 @@ async def live_reward(context: idol.SchoolIdolUserParams, request: LiveRewardReq
 
     # Roll unit for live clear
     live_unit_drop_protocol = config.get_live_unit_drop_protocol()
-    unit_id = await live_unit_drop_protocol.get_live_drop_unit(live_setting.live_setting_id, context)
+    drop_unit_ids = [await live_unit_drop_protocol.get_live_drop_unit(live_setting.live_setting_id, context)]
+    has_combo_drop = request.max_combo >= live_setting.c_rank_combo
+    if has_combo_drop:
+        drop_unit_ids.append(await live_unit_drop_protocol.get_live_drop_unit(live_setting.live_setting_id, context))
+    has_score_drop = score >= live_setting.c_rank_score
+    if has_score_drop:
+        drop_unit_ids.append(await live_unit_drop_protocol.get_live_drop_unit(live_setting.live_setting_id, context))
+    else:
+        given_exp = math.ceil(given_exp / 2)
 
     # FIXME: Drop different kinds of levels. Currently it's fixed at level 1.
     # FIXME: It does not show a new character screen. There must be a flag for it.
-    live_clear_drop = await unit.quick_create_by_unit_add(context, current_user, unit_id)
-    if request.max_combo >= live_setting.c_rank_combo:
-        unit_id = await live_unit_drop_protocol.get_live_drop_unit(live_setting.live_setting_id, context)
-        live_combo_drop = await unit.quick_create_by_unit_add(context, current_user, unit_id)
-    else:
-        live_combo_drop = None
-    if score >= live_setting.c_rank_score:
-        unit_id = await live_unit_drop_protocol.get_live_drop_unit(live_setting.live_setting_id, context)
-        live_score_drop = await unit.quick_create_by_unit_add(context, current_user, unit_id)
-    else:
-        live_score_drop = None
-        given_exp = math.ceil(given_exp / 2)
+    live_drops = await unit.quick_create_many(context, current_user, drop_unit_ids)
+    live_clear_drop = live_drops[0]
+    live_combo_drop = live_drops[1] if has_combo_drop else None
+    live_score_drop = live_drops[-1] if has_score_drop else None
 
     # Add user EXP
     given_exp = given_exp * live_in_progress.lp_factor
@@ -670,17 +694,15 @@ async def live_reward(context: idol.SchoolIdolUserParams, request: LiveRewardReq
     # Add units
     unit_expiry = util.time() + const.COMMON_UNIT_EXPIRY
     current_unit_count = await unit.count_units(context, current_user, True)
-    for reward_data in (live_clear_drop, live_combo_drop, live_score_drop):
-        if reward_data is not None:
-            current_unit_count = await unit.process_quick_add(
-                context,
-                current_user,
-                reward_data,
-                current_unit_count=current_unit_count,
-                reason_jp="FIXME live show reward JP text",
-                reason_en="Live Show! Reward",
-                expire=unit_expiry,
-            )
+    current_unit_count = await unit.process_quick_add_many(
+        context,
+        current_user,
+        live_drops,
+        current_unit_count=current_unit_count,
+        reason_jp="FIXME live show reward JP text",
+        reason_en="Live Show! Reward",
+        expire=unit_expiry,
+    )
 
     # Add bond
     love_count = math.ceil(request.love_cnt * live_in_progress.lp_factor * config.CONFIG_DATA.gameplay.love_multiplier)
@@ -805,12 +827,15 @@ async def live_reward(context: idol.SchoolIdolUserParams, request: LiveRewardReq
             current_user,
             request.live_difficulty_id,
             bool(request.precise_score_log["is_skill_on"]),
-            beatmap_data.notes_list,
+            live_setting,
+            notes_crc32,
+            notes_sha256,
             request.precise_score_log,
         )
 
     # Log current player ranking
     await ranking.increment_daily_score(context, current_user, score)
+    ranking.update_live_ranking(context, current_user, request.live_difficulty_id, live_clear_data.hi_score)
 
     # Create response
     reward_unit_list = LiveRewardUnitList()
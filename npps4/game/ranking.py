@@ -2,7 +2,6 @@ import pydantic
 
 from . import models
 from .. import idol
-from .. import util
 from ..system import common
 from ..system import ranking
 from ..system import reward
@@ -45,57 +44,50 @@ class RankingResponse(common.TimestampMixin, PageableMixin):
     present_cnt: int
 
 
-@idol.register("ranking", "live")
-async def ranking_live(context: idol.SchoolIdolUserParams, request: RankingLiveRequest) -> RankingResponse:
-    current_user = await user.get_current(context)
-    total_cnt, player_scores = await ranking.get_live_ranking(context, request.live_difficulty_id, request.page)
-
-    rank_player_scores: list[RankingData] = []
-    for i, (user_id, score) in enumerate(player_scores, 1):
-        # TODO: Deduplicate with partyInfo code
-        target_user = await user.get(context, user_id)
-        if target_user is None:
-            continue
-
-        # Get unit center info
-        unit_center = await unit.get_unit_center(context, target_user)
-        if unit_center is None:
-            continue
+async def _build_ranking_data(context: idol.SchoolIdolUserParams, rankings: list[tuple[int, int, int]]):
+    # rankings is list of (rank, user_id, score)
+    cards = await unit.get_center_unit_cards(context, (user_id for _, user_id, _ in rankings))
+    ranking_data: list[RankingData] = []
 
-        unit_data = await unit.get_unit(context, unit_center)
-        unit.validate_unit(target_user, unit_data)
-        unit_info = await unit.get_unit_info(context, unit_data.unit_id)
-        if unit_info is None:
+    for rank, user_id, score in rankings:
+        card = cards.get(user_id)
+        if card is None:
             continue
 
-        removable_skills = await unit.get_unit_removable_skills(context, unit_data)
-        unit_full_data, unit_stats = await unit.get_unit_data_full_info(context, unit_data)
-
-        rank_player_scores.append(
+        ranking_data.append(
             RankingData(
-                rank=i,
+                rank=rank,
                 score=score,
-                user_data=models.UserData(user_id=user_id, name=target_user.name, level=target_user.level),
+                user_data=models.UserData(user_id=card.user_id, name=card.name, level=card.level),
                 center_unit_info=common.CenterUnitInfo(
-                    unit_id=unit_data.unit_id,
-                    level=unit_full_data.level,
-                    rank=unit_data.rank,
-                    love=unit_data.love,
-                    display_rank=unit_data.display_rank,
-                    unit_skill_exp=unit_data.skill_exp,
-                    unit_removable_skill_capacity=unit_data.unit_removable_skill_capacity,
-                    smile=unit_stats.smile,
-                    cute=unit_stats.pure,
-                    cool=unit_stats.cool,
-                    is_love_max=unit_full_data.is_love_max,
-                    is_level_max=unit_full_data.is_level_max,
-                    is_rank_max=unit_full_data.is_rank_max,
-                    removable_skill_ids=removable_skills,
+                    unit_id=card.unit_data.unit_id,
+                    level=card.unit_data.level,
+                    rank=card.unit_data.rank,
+                    love=card.unit_data.love,
+                    display_rank=card.unit_data.display_rank,
+                    unit_skill_exp=card.unit_data.unit_skill_exp,
+                    unit_removable_skill_capacity=card.unit_data.unit_removable_skill_capacity,
+                    smile=card.stats.smile,
+                    cute=card.stats.pure,
+                    cool=card.stats.cool,
+                    is_love_max=card.unit_data.is_love_max,
+                    is_level_max=card.unit_data.is_level_max,
+                    is_rank_max=card.unit_data.is_rank_max,
+                    removable_skill_ids=card.removable_skill_ids,
                 ),
-                setting_award_id=target_user.active_award,
+                setting_award_id=card.setting_award_id,
             )
         )
 
+    return ranking_data
+
+
+@idol.register("ranking", "live")
+async def ranking_live(context: idol.SchoolIdolUserParams, request: RankingLiveRequest) -> RankingResponse:
+    current_user = await user.get_current(context)
+    total_cnt, player_scores = await ranking.get_live_ranking(context, request.live_difficulty_id, request.page)
+    rank_player_scores = await _build_ranking_data(context, player_scores)
+
     return RankingResponse(
         page=request.page,
         rank=None,
@@ -109,66 +101,29 @@ async def ranking_live(context: idol.SchoolIdolUserParams, request: RankingLiveR
 async def ranking_player(context: idol.SchoolIdolUserParams, request: RankingPlayerRequest) -> RankingResponse:
     current_user = await user.get_current(context)
 
+    yesterday = request.daily_index == 2
+    page = request.page
+
     if request.id > 0:
-        util.stub("ranking", "player", request)
-        raise idol.error.by_code(idol.error.ERROR_CODE_USER_NOT_EXIST)
+        # Jump to the page where the player is.
+        player_rank = await ranking.get_daily_rank(context, request.id, yesterday)
+        if player_rank is None:
+            raise idol.error.by_code(idol.error.ERROR_CODE_USER_NOT_EXIST)
+        page = (player_rank - 1) // ranking.QUERY_PER_PAGE
 
-    rankings, total_count = await ranking.get_daily_ranking(context, request.page, request.daily_index == 2)
-    items: list[RankingData] = []
+    rankings, total_count = await ranking.get_daily_ranking(context, page, yesterday)
     current_rank: int | None = None
 
-    for i, rank in enumerate(rankings, request.page * 20 + 1):
-        target_user = await user.get(context, rank.user_id)
-        if target_user is None:
-            continue
-
-        if rank.user_id == current_user.id:
-            current_rank = i
-
-        # Get unit center info
-        unit_center = await unit.get_unit_center(context, target_user)
-        if unit_center is None:
-            continue
-
-        unit_data = await unit.get_unit(context, unit_center)
-        unit.validate_unit(target_user, unit_data)
-        unit_info = await unit.get_unit_info(context, unit_data.unit_id)
-        if unit_info is None:
-            continue
-
-        removable_skills = await unit.get_unit_removable_skills(context, unit_data)
-        unit_full_data, unit_stats = await unit.get_unit_data_full_info(context, unit_data)
-
-        items.append(
-            RankingData(
-                rank=i,
-                score=rank.score,
-                user_data=models.UserData(user_id=rank.user_id, name=target_user.name, level=target_user.level),
-                center_unit_info=common.CenterUnitInfo(
-                    unit_id=unit_data.unit_id,
-                    level=unit_full_data.level,
-                    rank=unit_data.rank,
-                    love=unit_data.love,
-                    display_rank=unit_data.display_rank,
-                    unit_skill_exp=unit_data.skill_exp,
-                    unit_removable_skill_capacity=unit_data.unit_removable_skill_capacity,
-                    smile=unit_stats.smile,
-                    cute=unit_stats.pure,
-                    cool=unit_stats.cool,
-                    is_love_max=unit_full_data.is_love_max,
-                    is_level_max=unit_full_data.is_level_max,
-                    is_rank_max=unit_full_data.is_rank_max,
-                    removable_skill_ids=removable_skills,
-                ),
-                setting_award_id=target_user.active_award,
-            )
-        )
+    for rank, user_id, _ in rankings:
+        if user_id == current_user.id:
+            current_rank = rank
 
+    items = await _build_ranking_data(context, rankings)
     if len(items) == 0:
         raise idol.error.by_code(idol.error.ERROR_CODE_OUT_OF_RANG)
 
     return RankingResponse(
-        page=request.page,
+        page=page,
         rank=current_rank,
         items=items,
         total_cnt=total_count,
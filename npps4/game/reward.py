@@ -161,7 +161,7 @@ async def reward_open(context: idol.SchoolIdolUserParams, request: RewardOpenReq
     album_trigger = []
     achievement_update = []
     if success:
-        await reward.remove_incentive(context, incentive)
+        await reward.remove_incentive(context, current_user, incentive)
         if item_data.add_type == const.ADD_TYPE.UNIT and len(album_trigger) == 0:
             album_trigger.append(achievement.AchievementUpdateNewUnit())
             album_trigger.append(achievement.AchievementUpdateUnitRankUp(unit_ids=[]))
@@ -226,26 +226,22 @@ async def reward_openall(context: idol.SchoolIdolUserParams, request: RewardList
     reward_count = len(incentives)
     reward_item_list: list[RewardIncentiveItem] = []
     need_check_unit_ach = False
-    achievement_update = []
+    collected_items: dict[tuple[const.ADD_TYPE, int], int] = {}
 
-    for incentive in incentives:
-        item_data = await reward.resolve_incentive(context, current_user, incentive)
-        add_result = await advanced.add_item(context, current_user, item_data)
-        success = bool(add_result)
+    for incentive_id, item_data in await reward.claim_incentives(context, current_user, incentives):
+        reward_item_list.append(
+            RewardIncentiveItem.model_validate(item_data.model_dump() | {"incentive_id": incentive_id})
+        )
+        if item_data.add_type == const.ADD_TYPE.UNIT:
+            need_check_unit_ach = True
 
-        if success:
-            reward_item_list.append(
-                RewardIncentiveItem.model_validate(item_data.model_dump() | {"incentive_id": incentive.id})
-            )
-            await reward.remove_incentive(context, incentive)
-            if item_data.add_type == const.ADD_TYPE.UNIT:
-                need_check_unit_ach = True
-
-            achievement_update.append(
-                achievement.AchievementUpdateItemCollect(
-                    add_type=item_data.add_type, item_id=item_data.item_id, amount=item_data.amount
-                )
-            )
+        key = (item_data.add_type, item_data.item_id)
+        collected_items[key] = collected_items.get(key, 0) + item_data.amount
+
+    achievement_update = [
+        achievement.AchievementUpdateItemCollect(add_type=add_type, item_id=item_id, amount=amount)
+        for (add_type, item_id), amount in collected_items.items()
+    ]
 
     if need_check_unit_ach:
         achievement_update.append(achievement.AchievementUpdateNewUnit())
@@ -161,26 +161,22 @@ async def secretbox_gachapon(context: idol.SchoolIdolUserParams, request: Secret
             umi_rare_mode = True
 
     unit_expiry = util.time() + const.COMMON_UNIT_EXPIRY
-    for unit_id in unit_roll:
-        reward_data = await unit.quick_create_by_unit_add(context, current_user, unit_id)
+    signed_variants = await unit.has_signed_variant_many(context, unit_roll)
+    add_directly: list[unit.QuickAddResult] = []
+    for reward_data in await unit.quick_create_many(context, current_user, unit_roll):
         assert reward_data.as_item_reward.unit_rarity_id is not None
 
         if not isinstance(reward_data.as_item_reward, unit_model.UnitItem):
             await unit.add_supporter_unit(context, current_user, reward_data.unit_id)
         else:
-            if util.SYSRAND.randint(0, 1) == 1 and await unit.has_signed_variant(context, unit_id):
+            if util.SYSRAND.randint(0, 1) == 1 and signed_variants[reward_data.unit_id]:
                 reward_data.as_item_reward.is_signed = True
 
             if current_unit_count < current_user.unit_max:
                 # Add directly
                 assert reward_data.unit_data is not None
-                assert reward_data.full_info is not None
-
                 reward_data.unit_data.is_signed = reward_data.as_item_reward.is_signed
-
-                await unit.add_unit_by_object(context, current_user, reward_data.unit_data)
-                # Update unit_owning_user_id
-                reward_data.update_unit_owning_user_id()
+                add_directly.append(reward_data)
                 current_unit_count = current_unit_count + 1
             else:
                 # Move to present box
@@ -198,6 +194,10 @@ async def secretbox_gachapon(context: idol.SchoolIdolUserParams, request: Secret
         unit_data_list.append(reward_data.as_item_reward)
         lowest_rarity = min(lowest_rarity, LOWEST_RARITY_SORT_ORDER[reward_data.as_item_reward.unit_rarity_id - 1])
 
+    # Items in unit_data_list get their unit_owning_user_id assigned here
+    if add_directly:
+        await unit.add_units(context, current_user, add_directly)
+
     # Trigger achievement
     achievement_list = await achievement.check(
         context,
@@ -171,14 +171,14 @@ class UnitRemovableSkillSellResponse(pydantic.BaseModel):
     reward_box_flag: bool
 
 
-@idol.register("unit", "accessoryAll")
+@idol.register("unit", "accessoryAll", side_effect_free=True)
 async def unit_accessoryall(context: idol.SchoolIdolUserParams) -> UnitAccessoryInfoResponse:
     # TODO
     util.stub("unit", "accessoryAll", context.raw_request_data)
     return UnitAccessoryInfoResponse(accessory_list=[], wearing_info=[], especial_create_flag=False)
 
 
-@idol.register("unit", "deckInfo")
+@idol.register("unit", "deckInfo", side_effect_free=True)
 async def unit_deckinfo(context: idol.SchoolIdolUserParams) -> UnitDeckInfoResponse:
     current_user = await user.get_current(context)
     result: list[UnitDeckInfo] = []
@@ -203,13 +203,13 @@ async def unit_deckinfo(context: idol.SchoolIdolUserParams) -> UnitDeckInfoRespo
     return UnitDeckInfoResponse.model_validate(result)
 
 
-@idol.register("unit", "removableSkillInfo")
+@idol.register("unit", "removableSkillInfo", side_effect_free=True)
 async def unit_removableskillinfo(context: idol.SchoolIdolUserParams) -> unit_model.RemovableSkillInfoResponse:
     current_user = await user.get_current(context)
     return await unit.get_removable_skill_info_request(context, current_user)
 
 
-@idol.register("unit", "supporterAll")
+@idol.register("unit", "supporterAll", side_effect_free=True)
 async def unit_supporterall(context: idol.SchoolIdolUserParams) -> unit_model.SupporterListInfoResponse:
     current_user = await user.get_current(context)
     units = await unit.get_all_supporter_unit(context, current_user)
@@ -219,14 +219,16 @@ async def unit_supporterall(context: idol.SchoolIdolUserParams) -> unit_model.Su
     )
 
 
-@idol.register("unit", "unitAll")
+@idol.register("unit", "unitAll", side_effect_free=True)
 async def unit_unitall(context: idol.SchoolIdolUserParams) -> UnitAllInfoResponse:
     current_user = await user.get_current(context)
 
     unit_result: dict[bool, list[unit_model.UnitInfoData]] = {False: [], True: []}
 
-    for unit_data in await unit.get_all_units(context, current_user):
-        unit_serialized_data, _ = await unit.get_unit_data_full_info(context, unit_data)
+    all_units = list(await unit.get_all_units(context, current_user))
+    all_units_full_info = await unit.get_unit_data_full_info_batch(context, all_units)
+
+    for unit_data, (unit_serialized_data, _) in zip(all_units, all_units_full_info):
         unit_result[unit_data.active].append(unit_serialized_data)
 
     return UnitAllInfoResponse(active=unit_result[True], waiting=unit_result[False])
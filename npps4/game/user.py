@@ -87,7 +87,7 @@ async def user_changename(context: idol.SchoolIdolUserParams, request: ChangeNam
     return ChangeNameResponse(before_name=oldname, after_name=request.name)
 
 
-@idol.register("user", "getNavi")
+@idol.register("user", "getNavi", side_effect_free=True)
 async def user_getnavi(context: idol.SchoolIdolUserParams) -> UserGetNaviResponse:
     current_user = await user.get_current(context)
     center = await unit.get_unit_center(context, current_user)
@@ -96,7 +96,7 @@ async def user_getnavi(context: idol.SchoolIdolUserParams) -> UserGetNaviRespons
     )
 
 
-@idol.register("user", "userInfo", exclude_none=True)
+@idol.register("user", "userInfo", exclude_none=True, side_effect_free=True)
 async def user_userinfo(context: idol.SchoolIdolUserParams) -> UserInfoResponse:
     u = await user.get_current(context)
     if u is None:
@@ -1,60 +1,207 @@
-import collections.abc
+import asyncio
+import collections
+import dataclasses
 
 import sqlalchemy
 
 from . import session
 from .. import util
+from ..app import app
+from ..config import config
 from ..db import main
 
 from typing import cast
 
-ENABLE_CACHE = False
+
+@dataclasses.dataclass(slots=True)
+class _CachedResponse:
+    token: str | None
+    endpoint: str
+    response: bytes
+    expiry: int
+
+
+# Per-worker tier, keyed by (user_id, nonce).
+_memory: collections.OrderedDict[tuple[int, int], _CachedResponse] = collections.OrderedDict()
+_memory_size = 0
+# Responses not yet written to the database, keyed by (user_id, nonce).
+_pending: dict[tuple[int, int], _CachedResponse] = {}
+_flush_task: asyncio.Task | None = None
+
+
+def _get_key(context: session.SchoolIdolParams):
+    if isinstance(context, session.SchoolIdolUserParams) and context.nonce > 0:
+        assert context.token is not None
+        return context.token.user_id, context.nonce
+    return None
+
+
+def _memory_remove(key: tuple[int, int]):
+    global _memory, _memory_size
+    cached = _memory.pop(key, None)
+    if cached is not None:
+        _memory_size = _memory_size - len(cached.response)
+
+
+def _memory_get(key: tuple[int, int], token: str | None):
+    global _memory
+
+    cached = _memory.get(key)
+    if cached is not None:
+        # Token mismatch means the user logged in again in another worker and the nonce starts over.
+        if cached.expiry < util.time() or cached.token != token:
+            _memory_remove(key)
+            return None
+
+        _memory.move_to_end(key)
+        return cached.endpoint, cached.response
+
+    return None
+
+
+def _memory_put(key: tuple[int, int], cached: _CachedResponse):
+    global _memory, _memory_size
+
+    max_size = config.get_replay_cache_memory()
+    if len(cached.response) > max_size:
+        return
+
+    _memory_remove(key)
+    _memory[key] = cached
+    _memory_size = _memory_size + len(cached.response)
+
+    while _memory_size > max_size:
+        _memory_remove(next(iter(_memory)))
+
+
+async def _sql_get(context: session.BasicSchoolIdolContext, key: tuple[int, int], token: str | None):
+    global _pending
+
+    t = util.time()
+    pending = _pending.get(key)
+    if pending is not None and pending.token == token and pending.expiry >= t:
+        return pending
+
+    # Rows of previous session may still be written by other workers after login, so check the token too.
+    q = sqlalchemy.select(main.RequestCache).where(
+        main.RequestCache.user_id == key[0],
+        main.RequestCache.nonce == key[1],
+        main.RequestCache.token == token,
+        main.RequestCache.expire_date >= t,
+    )
+    result = await context.db.main.execute(q)
+    cache = result.scalar()
+    if cache is not None:
+        return _CachedResponse(cache.token, cache.endpoint, cache.response, cache.expire_date)
+
+    return None
 
 
 async def load_response(context: session.SchoolIdolParams, endpoint: str):
-    if ENABLE_CACHE:
-        if isinstance(context, session.SchoolIdolUserParams) and context.nonce > 0:
-            assert context.token is not None
-            q = sqlalchemy.select(main.RequestCache).where(
-                main.RequestCache.user_id == context.token.user_id, main.RequestCache.nonce == context.nonce
-            )
-            result = await context.db.main.execute(q)
+    backend = config.get_replay_cache_backend()
+    if backend != "none":
+        key = _get_key(context)
+        if key is not None:
+            cached = _memory_get(key, context.token_text)
+            if cached is None and backend == "sql":
+                sql_cached = await _sql_get(context, key, context.token_text)
+                if sql_cached is not None:
+                    _memory_put(key, sql_cached)
+                    cached = sql_cached.endpoint, sql_cached.response
 
-            cache = result.scalar()
-            if cache is not None and cache.endpoint == endpoint:
+            if cached is not None and cached[0] == endpoint:
                 util.log("Cache for endpoint", endpoint, context.nonce, "FOUND!!")
-                return cache.response
+                return cached[1]
 
-        util.log("Cache for endpoint", endpoint, context.nonce, "not found")
     return None
 
 
-async def store_response(
-    context: session.SchoolIdolParams, endpoint: str, response_base: collections.abc.Sequence[int]
-):
-    if ENABLE_CACHE:
-        if isinstance(context, session.SchoolIdolUserParams) and context.nonce > 0:
-            assert context.token is not None
-            user_id = context.token.user_id
-            nonce = context.nonce
-            q = sqlalchemy.select(main.RequestCache).where(
-                main.RequestCache.user_id == user_id, main.RequestCache.nonce == nonce
+async def store_response(context: session.SchoolIdolParams, endpoint: str, response: bytes):
+    global _pending
+
+    backend = config.get_replay_cache_backend()
+    if backend != "none":
+        key = _get_key(context)
+        if key is not None:
+            cached = _CachedResponse(
+                context.token_text, endpoint, response, util.time() + config.get_replay_cache_ttl()
             )
-            result = await context.db.main.execute(q)
+            _memory_put(key, cached)
+            if backend == "sql":
+                _pending[key] = cached
+
+
+async def flush():
+    """Write pending responses to the database in single transaction."""
+    global _pending
+
+    if _pending:
+        pending = _pending
+        _pending = {}
 
-            response = bytes(response_base)
-            cache = result.scalar()
-            if cache is None:
-                cache = main.RequestCache(user_id=user_id, endpoint=endpoint, nonce=nonce, response=response)
-                context.db.main.add(cache)
-            else:
-                cache.endpoint = endpoint
-                cache.response = response
-            await context.db.main.flush()
-            util.log("Stored cache for endpoint", endpoint, context.nonce)
+        try:
+            async with session.BasicSchoolIdolContext() as context:
+                q = sqlalchemy.delete(main.RequestCache).where(
+                    sqlalchemy.tuple_(main.RequestCache.user_id, main.RequestCache.nonce).in_(list(pending.keys()))
+                )
+                await context.db.main.execute(q)
+                await context.db.main.execute(
+                    sqlalchemy.insert(main.RequestCache),
+                    [
+                        {
+                            "user_id": user_id,
+                            "nonce": nonce,
+                            "endpoint": cached.endpoint,
+                            "response": cached.response,
+                            "token": cached.token,
+                            "expire_date": cached.expiry,
+                        }
+                        for (user_id, nonce), cached in pending.items()
+                    ],
+                )
+        except BaseException:
+            # Try again on next flush. Responses cached after the swap are newer, so keep them.
+            for key, cached in pending.items():
+                _pending.setdefault(key, cached)
+            raise
+
+
+async def _flush_loop():
+    interval = config.get_replay_cache_flush_interval()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await flush()
+        except Exception as e:
+            util.log("Unable to write replay cache", severity=util.logging.ERROR, e=e)
+
+
+@app.on_startup
+async def start_flush_task():
+    global _flush_task
+
+    if config.get_replay_cache_backend() == "sql":
+        _flush_task = asyncio.create_task(_flush_loop())
+
+
+@app.on_shutdown
+async def stop_flush_task():
+    global _flush_task
+
+    if _flush_task is not None:
+        _flush_task.cancel()
+        _flush_task = None
+        await flush()
 
 
 async def clear(context: session.BasicSchoolIdolContext, user_id: int):
+    global _memory, _pending
+
+    for key in [k for k in _memory if k[0] == user_id]:
+        _memory_remove(key)
+    for key in [k for k in _pending if k[0] == user_id]:
+        del _pending[key]
+
     q = sqlalchemy.delete(main.RequestCache).where(main.RequestCache.user_id == user_id)
     result = cast(sqlalchemy.CursorResult, await context.db.main.execute(q))
     return result.rowcount
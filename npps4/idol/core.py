@@ -1,3 +1,4 @@
+import asyncio
 import cProfile
 import collections.abc
 import dataclasses
@@ -14,9 +15,12 @@ import fastapi
 import pydantic
 
 from . import cache
+from . import serializer
 from . import session
+from . import signing
 from . import error
 from .. import idoltype
+from .. import metrics
 from .. import release_key
 from .. import util
 from ..app import app
@@ -61,6 +65,7 @@ class Endpoint(Generic[_T, _U, _V]):
     exclude_none: bool
     log_response_data: bool
     profile: bool
+    side_effect_free: bool
 
 
 def _get_request_data[U: pydantic.BaseModel](model: type[U]):
@@ -143,6 +148,29 @@ def assemble_response_data(response: _PossibleResponse[_V], exclude_none: bool =
     return response_data, status_code, http_code
 
 
+def encode_response_data(response: _PossibleResponse[_V], exclude_none: bool = False):
+    start = time.perf_counter()
+
+    if isinstance(response, pydantic.BaseModel):
+        response_data = serializer.encode_model(response, exclude_none)
+        status_code = http_code = 200
+    elif isinstance(response, list):
+        response_data = serializer.encode_list(serializer.encode_model(r, exclude_none) for r in response)
+        status_code = http_code = 200
+    else:
+        response_data_dict, status_code, http_code = assemble_response_data(response)
+        response_data = serializer.dumps(response_data_dict)
+
+    metrics.SERIALIZATION_DURATION.observe(time.perf_counter() - start)
+    return response_data, status_code, http_code
+
+
+def encode_response(response: _PossibleResponse[_V], exclude_none: bool = False):
+    """Encode successful response to full response body, suitable for ``build_response``."""
+    response_data, status_code, _ = encode_response_data(response, exclude_none)
+    return serializer.encode_envelope(response_data, status_code)
+
+
 async def build_response(
     context: session.SchoolIdolParams, response: _PossibleResponse[_V] | bytes, exclude_none: bool = False
 ):
@@ -150,20 +178,14 @@ async def build_response(
         http_code = 200
         status_code = 200
     else:
-        response_data_dict, status_code, http_code = assemble_response_data(
+        response_data, status_code, http_code = encode_response_data(
             cast(_PossibleResponse[_V], response), exclude_none
         )
-        response_data = {
-            "response_data": response_data_dict,
-            "release_info": release_key.formatted(),
-            "status_code": status_code,
-        }
-        jsondatastr = json.dumps(response_data)
-        response = jsondatastr.encode("UTF-8")
+        response = serializer.encode_envelope(response_data, status_code)
 
     response_headers = {
         "Server-Version": util.sif_version_string(config.get_latest_version()),
-        "X-Message-Sign": util.sign_message(response, context.x_message_code),
+        "X-Message-Sign": await signing.sign(response, context.x_message_code),
         "status_code": str(status_code),
     }
 
@@ -189,6 +211,8 @@ def _log_response_data(module: str, action: str, response_data: pydantic.BaseMod
 
     with open(os.path.join(output_dir, filename), "w", encoding="utf-8", newline="\n") as f:
         jsonable = response_data.model_dump()
+        if isinstance(response_data, serializer.SplicedModel):
+            jsonable.update((k, json.loads(v)) for k, v in response_data.get_spliced().items())
         json.dump(jsonable, f, ensure_ascii=False, indent="\t")
 
     util.log(f"Response data for {module}/{action} is saved to {filename}", severity=util.logging.DEBUG)
@@ -263,6 +287,8 @@ def register(
     batchable: bool = True,
     xmc_verify: idoltype.XMCVerifyMode = idoltype.XMCVerifyMode.SHARED,
     exclude_none: bool = False,
+    # Endpoint only reads data, so it can run concurrently with other such endpoints in /api.
+    side_effect_free: bool = False,
     # These are only for debug purpose.
     log_response_data: bool = False,
     allow_retry_on_unhandled_exception: bool = False,
@@ -314,13 +340,17 @@ def register(
                                     _write_profile_data(module, action, profile_obj)
                                 else:
                                     result = await func(context)
-                                response = await build_response(context, result, exclude_none=exclude_none)
-                                await cache.store_response(context, endpoint, response.body)
+                                response_body = encode_response(result, exclude_none)
+                                response = await build_response(context, response_body)
 
                                 if log_response_data and result is not None:
                                     _log_response_data(module, action, result)
                             else:
                                 response = await build_response(context, cached_response)
+
+                        if cached_response is None:
+                            # Only remember responses whose changes are committed.
+                            await cache.store_response(context, endpoint, response_body)
                     except error.IdolError as e:
                         response = await build_response(context, e)
                     except Exception as e:
@@ -332,6 +362,7 @@ def register(
                             raise e from None
                 return response
 
+            instrumented_wrap1 = metrics.instrument_endpoint(f"{module}/{action}")(wrap1)
             app.main.post(
                 endpoint,
                 name=f.__name__,
@@ -340,7 +371,7 @@ def register(
                 responses={200: {"headers": RESPONSE_HEADERS}},
                 response_model_exclude_none=exclude_none,
                 tags=tags,
-            )(wrap1)
+            )(instrumented_wrap1)
             app.main.get(
                 endpoint,
                 name=f.__name__,
@@ -349,7 +380,7 @@ def register(
                 responses={200: {"headers": RESPONSE_HEADERS}},
                 response_model_exclude_none=exclude_none,
                 tags=tags,
-            )(wrap1)
+            )(instrumented_wrap1)
         else:
             model = typing.cast(pydantic.BaseModel, params[1])
             schema = model.model_json_schema()
@@ -383,13 +414,17 @@ def register(
                                     _write_profile_data(module, action, profile_obj)
                                 else:
                                     result = await func(context, request)
-                                response = await build_response(context, result, exclude_none=exclude_none)
-                                await cache.store_response(context, endpoint, response.body)
+                                response_body = encode_response(result, exclude_none)
+                                response = await build_response(context, response_body)
 
                                 if log_response_data and result is not None:
                                     _log_response_data(module, action, result)
                             else:
-                                result = await build_response(context, cached_response, exclude_none=exclude_none)
+                                response = await build_response(context, cached_response)
+
+                        if cached_response is None:
+                            # Only remember responses whose changes are committed.
+                            await cache.store_response(context, endpoint, response_body)
                     except error.IdolError as e:
                         response = await build_response(context, e)
                     except Exception as e:
@@ -402,6 +437,7 @@ def register(
                             raise e from None
                 return response
 
+            instrumented_wrap2 = metrics.instrument_endpoint(f"{module}/{action}")(wrap2)
             app.main.post(
                 endpoint,
                 name=f.__name__,
@@ -431,7 +467,7 @@ def register(
                         },
                     },
                 },
-            )(wrap2)
+            )(instrumented_wrap2)
         if batchable and xmc_verify != idoltype.XMCVerifyMode.CROSS:
             API_ROUTER_MAP[(module, action)] = Endpoint(
                 context_class=params[0],
@@ -440,6 +476,7 @@ def register(
                 exclude_none=exclude_none,
                 log_response_data=log_response_data,
                 profile=profile_this_endpoint,
+                side_effect_free=side_effect_free,
             )
         return f
 
@@ -466,6 +503,11 @@ class BatchResponseRoot(pydantic.RootModel):
     root: list[BatchResponse]
 
 
+def _encode_batch_response(result: bytes, status: int, timestamp: int):
+    # Must match BatchResponse
+    return b'{"result":%b,"status":%d,"commandNum":false,"timeStamp":%d}' % (result, status, timestamp)
+
+
 _api_request_data_schema = {
     "type": "object",
     "properties": {"request_data": {"type": "array", "items": BatchRequest.model_json_schema()}},
@@ -473,6 +515,83 @@ _api_request_data_schema = {
 }
 
 
+async def _run_batch_request(context: session.SchoolIdolUserParams, request_data: dict[str, Any]):
+    module, action = request_data["module"], request_data["action"]
+
+    with metrics.measure_endpoint(f"{module}/{action}"):
+        try:
+            # Find endpoint
+            endpoint = API_ROUTER_MAP.get((module, action))
+            if endpoint is None:
+                msg = f"Endpoint not found: {module}/{action}"
+                util.log(msg, json.dumps(request_data), severity=util.logging.ERROR)
+                raise error.IdolError(error.ERROR_CODE_LIB_ERROR, 404, msg, http_code=404)
+
+            # *Sigh* have to reinvent the wheel.
+            if endpoint.request_class is not None:
+                pydantic_request = endpoint.request_class.model_validate(request_data)
+                func = cast(
+                    _EndpointWithRequestWithResponse[
+                        session.SchoolIdolUserParams, pydantic.BaseModel, pydantic.BaseModel
+                    ]
+                    | _EndpointWithRequestWithoutResponse[session.SchoolIdolUserParams, pydantic.BaseModel],
+                    endpoint.function,
+                )
+
+                if endpoint.profile:
+                    profile_obj = cProfile.Profile()
+                    with profile_obj:
+                        result = await func(context, pydantic_request)
+                    _write_profile_data(module, action, profile_obj)
+                else:
+                    result = await func(context, pydantic_request)
+            else:
+                func = cast(
+                    _EndpointWithoutRequestWithResponse[session.SchoolIdolUserParams, pydantic.BaseModel]
+                    | _EndpointWithoutRequestWithoutResponse[session.SchoolIdolUserParams],
+                    endpoint.function,
+                )
+                if endpoint.profile:
+                    profile_obj = cProfile.Profile()
+                    with profile_obj:
+                        result = await func(context)
+                    _write_profile_data(module, action, profile_obj)
+                else:
+                    result = await func(context)
+
+            if endpoint.log_response_data and result is not None:
+                _log_response_data(module, action, result)
+
+            current_response, status_code, http_code = encode_response_data(result, endpoint.exclude_none)
+        except Exception as e:
+            if not isinstance(e, error.IdolError):
+                util.log(f'Error processing "{module}/{action}"', severity=util.logging.ERROR, e=e)
+
+            current_response, status_code, http_code = encode_response_data(e)
+
+    return _encode_batch_response(current_response, status_code, util.time())
+
+
+async def _run_forked_batch_request(context: session.SchoolIdolUserParams, request_data: dict[str, Any]):
+    async with context.fork() as forked_context:
+        return await _run_batch_request(forked_context, request_data)
+
+
+async def _run_batch_requests_concurrently(
+    context: session.SchoolIdolUserParams, request_data_list: list[dict[str, Any]]
+):
+    if len(request_data_list) == 1:
+        return [await _run_batch_request(context, request_data_list[0])]
+
+    return await asyncio.gather(*[_run_forked_batch_request(context, rd) for rd in request_data_list])
+
+
+def _can_run_concurrently(request_data: dict[str, Any]):
+    endpoint = API_ROUTER_MAP.get((request_data["module"], request_data["action"]))
+    # Unknown endpoint will just result in error response.
+    return endpoint is None or (endpoint.side_effect_free and not endpoint.profile)
+
+
 @app.main.post(
     "/api",
     response_model=idoltype.ResponseData[BatchResponseRoot],
@@ -485,6 +604,7 @@ _api_request_data_schema = {
         },
     },
 )
+@metrics.instrument_endpoint("api")
 async def api_endpoint(
     context: Annotated[session.SchoolIdolUserParams, fastapi.Depends(session.SchoolIdolUserParams)],
     request: Annotated[list[BatchRequest], fastapi.Depends(_get_request_data(BatchRequestRoot))],
@@ -507,67 +627,33 @@ async def api_endpoint(
             cached_response = await cache.load_response(context, endpoint_name)
 
             if cached_response is None:
-                response_data: list[BatchResponse] = []
+                response_data: list[bytes] = []
+                concurrent_requests: list[dict[str, Any]] = []
+                serialized = False
 
                 for request_data in raw_request_data:
-                    module, action = request_data["module"], request_data["action"]
+                    # Forked contexts can't see uncommitted changes of the main context, so only side-effect-free
+                    # requests before the first writing request are run concurrently.
+                    if not serialized and _can_run_concurrently(request_data):
+                        concurrent_requests.append(request_data)
+                        continue
 
-                    try:
-                        # Find endpoint
-                        endpoint = API_ROUTER_MAP.get((module, action))
-                        if endpoint is None:
-                            msg = f"Endpoint not found: {module}/{action}"
-                            util.log(msg, json.dumps(request_data), severity=util.logging.ERROR)
-                            raise error.IdolError(error.ERROR_CODE_LIB_ERROR, 404, msg, http_code=404)
-
-                        # *Sigh* have to reinvent the wheel.
-                        if endpoint.request_class is not None:
-                            pydantic_request = endpoint.request_class.model_validate(request_data)
-                            func = cast(
-                                _EndpointWithRequestWithResponse[
-                                    session.SchoolIdolUserParams, pydantic.BaseModel, pydantic.BaseModel
-                                ]
-                                | _EndpointWithRequestWithoutResponse[session.SchoolIdolUserParams, pydantic.BaseModel],
-                                endpoint.function,
-                            )
-
-                            if endpoint.profile:
-                                profile_obj = cProfile.Profile()
-                                with profile_obj:
-                                    result = await func(context, pydantic_request)
-                                _write_profile_data(module, action, profile_obj)
-                            else:
-                                result = await func(context, pydantic_request)
-                        else:
-                            func = cast(
-                                _EndpointWithoutRequestWithResponse[session.SchoolIdolUserParams, pydantic.BaseModel]
-                                | _EndpointWithoutRequestWithoutResponse[session.SchoolIdolUserParams],
-                                endpoint.function,
-                            )
-                            if endpoint.profile:
-                                profile_obj = cProfile.Profile()
-                                with profile_obj:
-                                    result = await func(context)
-                                _write_profile_data(module, action, profile_obj)
-                            else:
-                                result = await func(context)
-
-                        if endpoint.log_response_data and result is not None:
-                            _log_response_data(module, action, result)
+                    if concurrent_requests:
+                        response_data.extend(await _run_batch_requests_concurrently(context, concurrent_requests))
+                        concurrent_requests = []
 
-                        current_response, status_code, http_code = assemble_response_data(result, endpoint.exclude_none)
-                    except Exception as e:
-                        if not isinstance(e, error.IdolError):
-                            util.log(f'Error processing "{module}/{action}"', severity=util.logging.ERROR, e=e)
-
-                        current_response, status_code, http_code = assemble_response_data(e)
+                    serialized = True
+                    response_data.append(await _run_batch_request(context, request_data))
 
-                    response_data.append(
-                        BatchResponse(result=current_response, status=status_code, timeStamp=util.time())
-                    )
+                if concurrent_requests:
+                    response_data.extend(await _run_batch_requests_concurrently(context, concurrent_requests))
 
-                response = await build_response(context, response_data, False)
-                await cache.store_response(context, endpoint_name, response.body)
+                response_body = serializer.encode_envelope(serializer.encode_list(response_data), 200)
+                response = await build_response(context, response_body)
             else:
                 response = await build_response(context, cached_response)
+
+        if cached_response is None:
+            # Only remember responses whose changes are committed.
+            await cache.store_response(context, endpoint_name, response_body)
     return response
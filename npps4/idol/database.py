@@ -13,6 +13,13 @@ from ..db import scenario
 from ..db import subscenario
 from ..db import unit
 
+MASTER_DATABASES = (achievement, effort, exchange, game_mater, item, live, museum, scenario, subscenario, unit)
+
+
+def get_master_db_paths():
+    """Paths of the read-only master data databases used by the current worker."""
+    return tuple(str(m.engine.url.database) for m in MASTER_DATABASES)
+
 
 class Database:
     __slots__ = (
@@ -0,0 +1,82 @@
+import collections.abc
+
+import pydantic
+import pydantic_core
+
+from .. import release_key
+from .. import util
+
+from typing import Any
+
+try:
+    import orjson  # type: ignore
+
+    util.log("Using orjson for JSON encoding")
+
+    def dumps(obj: Any, /) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+except ImportError:
+
+    def dumps(obj: Any, /) -> bytes:
+        return pydantic_core.to_json(obj)
+
+
+class SplicedModel(pydantic.BaseModel):
+    """Model with additional fields whose values are already encoded as JSON, spliced in by `encode_model`."""
+
+    _spliced: dict[str, bytes] = pydantic.PrivateAttr(default_factory=dict)
+
+    def splice(self, name: str, value: bytes, /):
+        self._spliced[name] = value
+        return self
+
+    def get_spliced(self):
+        return self._spliced
+
+
+def encode_model(model: pydantic.BaseModel, /, exclude_none: bool = False):
+    result = model.model_dump_json(exclude_none=exclude_none).encode("UTF-8")
+    if isinstance(model, SplicedModel):
+        result = encode_object(model.get_spliced().items(), result)
+    return result
+
+
+def encode_list(items: collections.abc.Iterable[bytes], /):
+    """Splice already-encoded JSON values into JSON array."""
+    return b"[" + b",".join(items) + b"]"
+
+
+def encode_object(members: collections.abc.Iterable[tuple[str, bytes]], base: bytes = b"{}", /):
+    """Splice already-encoded JSON values as additional members of encoded JSON object `base`."""
+    spliced = b",".join(dumps(k) + b":" + v for k, v in members)
+    if not spliced:
+        return base
+
+    base_members = base.strip()[1:-1].strip()
+    if base_members:
+        return b"{" + base_members + b"," + spliced + b"}"
+    return b"{" + spliced + b"}"
+
+
+_release_info_generation = -1
+_release_info = b"[]"
+
+
+def encode_release_info():
+    global _release_info_generation, _release_info
+
+    generation = release_key.generation()
+    if _release_info_generation != generation:
+        _release_info = dumps(release_key.formatted())
+        _release_info_generation = generation
+
+    return _release_info
+
+
+def encode_envelope(response_data: bytes, status_code: int, /):
+    return b'{"response_data":%b,"release_info":%b,"status_code":%d}' % (
+        response_data,
+        encode_release_info(),
+        status_code,
+    )
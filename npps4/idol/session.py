@@ -1,5 +1,6 @@
 import asyncio
 import base64
+import copy
 import dataclasses
 import pickle
 import urllib.parse
@@ -12,6 +13,7 @@ from . import database
 from . import session
 from .. import idoltype
 from .. import util
+from ..app import app
 from ..config import config
 from ..db import main
 
@@ -25,6 +27,7 @@ class BasicSchoolIdolContext:
         self.lang = lang
         self.db = database.Database()
         self.cache: dict[str, dict[Any, Any]] = {}
+        self.commit_hooks: list[Callable[[], Any]] = []
 
     async def __aenter__(self):
         mainsession = self.db.main
@@ -37,18 +40,28 @@ class BasicSchoolIdolContext:
 
     async def __aexit__(self, exc_type, exc, tb):
         self.cache.clear()
+        commit_hooks = self.commit_hooks
+        self.commit_hooks = []
 
         try:
             if exc_type is None:
                 await self.db.commit()
             else:
                 await self.db.rollback()
+                commit_hooks = []
         except:
             await self.db.rollback()
             raise
         finally:
             await self.db.cleanup()
 
+        for hook in commit_hooks:
+            hook()
+
+    def on_commit(self, hook: Callable[[], Any]):
+        """Call `hook` once the changes are committed. It's discarded if the changes are rolled back."""
+        self.commit_hooks.append(hook)
+
     def is_lang_jp(self):
         return self.lang == idoltype.Language.jp
 
@@ -67,6 +80,14 @@ class BasicSchoolIdolContext:
     async def finalize(self):
         pass
 
+    def fork(self):
+        """Create shallow copy of this context with its own database sessions and cache."""
+        context = copy.copy(self)
+        context.db = database.Database()
+        context.cache = {}
+        context.commit_hooks = []
+        return context
+
     def get_cache(self, key: str, id: Any):
         if key in self.cache and id in self.cache[key]:
             return self.cache[key][id]
@@ -223,60 +244,152 @@ async def encapsulate_token(context: BasicSchoolIdolContext, server_key: bytes,
     return str(base64.urlsafe_b64encode(salt + result), "utf-8")
 
 
-async def cleanup_session_table(context: BasicSchoolIdolContext, /):
-    t = util.time()
-    q = sqlalchemy.delete(main.Session).where(
-        main.Session.user_id == None, main.Session.last_accessed < (t - FIRST_STAGE_TOKEN_MAX_DURATION)
-    )
-    await context.db.main.execute(q)
+@dataclasses.dataclass(slots=True)
+class _CachedSession:
+    data: TokenData
+    checked: int
+    last_accessed: int
 
-    # Delete tokens
-    expiry_time = config.get_session_expiry_time()
-    if expiry_time > 0:
-        q = sqlalchemy.delete(main.Session).where(main.Session.last_accessed < (t - expiry_time))
-        await context.db.main.execute(q)
 
-    await context.db.main.flush()
+# Keyed by token in the database, not the encapsulated one.
+_session_cache: dict[str, _CachedSession] = {}
+_pending_access: dict[str, int] = {}
+_flush_task: asyncio.Task | None = None
+
+
+def _forget_session(token: str):
+    global _session_cache, _pending_access
+    _session_cache.pop(token, None)
+    _pending_access.pop(token, None)
+
+
+def forget_user_sessions(user_id: int):
+    """Drop remembered sessions of an user in this server worker."""
+    global _session_cache
+
+    for token in [k for k, v in _session_cache.items() if v.data.user_id == user_id]:
+        _forget_session(token)
+
+
+async def write_access_time(context: BasicSchoolIdolContext, /):
+    """Write coalesced session last access time to the database."""
+    global _pending_access
+
+    if _pending_access:
+        pending = _pending_access
+        _pending_access = {}
+        q = (
+            sqlalchemy.update(main.Session)
+            .where(main.Session.token == sqlalchemy.bindparam("b_token"))
+            .values(last_accessed=sqlalchemy.bindparam("b_last_accessed"))
+        )
+        connection = await context.db.main.connection()
+        await connection.execute(q, [{"b_token": k, "b_last_accessed": v} for k, v in pending.items()])
+
+
+async def _flush_loop():
+    global _session_cache
+
+    interval = config.get_session_cache_interval()
+    while True:
+        await asyncio.sleep(interval)
 
+        try:
+            async with BasicSchoolIdolContext() as context:
+                await write_access_time(context)
+        except Exception as e:
+            util.log("Unable to write session access time", severity=util.logging.ERROR, e=e)
+
+        # These needs to be checked against the database again anyway.
+        t = util.time()
+        for token in [k for k, v in _session_cache.items() if (t - v.checked) >= interval]:
+            _session_cache.pop(token, None)
+
+
+@app.on_startup
+async def start_flush_task():
+    global _flush_task
+
+    if config.get_session_cache_interval() > 0:
+        _flush_task = asyncio.create_task(_flush_loop())
 
-_currently_cleaning = False
 
+@app.on_shutdown
+async def stop_flush_task():
+    global _flush_task
 
-async def try_cleanup_tokens():
-    global _currently_cleaning
-    if not _currently_cleaning:
-        _currently_cleaning = True
-        await asyncio.sleep(5)
+    if _flush_task is not None:
+        _flush_task.cancel()
+        _flush_task = None
         async with BasicSchoolIdolContext() as context:
-            await cleanup_session_table(context)
-        _currently_cleaning = False
+            await write_access_time(context)
 
 
-async def decapsulate_token(context: BasicSchoolIdolContext, token_data: str):
+def get_expired_session_filters(t: int):
+    """Get filters of session rows that can be deleted at time `t`."""
+    result = [
+        sqlalchemy.and_(main.Session.user_id == None, main.Session.last_accessed < (t - FIRST_STAGE_TOKEN_MAX_DURATION))
+    ]
+
+    expiry_time = config.get_session_expiry_time()
+    if expiry_time > 0:
+        result.append(main.Session.last_accessed < (t - expiry_time))
+
+    return result
+
+
+def _decode_token(token_data: str):
     encoded_data = base64.urlsafe_b64decode(token_data)
     salt, result = encoded_data[:SALT_SIZE], encoded_data[SALT_SIZE:]
     try:
         token: str = TOKEN_SERIALIZER.loads(result, salt)
     except itsdangerous.BadSignature:
         return None
+    return token
+
+
+async def decapsulate_token(context: BasicSchoolIdolContext, token_data: str):
+    global _session_cache, _pending_access
+
+    token = _decode_token(token_data)
+    if token is None:
+        return None
+
+    t = util.time()
+    interval = config.get_session_cache_interval()
+    cached = _session_cache.get(token)
+    if cached is not None and (t - cached.checked) < interval:
+        cached.last_accessed = t
+        _pending_access[token] = t
+        return cached.data
 
     # Get token
     q = sqlalchemy.select(main.Session).where(main.Session.token == token)
     expiry_time = config.get_session_expiry_time()
     if expiry_time > 0:
-        q = q.where(main.Session.last_accessed >= (util.time() - expiry_time))
+        q = q.where(main.Session.last_accessed >= (t - expiry_time))
 
     result = await context.db.main.execute(q)
     session = result.scalar()
     if session is None:
+        _forget_session(token)
         return None
 
-    session.last_accessed = util.time()
-    return TokenData(client_key=session.client_key, server_key=session.server_key, user_id=session.user_id or 0)
+    token_result = TokenData(client_key=session.client_key, server_key=session.server_key, user_id=session.user_id or 0)
+    if interval > 0:
+        _session_cache[token] = _CachedSession(data=token_result, checked=t, last_accessed=t)
+        _pending_access[token] = t
+    else:
+        session.last_accessed = t
+    return token_result
 
 
 async def invalidate_current(context: SchoolIdolParams):
     if context.token_text is not None:
+        token = _decode_token(context.token_text)
+        if token is not None:
+            _forget_session(token)
+
         q = sqlalchemy.delete(main.Session).where(main.Session.token == context.token_text)
         await context.db.main.execute(q)
         await context.db.main.flush()
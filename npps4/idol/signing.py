@@ -0,0 +1,54 @@
+import asyncio
+import collections
+import concurrent.futures
+import time
+
+from .. import metrics
+from .. import util
+from ..config import config
+
+_executor: concurrent.futures.ThreadPoolExecutor | None = None
+_signatures: collections.OrderedDict[bytes, str] = collections.OrderedDict()
+
+
+def _get_executor():
+    global _executor
+
+    # Created on first use so each server worker gets its own threads.
+    if _executor is None:
+        _executor = concurrent.futures.ThreadPoolExecutor(config.get_signing_threads(), "npps4_sign")
+    return _executor
+
+
+def _remember(digest: bytes, signature: str):
+    global _signatures
+
+    cache_size = config.get_signature_cache_size()
+    if cache_size > 0:
+        _signatures[digest] = signature
+        while len(_signatures) > cache_size:
+            _signatures.popitem(last=False)
+
+
+async def sign(content: bytes, request_xmc_hex: str | None):
+    """Sign response for X-Message-Sign header."""
+    global _signatures
+
+    start = time.perf_counter()
+    sha1 = util.message_digest(content, request_xmc_hex)
+    digest = sha1.digest()
+    signature = _signatures.get(digest)
+
+    if signature is None:
+        if config.get_signing_threads() > 0:
+            loop = asyncio.get_running_loop()
+            signature = await loop.run_in_executor(_get_executor(), util.sign_digest, sha1)
+        else:
+            signature = util.sign_digest(sha1)
+        _remember(digest, signature)
+    else:
+        _signatures.move_to_end(digest)
+        metrics.SIGNING_CACHE_HITS.inc()
+
+    metrics.SIGNING_DURATION.observe(time.perf_counter() - start)
+    return signature
@@ -0,0 +1,173 @@
+import asyncio
+import time
+import uuid
+
+import sqlalchemy
+import sqlalchemy.exc
+import sqlalchemy.orm
+
+from . import idol
+from . import metrics
+from . import util
+from .app import app
+from .config import config
+from .db import main
+from .idol import session
+
+from typing import Any, cast
+
+LEASE_NAME = "maintenance"
+DELETE_CHUNK_SIZE = 500
+
+# Identifies this server process in the maintenance lease. Generated on startup so forked workers get their own.
+_owner = ""
+_maintenance_task: asyncio.Task | None = None
+
+
+async def _acquire_lease(duration: int):
+    """Acquire or renew the maintenance lease. Returns True if this process holds it."""
+    t = util.time()
+
+    async with idol.BasicSchoolIdolContext() as context:
+        q = (
+            sqlalchemy.update(main.MaintenanceLease)
+            .where(
+                main.MaintenanceLease.name == LEASE_NAME,
+                sqlalchemy.or_(main.MaintenanceLease.owner == _owner, main.MaintenanceLease.expire_date < t),
+            )
+            .values(owner=_owner, expire_date=t + duration)
+        )
+        result = cast(sqlalchemy.CursorResult, await context.db.main.execute(q))
+        if result.rowcount > 0:
+            return True
+
+        lease = await context.db.main.get(main.MaintenanceLease, LEASE_NAME)
+        if lease is not None:
+            return False
+
+    # No one held the lease before. If other process inserts it first, it wins.
+    try:
+        async with idol.BasicSchoolIdolContext() as context:
+            context.db.main.add(main.MaintenanceLease(name=LEASE_NAME, owner=_owner, expire_date=t + duration))
+    except sqlalchemy.exc.IntegrityError:
+        return False
+
+    return True
+
+
+async def _release_lease():
+    async with idol.BasicSchoolIdolContext() as context:
+        q = (
+            sqlalchemy.update(main.MaintenanceLease)
+            .where(main.MaintenanceLease.name == LEASE_NAME, main.MaintenanceLease.owner == _owner)
+            .values(expire_date=0)
+        )
+        await context.db.main.execute(q)
+
+
+async def delete_in_chunks(task: str, id_column: sqlalchemy.orm.InstrumentedAttribute[int], *filters: Any):
+    """Delete rows matching `filters`, at most `DELETE_CHUNK_SIZE` rows per transaction."""
+    table = id_column.class_
+    deleted = 0
+
+    while True:
+        async with idol.BasicSchoolIdolContext() as context:
+            q = sqlalchemy.select(id_column).where(*filters).limit(DELETE_CHUNK_SIZE)
+            result = await context.db.main.execute(q)
+            ids = list(result.scalars())
+
+            if ids:
+                q = sqlalchemy.delete(table).where(id_column.in_(ids))
+                await context.db.main.execute(q)
+
+        deleted = deleted + len(ids)
+        if len(ids) < DELETE_CHUNK_SIZE:
+            break
+
+        # Let requests run in-between chunks.
+        await asyncio.sleep(0)
+
+    metrics.MAINTENANCE_DELETED_ROWS.inc(deleted, task)
+    return deleted
+
+
+async def cleanup_sessions():
+    # Make sure recently used sessions are not deleted.
+    async with idol.BasicSchoolIdolContext() as context:
+        await session.write_access_time(context)
+
+    for f in session.get_expired_session_filters(util.time()):
+        await delete_in_chunks("session", main.Session.id, f)
+
+
+async def cleanup_incentives():
+    t = util.time()
+    await delete_in_chunks(
+        "incentive", main.Incentive.id, main.Incentive.expire_date != 0, main.Incentive.expire_date < t
+    )
+
+
+async def cleanup_daily_rankings():
+    two_days_ago = util.get_days_since_unix() - 2
+    await delete_in_chunks("daily_ranking", main.PlayerRanking.id, main.PlayerRanking.day <= two_days_ago)
+
+
+async def cleanup_request_cache():
+    t = util.time()
+    await delete_in_chunks("request_cache", main.RequestCache.id, main.RequestCache.expire_date < t)
+
+
+TASKS = {
+    "session": cleanup_sessions,
+    "request_cache": cleanup_request_cache,
+    "incentive": cleanup_incentives,
+    "daily_ranking": cleanup_daily_rankings,
+}
+
+
+async def run_maintenance():
+    for name, task in TASKS.items():
+        start = time.perf_counter()
+        try:
+            await task()
+        except Exception as e:
+            util.log("Maintenance task failed", name, severity=util.logging.ERROR, e=e)
+        metrics.MAINTENANCE_DURATION.observe(time.perf_counter() - start, name)
+
+
+async def _maintenance_loop():
+    interval = config.get_maintenance_interval()
+
+    while True:
+        try:
+            # Lease outlives a few missed renewals so a slow run doesn't cause another process to take over.
+            if await _acquire_lease(interval * 3):
+                await run_maintenance()
+        except Exception as e:
+            util.log("Unable to run maintenance", severity=util.logging.ERROR, e=e)
+
+        await asyncio.sleep(interval)
+
+
+@app.on_startup
+async def start_maintenance_task():
+    global _maintenance_task, _owner
+
+    if config.get_maintenance_interval() > 0:
+        _owner = uuid.uuid4().hex
+        _maintenance_task = asyncio.create_task(_maintenance_loop())
+
+
+@app.on_shutdown
+async def stop_maintenance_task():
+    global _maintenance_task
+
+    if _maintenance_task is not None:
+        _maintenance_task.cancel()
+        _maintenance_task = None
+
+        # Let other process take over immediately.
+        try:
+            await _release_lease()
+        except Exception as e:
+            util.log("Unable to release maintenance lease", severity=util.logging.WARNING, e=e)
@@ -0,0 +1,311 @@
+import asyncio
+import bisect
+import collections.abc
+import contextvars
+import functools
+import json
+import os
+import time
+
+import sqlalchemy.engine
+import sqlalchemy.event
+
+from . import util
+from .app import app
+from .config import config
+
+from typing import Any, Callable
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        # Last one is the +Inf bucket.
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum = self.sum + value
+        self.count = self.count + 1
+
+    def merge(self, other: "Histogram"):
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.sum = self.sum + other.sum
+        self.count = self.count + other.count
+
+    def quantile(self, q: float):
+        """Estimate quantile, as upper bound of the bucket it falls into."""
+        target = self.count * q
+        cumulative = 0
+        for i, c in enumerate(self.counts):
+            cumulative = cumulative + c
+            if cumulative >= target and cumulative > 0:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return 0.0
+
+    def to_json(self):
+        return {"buckets": list(self.buckets), "counts": self.counts, "sum": self.sum, "count": self.count}
+
+    @staticmethod
+    def from_json(data: dict[str, Any]):
+        result = Histogram(tuple(data["buckets"]))
+        result.counts = list(data["counts"])
+        result.sum = data["sum"]
+        result.count = data["count"]
+        return result
+
+
+class Family:
+    """Group of metrics with same name, optionally distinguished by single label."""
+
+    def __init__(self, name: str, kind: str, help: str, label: str | None = None):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.label = label
+        self.values: dict[str, Histogram | float] = {}
+
+    def observe(self, value: float, label_value: str = ""):
+        histogram = self.values.get(label_value)
+        if histogram is None:
+            histogram = Histogram()
+            self.values[label_value] = histogram
+        assert isinstance(histogram, Histogram)
+        histogram.observe(value)
+
+    def inc(self, amount: float = 1, label_value: str = ""):
+        value = self.values.get(label_value, 0)
+        assert not isinstance(value, Histogram)
+        self.values[label_value] = value + amount
+
+
+ENDPOINT_DURATION = Family(
+    "npps4_endpoint_duration_seconds", "histogram", "Time taken to process endpoint.", "endpoint"
+)
+ENDPOINT_SQL_STATEMENTS = Family(
+    "npps4_endpoint_sql_statements_total", "counter", "SQL statements executed by endpoint.", "endpoint"
+)
+SQL_STATEMENTS = Family("npps4_sql_statements_total", "counter", "SQL statements executed.", "database")
+SERIALIZATION_DURATION = Family(
+    "npps4_serialization_duration_seconds", "histogram", "Time taken to encode response data to JSON."
+)
+SIGNING_DURATION = Family("npps4_signing_duration_seconds", "histogram", "Time taken to sign response.")
+SIGNING_CACHE_HITS = Family("npps4_signing_cache_hits_total", "counter", "Responses signed using cached signature.")
+MAINTENANCE_DELETED_ROWS = Family(
+    "npps4_maintenance_deleted_rows_total", "counter", "Rows deleted by periodic maintenance.", "task"
+)
+MAINTENANCE_DURATION = Family(
+    "npps4_maintenance_duration_seconds", "histogram", "Time taken to run periodic maintenance task.", "task"
+)
+
+FAMILIES = (
+    ENDPOINT_DURATION,
+    ENDPOINT_SQL_STATEMENTS,
+    SQL_STATEMENTS,
+    SERIALIZATION_DURATION,
+    SIGNING_DURATION,
+    SIGNING_CACHE_HITS,
+    MAINTENANCE_DELETED_ROWS,
+    MAINTENANCE_DURATION,
+)
+
+# SQL statement counter of the endpoint currently being processed.
+_sql_counter: contextvars.ContextVar[list[int] | None] = contextvars.ContextVar("_sql_counter", default=None)
+_database_names: dict[int, str] = {}
+
+
+@sqlalchemy.event.listens_for(sqlalchemy.engine.Engine, "before_cursor_execute")
+def _count_statement(conn: sqlalchemy.engine.Connection, cursor, statement, parameters, context, executemany):
+    counter = _sql_counter.get()
+    if counter is not None:
+        counter[0] = counter[0] + 1
+
+    engine = conn.engine
+    database = _database_names.get(id(engine))
+    if database is None:
+        database = os.path.basename(str(engine.url.database))
+        _database_names[id(engine)] = database
+    SQL_STATEMENTS.inc(1, database)
+
+
+class measure_endpoint:
+    """Record time taken and SQL statements executed under specified endpoint name."""
+
+    __slots__ = ("name", "start", "counter", "token")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = 0
+        self.counter = [0]
+        self.token: contextvars.Token[list[int] | None] | None = None
+
+    def __enter__(self):
+        self.token = _sql_counter.set(self.counter)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        ENDPOINT_DURATION.observe(time.perf_counter() - self.start, self.name)
+        ENDPOINT_SQL_STATEMENTS.inc(self.counter[0], self.name)
+
+        assert self.token is not None
+        _sql_counter.reset(self.token)
+
+        # Statements of nested endpoint (/api batch) counts toward the outer one too.
+        parent = _sql_counter.get()
+        if parent is not None:
+            parent[0] = parent[0] + self.counter[0]
+
+        return None
+
+
+def instrument_endpoint[**P, T](name: str):
+    def wrap(f: Callable[P, collections.abc.Awaitable[T]]):
+        @functools.wraps(f)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs):
+            with measure_endpoint(name):
+                return await f(*args, **kwargs)
+
+        return wrapper
+
+    return wrap
+
+
+def _format_value(value: float):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _escape_label(value: str):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict[str, str]):
+    if labels:
+        return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels.items()) + "}"
+    return ""
+
+
+def render_prometheus(families: collections.abc.Iterable[Family] = FAMILIES):
+    """Render metrics in Prometheus text exposition format."""
+    lines: list[str] = []
+
+    for family in families:
+        lines.append(f"# HELP {family.name} {family.help}")
+        lines.append(f"# TYPE {family.name} {family.kind}")
+
+        for label_value, value in sorted(family.values.items()):
+            labels = {} if family.label is None else {family.label: label_value}
+
+            if isinstance(value, Histogram):
+                cumulative = 0
+                for bucket, c in zip(value.buckets + (float("inf"),), value.counts):
+                    cumulative = cumulative + c
+                    bucket_labels = _format_labels(labels | {"le": _format_value(bucket)})
+                    lines.append(f"{family.name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{family.name}_sum{_format_labels(labels)} {_format_value(value.sum)}")
+                lines.append(f"{family.name}_count{_format_labels(labels)} {value.count}")
+            else:
+                lines.append(f"{family.name}{_format_labels(labels)} {_format_value(value)}")
+
+    lines.append("")
+    return "\n".join(lines)
+
+
+def to_json():
+    return {
+        family.name: {k: v.to_json() if isinstance(v, Histogram) else v for k, v in family.values.items()}
+        for family in FAMILIES
+    }
+
+
+def get_snapshot_directory():
+    return os.path.join(config.get_data_directory(), "metrics")
+
+
+def load_snapshots():
+    """Merge metrics snapshot of all live server workers."""
+    interval = config.get_metrics_snapshot_interval()
+    families = [Family(f.name, f.kind, f.help, f.label) for f in FAMILIES]
+    snapshot_dir = get_snapshot_directory()
+
+    if interval > 0 and os.path.isdir(snapshot_dir):
+        now = time.time()
+
+        for filename in os.listdir(snapshot_dir):
+            path = os.path.join(snapshot_dir, filename)
+            try:
+                # Snapshot that's not updated for a while belongs to dead worker.
+                if not filename.endswith(".json") or os.path.getmtime(path) < (now - interval * 3):
+                    continue
+                with open(path, "r", encoding="utf-8") as f:
+                    snapshot: dict[str, dict[str, Any]] = json.load(f)
+            except (OSError, ValueError):
+                continue
+
+            for family in families:
+                for k, v in snapshot.get(family.name, {}).items():
+                    if isinstance(v, dict):
+                        histogram = family.values.get(k)
+                        if histogram is None:
+                            family.values[k] = Histogram.from_json(v)
+                        else:
+                            assert isinstance(histogram, Histogram)
+                            histogram.merge(Histogram.from_json(v))
+                    else:
+                        family.inc(v, k)
+
+    return families
+
+
+def _write_snapshot():
+    snapshot_dir = get_snapshot_directory()
+    os.makedirs(snapshot_dir, exist_ok=True)
+    path = os.path.join(snapshot_dir, f"{os.getpid()}.json")
+
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(to_json(), f)
+    os.replace(path + ".tmp", path)
+
+
+_snapshot_task: asyncio.Task | None = None
+
+
+async def _snapshot_loop():
+    interval = config.get_metrics_snapshot_interval()
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            _write_snapshot()
+        except OSError as e:
+            util.log("Unable to write metrics snapshot", severity=util.logging.WARNING, e=e)
+
+
+@app.on_startup
+async def start_snapshot_task():
+    global _snapshot_task
+
+    if config.get_metrics_snapshot_interval() > 0:
+        _snapshot_task = asyncio.create_task(_snapshot_loop())
+
+
+@app.on_shutdown
+async def stop_snapshot_task():
+    global _snapshot_task
+
+    if _snapshot_task is not None:
+        _snapshot_task.cancel()
+        _snapshot_task = None
+
+        try:
+            os.remove(os.path.join(get_snapshot_directory(), f"{os.getpid()}.json"))
+        except OSError:
+            pass
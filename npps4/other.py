@@ -2,6 +2,7 @@ import os
 
 import fastapi
 
+from . import metrics
 from .app import app
 from .config import config
 
@@ -30,3 +31,13 @@ async def server_info(filehash: str):
             )
     else:
         raise fastapi.exceptions.HTTPException(404, "Not found")
+
+
+if config.is_metrics_endpoint_enabled():
+
+    @app.core.get("/metrics", include_in_schema=False, response_class=fastapi.responses.PlainTextResponse)
+    async def prometheus_metrics():
+        """
+        Get metrics of the server worker answering this request, in Prometheus text format.
+        """
+        return fastapi.responses.PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
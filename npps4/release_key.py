@@ -1,7 +1,19 @@
 _RELEASE_KEYS: dict[int, str] = {}
+_generation = 0
 
 get = _RELEASE_KEYS.get
-update = _RELEASE_KEYS.update
+
+
+def update(keys: dict[int, str], /):
+    global _RELEASE_KEYS, _generation
+    _RELEASE_KEYS.update(keys)
+    _generation = _generation + 1
+
+
+def generation():
+    """Number that changes every time the release key set is modified."""
+    global _generation
+    return _generation
 
 
 def formatted():
@@ -5,10 +5,15 @@ import logging
 import fastapi
 
 from .. import game
+from .. import idol
+from .. import maintenance
 from .. import webview
 from .. import other
 from .. import util
 from ..app import app
+from ..config import config
+from ..system import achievement
+from ..system import unit
 
 from typing import Annotated
 
@@ -20,6 +25,15 @@ async def not_found_handler(module: str, action: str, request_data: Annotated[by
     raise fastapi.HTTPException(404)
 
 
+@app.on_startup
+async def preload_master_data():
+    if config.is_master_data_preloaded():
+        util.log("Preloading master data", severity=logging.INFO)
+        async with idol.BasicSchoolIdolContext() as context:
+            await unit.preload_pattern_tables(context)
+            await achievement.get_achievement_graph(context)
+
+
 app.core.include_router(app.main)
 app.core.include_router(app.webview)
 main = app.core
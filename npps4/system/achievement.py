@@ -11,6 +11,7 @@ import sqlalchemy
 from . import advanced
 from . import album
 from . import common
+from . import counter
 from . import item
 from . import item_model
 from . import unit
@@ -23,7 +24,7 @@ from .. import util
 from ..db import achievement
 from ..db import main
 
-from typing import Any
+from typing import Any, Callable, cast
 
 ACHIEVEMENT_REWARD_DEFAULT = [item.base_loveca(1)]
 
@@ -100,6 +101,24 @@ class AchievementContext:
         return len(self.accomplished) > 0 and len(self.new) > 0
 
 
+@dataclasses.dataclass(slots=True)
+class UserAchievementState:
+    """Snapshot of user achievements, shared by all checkers within single `check` call."""
+
+    owned: dict[int, main.Achievement]
+    """Achievement ID to user achievement row, including rows added during the check."""
+    accomplished: dict[int, main.Achievement]
+
+    def add(self, ach: main.Achievement):
+        self.owned[ach.achievement_id] = ach
+        if ach.is_accomplished:
+            self.accomplished[ach.achievement_id] = ach
+
+    def mark_accomplished(self, ach: main.Achievement):
+        ach.is_accomplished = True
+        self.accomplished[ach.achievement_id] = ach
+
+
 @dataclasses.dataclass(kw_only=True)
 class AchievementUpdateLiveClear:
     """Instantiate this to perform checks on achievement with "Live Clear" trigger."""
@@ -537,7 +556,7 @@ class CheckCollectUniqueUnit(AchievementChecker[AchievementUpdateNewUnit]):
         data: AchievementUpdateNewUnit,
         achievement_info: achievement.Achievement,
     ) -> int:
-        return await album.count_album_with(context, user)
+        return await album.get_album_count(context, user)
 
     async def is_accomplished(
         self, context: idol.BasicSchoolIdolContext, value: int, achievement_info: achievement.Achievement
@@ -572,7 +591,7 @@ class CheckRankUpUniqueUnit(AchievementChecker[AchievementUpdateUnitRankUp]):
         data: AchievementUpdateUnitRankUp,
         achievement_info: achievement.Achievement,
     ) -> int:
-        return await album.count_album_with(context, user, main.Album.rank_max_flag == True)
+        return await album.get_album_count(context, user, counter.ALBUM_RANK_MAX)
 
     async def is_accomplished(
         self, context: idol.BasicSchoolIdolContext, value: int, achievement_info: achievement.Achievement
@@ -607,7 +626,7 @@ class CheckMaxLoveUnit(AchievementChecker[AchievementUpdateUnitMaxLove]):
         data: AchievementUpdateUnitMaxLove,
         achievement_info: achievement.Achievement,
     ) -> int:
-        return await album.count_album_with(context, user, main.Album.love_max_flag == True)
+        return await album.get_album_count(context, user, counter.ALBUM_LOVE_MAX)
 
     async def is_accomplished(
         self, context: idol.BasicSchoolIdolContext, value: int, achievement_info: achievement.Achievement
@@ -642,7 +661,7 @@ class CheckMaxLevelUnit(AchievementChecker[AchievementUpdateUnitMaxLevel]):
         data: AchievementUpdateUnitMaxLevel,
         achievement_info: achievement.Achievement,
     ) -> int:
-        return await album.count_album_with(context, user, main.Album.rank_level_max_flag == True)
+        return await album.get_album_count(context, user, counter.ALBUM_RANK_LEVEL_MAX)
 
     async def is_accomplished(
         self, context: idol.BasicSchoolIdolContext, value: int, achievement_info: achievement.Achievement
@@ -1024,7 +1043,7 @@ class CheckAchievementClear(AchievementChecker[AchievementUpdateAchievementCompl
         if achievement_info.params1 is None or achievement_info.params2 is None:
             return False
 
-        ach_id_in_cat = set(await get_achievement_ids_from_category(context, achievement_info.params1))
+        ach_id_in_cat = await get_achievement_ids_from_category(context, achievement_info.params1)
         for ach_id in data.completed_achievement_id:
             if ach_id in ach_id_in_cat:
                 return True
@@ -1035,8 +1054,7 @@ class CheckAchievementClear(AchievementChecker[AchievementUpdateAchievementCompl
         self, context: idol.BasicSchoolIdolContext, user: main.User, achievement_info: achievement.Achievement
     ) -> int:
         assert achievement_info.params1 is not None
-        ach_id_in_cat = set(await get_achievement_ids_from_category(context, achievement_info.params1))
-        return await count_accomplished_achievement_by_set(context, user, ach_id_in_cat)
+        return await count_accomplished_achievement_in_category(context, user, achievement_info.params1)
 
     def maxvalue(self, achievement_info: achievement.Achievement) -> int:
         assert achievement_info.params2 is not None
@@ -1051,10 +1069,8 @@ class CheckAchievementClear(AchievementChecker[AchievementUpdateAchievementCompl
         achievement_info: achievement.Achievement,
     ) -> int:
         assert achievement_info.params1 is not None
-        ach_id_in_cat = set(await get_achievement_ids_from_category(context, achievement_info.params1))
-        completed_ach_id = set(data.completed_achievement_id)
-        total_ach = await count_accomplished_achievement_by_set(context, user, ach_id_in_cat)
-        return total_ach + len(ach_id_in_cat.intersection(completed_ach_id))
+        # Completed achievements are already counted when they're marked as accomplished.
+        return await count_accomplished_achievement_in_category(context, user, achievement_info.params1)
 
     async def is_accomplished(
         self, context: idol.BasicSchoolIdolContext, value: int, achievement_info: achievement.Achievement
@@ -1149,14 +1165,8 @@ class CheckTotalLiveClear(AchievementChecker[AchievementUpdateLiveClear]):
     async def initvalue(
         self, context: idol.BasicSchoolIdolContext, user: main.User, achievement_info: achievement.Achievement
     ) -> int:
-        q = (
-            sqlalchemy.select(main.Achievement.count)
-            .where(main.Achievement.user_id == user.id, main.Achievement.achievement_type == 58)
-            .order_by(main.Achievement.count.desc())
-            .limit(1)
-        )
-        result = await context.db.main.execute(q)
-        return result.scalar() or 0
+        state = await get_user_achievement_state(context, user)
+        return max((ach.count for ach in state.owned.values() if ach.achievement_type == 58), default=0)
 
     def maxvalue(self, achievement_info: achievement.Achievement) -> int:
         assert achievement_info.params1 is not None
@@ -1221,34 +1231,76 @@ class CheckLoginOnSpecificTime(AchievementChecker[AchievementUpdateLoginBonus]):
         return value > 0
 
 
-@common.context_cacheable("achievement")
+@dataclasses.dataclass(slots=True)
+class AchievementGraph:
+    """Process-wide index of the achievement master data."""
+
+    info: dict[int, achievement.Achievement] = dataclasses.field(default_factory=dict)
+    """Decrypted achievement rows. Rows without release key are not included."""
+    next_ids: dict[int, list[int]] = dataclasses.field(default_factory=dict)
+    """Achievement ID to achievements it opens."""
+    prerequisite_ids: dict[int, frozenset[int]] = dataclasses.field(default_factory=dict)
+    """Achievement ID to achievements that must be accomplished to open it."""
+    ids_by_type: dict[int, list[int]] = dataclasses.field(default_factory=dict)
+    ids_by_category: dict[int, frozenset[int]] = dataclasses.field(default_factory=dict)
+    category_ids: dict[int, list[int]] = dataclasses.field(default_factory=dict)
+    """Achievement ID to categories it belongs to."""
+    ids_by_reset_type: dict[int, list[int]] = dataclasses.field(default_factory=dict)
+
+
+async def _build_achievement_graph(context: idol.BasicSchoolIdolContext, _: int, /):
+    graph = AchievementGraph()
+
+    result = await context.db.achievement.execute(sqlalchemy.select(achievement.Achievement))
+    for ach in result.scalars():
+        info = db.decrypt_row(context.db.achievement, ach)
+        if info is not None:
+            graph.info[info.achievement_id] = info
+            graph.ids_by_type.setdefault(info.achievement_type, []).append(info.achievement_id)
+            if info.reset_type > 0:
+                graph.ids_by_reset_type.setdefault(info.reset_type, []).append(info.achievement_id)
+
+    prerequisite_ids: dict[int, set[int]] = {}
+    result = await context.db.achievement.execute(sqlalchemy.select(achievement.Story))
+    for story in result.scalars():
+        graph.next_ids.setdefault(story.achievement_id, []).append(story.next_achievement_id)
+        prerequisite_ids.setdefault(story.next_achievement_id, set()).add(story.achievement_id)
+    graph.prerequisite_ids = {k: frozenset(v) for k, v in prerequisite_ids.items()}
+
+    ids_by_category: dict[int, set[int]] = {}
+    result = await context.db.achievement.execute(sqlalchemy.select(achievement.Tag))
+    for tag in result.scalars():
+        ids_by_category.setdefault(tag.achievement_category_id, set()).add(tag.achievement_id)
+        graph.category_ids.setdefault(tag.achievement_id, []).append(tag.achievement_category_id)
+    graph.ids_by_category = {k: frozenset(v) for k, v in ids_by_category.items()}
+
+    return graph
+
+
+async def get_achievement_graph(context: idol.BasicSchoolIdolContext):
+    return await common.get_master_cached(context, "achievement_graph", 0, _build_achievement_graph)
+
+
 async def get_achievement_info(context: idol.BasicSchoolIdolContext, achievement_id: int):
-    info = await db.get_decrypted_row(context.db.achievement, achievement.Achievement, achievement_id)
+    graph = await get_achievement_graph(context)
+    info = graph.info.get(achievement_id)
     if info is None:
         raise ValueError("invalid achievement")
 
     return info
 
 
-@common.context_cacheable("achievement_story")
 async def get_next_achievement_ids(context: idol.BasicSchoolIdolContext, achievement_id: int):
-    q = sqlalchemy.select(achievement.Story.next_achievement_id).where(
-        achievement.Story.achievement_id == achievement_id
-    )
-    result = await context.db.achievement.execute(q)
-    return list(result.scalars())
+    graph = await get_achievement_graph(context)
+    return graph.next_ids.get(achievement_id, [])
 
 
-@common.context_cacheable("achievement_reverse_story")
 async def get_prerequisite_achievement_ids(context: idol.BasicSchoolIdolContext, achievement_id: int):
-    q = sqlalchemy.select(achievement.Story.achievement_id).where(
-        achievement.Story.next_achievement_id == achievement_id
-    )
-    result = await context.db.achievement.execute(q)
-    return list(result.scalars())
+    graph = await get_achievement_graph(context)
+    return graph.prerequisite_ids.get(achievement_id, frozenset())
 
 
-@common.context_cacheable("achievement_unit_type_group")
+@common.master_cacheable("achievement_unit_type_group")
 async def get_unit_type_groups(context: idol.BasicSchoolIdolContext, achievement_unit_type_group_id: int):
     q = sqlalchemy.select(achievement.UnitTypeGroup).where(
         achievement.UnitTypeGroup.achievement_unit_type_group_id == achievement_unit_type_group_id
@@ -1262,13 +1314,9 @@ async def get_unit_type_groups(context: idol.BasicSchoolIdolContext, achievement
     return final_result
 
 
-@common.context_cacheable("achievement_category")
 async def get_achievement_ids_from_category(context: idol.BasicSchoolIdolContext, achievement_category_id: int):
-    q = sqlalchemy.select(achievement.Tag.achievement_id).where(
-        achievement.Tag.achievement_category_id == achievement_category_id
-    )
-    result = await context.db.achievement.execute(q)
-    return list(result.scalars())
+    graph = await get_achievement_graph(context)
+    return graph.ids_by_category.get(achievement_category_id, frozenset())
 
 
 async def add_achievement(
@@ -1282,6 +1330,7 @@ async def add_achievement(
     if time is None:
         time = util.time()
 
+    reset_period = RESETTABLE_ACHIEVEMENT_PERIOD.get(ach.reset_type)
     user_ach = main.Achievement(
         achievement_id=ach.achievement_id,
         user_id=user.id,
@@ -1293,6 +1342,7 @@ async def add_achievement(
         end_date=0 if ach.end_date is None else util.datetime_to_timestamp(ach.end_date),
         is_new=True,
         reset_type=ach.reset_type,
+        reset_value=0 if reset_period is None else reset_period(time),
     )
     context.db.main.add(user_ach)
     if flush:
@@ -1300,6 +1350,20 @@ async def add_achievement(
     return user_ach
 
 
+async def get_user_achievement_state(context: idol.BasicSchoolIdolContext, user: main.User):
+    state: UserAchievementState | None = context.get_cache("user_achievement_state", user.id)
+
+    if state is None:
+        q = sqlalchemy.select(main.Achievement).where(main.Achievement.user_id == user.id)
+        result = await context.db.main.execute(q)
+        state = UserAchievementState({}, {})
+        for ach in result.scalars():
+            state.add(ach)
+        context.set_cache("user_achievement_state", user.id, state)
+
+    return state
+
+
 async def has_achievement(context: idol.BasicSchoolIdolContext, user: main.User, /, achievement_id: int):
     q = sqlalchemy.select(main.Achievement.achievement_id).where(
         main.Achievement.achievement_id == achievement_id, main.Achievement.user_id == user.id
@@ -1308,49 +1372,58 @@ async def has_achievement(context: idol.BasicSchoolIdolContext, user: main.User,
     return result.scalar() is not None
 
 
+# Achievement reset_type to function that returns the current period.
+RESETTABLE_ACHIEVEMENT_PERIOD: dict[int, Callable[[int], int]] = {
+    1: util.get_days_since_unix,
+    2: util.get_weeks_since_unix,
+    3: util.get_months_since_unix,
+}
+
+
 async def update_resettable_achievement(
     context: idol.BasicSchoolIdolContext, user: main.User, ts: int | None = None, /
 ):
     if ts is None:
         ts = util.time()
 
-    if context.get_cache(f"update_resettable_achievement_{ts}", user.id) is not None:
-        return
-
+    graph: AchievementGraph | None = None
     modified = False
-    q = sqlalchemy.select(main.Achievement).where(
-        main.Achievement.user_id == user.id,
-        main.Achievement.reset_type > 0,
-        sqlalchemy.or_(
-            sqlalchemy.and_(
-                main.Achievement.reset_type == 1, main.Achievement.reset_value != util.get_days_since_unix(ts)
-            ),
-            sqlalchemy.and_(
-                main.Achievement.reset_type == 2, main.Achievement.reset_value != util.get_weeks_since_unix(ts)
-            ),
-            sqlalchemy.and_(
-                main.Achievement.reset_type == 3, main.Achievement.reset_value != util.get_months_since_unix(ts)
-            ),
-        ),
-    )
-    result = await context.db.main.execute(q)
 
-    for ach_data in result.scalars():
-        ach_info = await context.db.achievement.get(achievement.Achievement, ach_data.achievement_id)
+    for reset_type, get_period in RESETTABLE_ACHIEVEMENT_PERIOD.items():
+        # Only do the work once per period boundary.
+        period = get_period(ts)
+        epoch_name = counter.achievement_reset(reset_type)
+        if await counter.peek(context, user, epoch_name) == period:
+            continue
 
-        if ach_info is None or (not ach_info.default_open_flag):
-            await context.db.main.delete(ach_data)
-        else:
-            ach_data.is_accomplished = False
-            ach_data.is_reward_claimed = False
-            ach_data.count = 0
+        if graph is None:
+            graph = await get_achievement_graph(context)
 
-        modified = True
+        default_open = [
+            ach_id for ach_id in graph.ids_by_reset_type.get(reset_type, ()) if graph.info[ach_id].default_open_flag
+        ]
+        stale = (
+            main.Achievement.user_id == user.id,
+            main.Achievement.reset_type == reset_type,
+            main.Achievement.reset_value != period,
+        )
 
-    if modified:
-        await context.db.main.flush()
+        # Achievements that's not open by default will be re-opened by their prerequisite.
+        q = sqlalchemy.delete(main.Achievement).where(*stale, main.Achievement.achievement_id.not_in(default_open))
+        result = cast(sqlalchemy.CursorResult, await context.db.main.execute(q))
+        modified = modified or result.rowcount > 0
+        q = (
+            sqlalchemy.update(main.Achievement)
+            .where(*stale)
+            .values(is_accomplished=False, is_reward_claimed=False, count=0, reset_value=period)
+        )
+        result = cast(sqlalchemy.CursorResult, await context.db.main.execute(q))
+        modified = modified or result.rowcount > 0
+
+        await counter.store(context, user, epoch_name, period)
 
-    context.set_cache(f"update_resettable_achievement_{ts}", user.id, True)
+    if modified:
+        await counter.invalidate(context, user, counter.ACHIEVEMENT_CATEGORY_PREFIX)
 
 
 async def to_game_representation(
@@ -1375,10 +1448,12 @@ async def get_achievement_rewards(context: idol.BasicSchoolIdolContext, ach: mai
 
 async def init(context: idol.BasicSchoolIdolContext, user: main.User):
     time = util.time()
-    q = sqlalchemy.select(achievement.Achievement).where(achievement.Achievement.default_open_flag == 1)
-    result = await context.db.achievement.execute(q)
+    graph = await get_achievement_graph(context)
+
+    for ach in graph.info.values():
+        if ach.default_open_flag != 1:
+            continue
 
-    for ach in result.scalars():
         start_date = util.datetime_to_timestamp(ach.start_date)
         end_date = util.datetime_to_timestamp(ach.end_date) if ach.end_date is not None else 0
 
@@ -1472,9 +1547,8 @@ async def get_achievement_count(
 
 
 async def is_unlock_satisfied(context: idol.BasicSchoolIdolContext, target_ach_id: int, *unlocked_ach_ids: int):
-    ach_ids = set(unlocked_ach_ids)
-    prerequisite = set(await get_prerequisite_achievement_ids(context, target_ach_id))
-    return ach_ids.intersection(prerequisite) == prerequisite
+    prerequisite = await get_prerequisite_achievement_ids(context, target_ach_id)
+    return prerequisite.issubset(unlocked_ach_ids)
 
 
 async def get_unlocked_achievements_by_id(
@@ -1502,6 +1576,7 @@ async def _check_impl(
     target_user: main.User,
     update_instance: Any,
     container: AchievementContext,
+    state: UserAchievementState,
 ):
     try:
         info = ACHIEVEMENT_CHECKER[type(update_instance)]
@@ -1515,15 +1590,14 @@ async def _check_impl(
         )
         return
 
+    graph = await get_achievement_graph(context)
     acceptable_achievement_type = set(info.keys())
-    q = sqlalchemy.select(main.Achievement).where(
-        main.Achievement.user_id == target_user.id,
-        main.Achievement.achievement_type.in_(acceptable_achievement_type),
-        main.Achievement.is_accomplished == False,
+    # Rows added by previous passes are already in the state.
+    queue = collections.deque(  # for recursive checkers
+        ach
+        for ach in state.owned.values()
+        if ach.achievement_type in acceptable_achievement_type and not ach.is_accomplished
     )
-    result = await context.db.main.execute(q)
-    queue = collections.deque(result.scalars())  # for recursive checkers
-    queue.extend(c for c in container.new if c.achievement_type in acceptable_achievement_type)
     newly_added: set[int] = set()
 
     for ach in pop_iterator(queue):
@@ -1531,7 +1605,9 @@ async def _check_impl(
             # Likely a duplicate
             continue
 
-        ach_info = await get_achievement_info(context, ach.achievement_id)
+        ach_info = graph.info.get(ach.achievement_id)
+        if ach_info is None:
+            continue
         checker = info.get(ach_info.achievement_type)
 
         if checker is not None and await checker.test_param(context, update_instance, ach_info):
@@ -1540,21 +1616,21 @@ async def _check_impl(
 
             if await checker.is_accomplished(context, ach.count, ach_info):
                 # Accomplished
-                ach.is_accomplished = True
+                state.mark_accomplished(ach)
+                for category_id in graph.category_ids.get(ach.achievement_id, ()):
+                    await counter.increment(context, target_user, counter.achievement_category(category_id))
                 container.add(ach)  # Add to accomplished list
 
                 # Get next achievement
-                for open_ach_id in await get_next_achievement_ids(context, ach.achievement_id):
-                    if await is_unlock_satisfied(
-                        context,
-                        open_ach_id,
-                        *[a.achievement_id for a in container.accomplished],
-                        *await get_unlocked_achievements_by_id(
-                            context, target_user, *await get_prerequisite_achievement_ids(context, open_ach_id)
-                        ),
-                    ) and not await has_achievement(context, target_user, open_ach_id):
-                        new_ach_info = await get_achievement_info(context, open_ach_id)
+                for open_ach_id in graph.next_ids.get(ach.achievement_id, ()):
+                    new_ach_info = graph.info.get(open_ach_id)
+                    if new_ach_info is None:
+                        continue
+
+                    prerequisite = graph.prerequisite_ids.get(open_ach_id, frozenset())
+                    if open_ach_id not in state.owned and prerequisite.issubset(state.accomplished):
                         new_ach = await add_achievement(context, target_user, new_ach_info, flush=False)
+                        state.add(new_ach)
                         container.add(new_ach)
 
                         if checker.recursive:
@@ -1580,12 +1656,13 @@ async def _check_impl(
 
 async def check(context: idol.BasicSchoolIdolContext, target_user: main.User, /, *updates):
     container = AchievementContext()
+    state = await get_user_achievement_state(context, target_user)
 
     for update_instance in updates:
-        await _check_impl(context, target_user, update_instance, container)
+        await _check_impl(context, target_user, update_instance, container, state)
 
     # Anywhere check
-    await _check_impl(context, target_user, AchievementUpdateAnywhere(), container)
+    await _check_impl(context, target_user, AchievementUpdateAnywhere(), container, state)
 
     # Type 53 check
     container.fix()
@@ -1597,8 +1674,12 @@ async def check(context: idol.BasicSchoolIdolContext, target_user: main.User, /,
             completed_achievement_id=[a.achievement_id for a in container.accomplished]
         ),
         type_53_container,
+        state,
     )
 
+    # Achievements may be modified outside of checks so drop the snapshot.
+    context.set_cache("user_achievement_state", target_user.id, None)
+    # New rows are written in single flush.
     await context.db.main.flush()
     return container + type_53_container
 
@@ -1647,6 +1728,16 @@ async def count_accomplished_achievement_by_set(
     return result.scalar() or 0
 
 
+async def count_accomplished_achievement_in_category(
+    context: idol.BasicSchoolIdolContext, user: main.User, achievement_category_id: int
+):
+    async def recount():
+        ach_id_in_cat = await get_achievement_ids_from_category(context, achievement_category_id)
+        return await count_accomplished_achievement_by_set(context, user, set(ach_id_in_cat))
+
+    return await counter.get(context, user, counter.achievement_category(achievement_category_id), recount)
+
+
 async def give_achievement_reward(
     context: idol.BasicSchoolIdolContext,
     user: main.User,
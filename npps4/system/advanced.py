@@ -206,61 +206,61 @@ async def add_item(context: idol.BasicSchoolIdolContext, user: main.User, i: com
     return AddResult(False)  # TODO
 
 
-async def get_user_guest_party_info(context: idol.BasicSchoolIdolContext, user: main.User) -> PartyInfo:
-    party_user_info = PartyUserInfo(user_id=user.id, name=user.name, level=user.level)
-
-    # Get unit center info
-    unit_center = await unit.get_unit_center(context, user)
-    if unit_center is None:
-        raise ValueError("invalid user no center")
-
-    unit_data = await unit.get_unit(context, unit_center)
-    unit.validate_unit(user, unit_data)
-    unit_info = await unit.get_unit_info(context, unit_data.unit_id)
-    if unit_info is None:
-        raise ValueError("invalid user center no info")
-
-    unit_full_data, unit_stats = await unit.get_unit_data_full_info(context, unit_data)
+def _make_guest_party_info(card: unit.CenterUnitCard):
+    unit_data = card.unit_data
     party_unit_info = PartyCenterUnitInfo(
-        unit_owning_user_id=unit_data.id,
+        unit_owning_user_id=unit_data.unit_owning_user_id,
         unit_id=unit_data.unit_id,
-        exp=unit_full_data.exp,
-        next_exp=unit_full_data.next_exp,
-        level=unit_full_data.level,
+        exp=unit_data.exp,
+        next_exp=unit_data.next_exp,
+        level=unit_data.level,
         level_limit_id=unit_data.level_limit_id,
         max_level=unit_data.max_level,
         rank=unit_data.rank,
-        max_rank=unit_full_data.max_rank,
+        max_rank=unit_data.max_rank,
         love=unit_data.love,
-        max_love=unit_full_data.max_love,
-        unit_skill_level=unit_full_data.unit_skill_level,
-        max_hp=unit_full_data.max_hp,
+        max_love=unit_data.max_love,
+        unit_skill_level=unit_data.unit_skill_level,
+        max_hp=unit_data.max_hp,
         favorite_flag=unit_data.favorite_flag,
         display_rank=unit_data.display_rank,
-        unit_skill_exp=unit_data.skill_exp,
+        unit_skill_exp=unit_data.unit_skill_exp,
         unit_removable_skill_capacity=unit_data.unit_removable_skill_capacity,
-        attribute=unit_info.attribute_id,
-        smile=unit_stats.smile,
-        cute=unit_stats.pure,
-        cool=unit_stats.cool,
-        is_love_max=unit_full_data.is_love_max,
-        is_level_max=unit_full_data.is_level_max,
-        is_rank_max=unit_full_data.is_rank_max,
+        attribute=card.attribute_id,
+        smile=card.stats.smile,
+        cute=card.stats.pure,
+        cool=card.stats.cool,
+        is_love_max=unit_data.is_love_max,
+        is_level_max=unit_data.is_level_max,
+        is_rank_max=unit_data.is_rank_max,
         is_signed=unit_data.is_signed,
-        is_skill_level_max=unit_full_data.is_skill_level_max,
-        setting_award_id=user.active_award,
+        is_skill_level_max=unit_data.is_skill_level_max,
+        setting_award_id=card.setting_award_id,
     )
 
     return PartyInfo(
-        user_info=party_user_info,
+        user_info=PartyUserInfo(user_id=card.user_id, name=card.name, level=card.level),
         center_unit_info=party_unit_info,
-        setting_award_id=user.active_award,
+        setting_award_id=card.setting_award_id,
         # TODO
         available_social_point=5,
         friend_status=0,
     )
 
 
+async def get_user_guest_party_info_many(context: idol.BasicSchoolIdolContext, users: list[main.User]):
+    cards = await unit.get_center_unit_cards(context, (u.id for u in users))
+    party_list: list[PartyInfo] = []
+
+    for u in users:
+        card = cards.get(u.id)
+        if card is None:
+            raise ValueError("invalid user no center")
+        party_list.append(_make_guest_party_info(card))
+
+    return party_list
+
+
 async def get_random_user_for_partylist(
     context: idol.BasicSchoolIdolContext, /, user: main.User, *, include_current: bool = True, limit: int = 3
 ):
@@ -335,8 +335,7 @@ class TeamStatCalculator:
         unit_full_data_list: list[unit_model.UnitInfoData] = []
 
         # Retrieve base stats
-        for unit_data in player_units:
-            unit_full_data, stats = await unit.get_unit_data_full_info(self.context, unit_data)
+        for unit_full_data, stats in await unit.get_unit_data_full_info_batch(self.context, player_units):
             result.append(LiveDeckStats(smile=stats.smile, cute=stats.pure, cool=stats.cool, hp=stats.hp))
             unit_full_data_list.append(unit_full_data)
 
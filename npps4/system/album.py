@@ -1,7 +1,10 @@
+import collections
+import collections.abc
 import dataclasses
 
 import sqlalchemy
 
+from . import counter
 from .. import idol
 from ..db import main
 from ..db import unit
@@ -30,13 +33,13 @@ async def update(
     result = await context.db.main.execute(q)
     album = result.scalar()
 
+    increments: list[str] = []
     if album is None:
         album = main.Album(user_id=user.id, unit_id=unit_id)
         context.db.main.add(album)
+        increments.append(counter.ALBUM)
 
-    album.rank_max_flag = rank_max or album.rank_max_flag
-    album.love_max_flag = love_max or album.love_max_flag
-    album.rank_level_max_flag = rank_level_max or album.rank_level_max_flag
+    increments.extend(_set_max_flags(album, rank_max, love_max, rank_level_max))
     album.sign_flag = sign_flag or album.sign_flag
 
     if isinstance(highest_love, Increment):
@@ -48,6 +51,62 @@ async def update(
     else:
         album.favorite_point = max(album.favorite_point, favorite_point)
 
+    for name in increments:
+        await counter.increment(context, user, name)
+
+    if flush:
+        await context.db.main.flush()
+
+
+def _set_max_flags(album: main.Album, rank_max: bool, love_max: bool, rank_level_max: bool):
+    """Set the max flags and return names of album counters that need to be incremented."""
+    increments: list[str] = []
+    if rank_max and not album.rank_max_flag:
+        increments.append(counter.ALBUM_RANK_MAX)
+    if love_max and not album.love_max_flag:
+        increments.append(counter.ALBUM_LOVE_MAX)
+    if rank_level_max and not album.rank_level_max_flag:
+        increments.append(counter.ALBUM_RANK_LEVEL_MAX)
+
+    album.rank_max_flag = rank_max or album.rank_max_flag
+    album.love_max_flag = love_max or album.love_max_flag
+    album.rank_level_max_flag = rank_level_max or album.rank_level_max_flag
+    return increments
+
+
+async def update_many(
+    context: idol.BasicSchoolIdolContext,
+    user: main.User,
+    /,
+    max_flags: collections.abc.Mapping[int, tuple[bool, bool, bool]],
+    *,
+    flush: bool = True,
+):
+    """Batch variant of `update` for newly added units.
+
+    `max_flags` maps unit ID to its (rank_max, love_max, rank_level_max) flags. Existing album entries are loaded in
+    single query."""
+    if not max_flags:
+        return
+
+    q = sqlalchemy.select(main.Album).where(main.Album.user_id == user.id, main.Album.unit_id.in_(max_flags.keys()))
+    result = await context.db.main.execute(q)
+    albums = {album.unit_id: album for album in result.scalars()}
+    increments: collections.Counter[str] = collections.Counter()
+
+    for unit_id, (rank_max, love_max, rank_level_max) in max_flags.items():
+        album = albums.get(unit_id)
+        if album is None:
+            album = main.Album(user_id=user.id, unit_id=unit_id)
+            context.db.main.add(album)
+            increments[counter.ALBUM] += 1
+
+        increments.update(_set_max_flags(album, rank_max, love_max, rank_level_max))
+
+    # Each counter is incremented once for the whole batch.
+    for name, amount in increments.items():
+        await counter.increment(context, user, name, amount)
+
     if flush:
         await context.db.main.flush()
 
@@ -87,7 +146,31 @@ async def count_album_with(
     return qc.scalar() or 0
 
 
+_COUNTER_CRITERIA: dict[str, tuple[sqlalchemy.ColumnElement[bool], ...]] = {
+    counter.ALBUM: (),
+    counter.ALBUM_RANK_MAX: (main.Album.rank_max_flag == True,),
+    counter.ALBUM_LOVE_MAX: (main.Album.love_max_flag == True,),
+    counter.ALBUM_RANK_LEVEL_MAX: (main.Album.rank_level_max_flag == True,),
+}
+
+
+async def get_album_count(context: idol.BasicSchoolIdolContext, user: main.User, name: str = counter.ALBUM):
+    """Get amount of album entries from the user counter, where `name` is one of the `counter.ALBUM*` counter."""
+    return await counter.get(context, user, name, lambda: count_album_with(context, user, *_COUNTER_CRITERIA[name]))
+
+
 async def has_ever_got_unit(context: idol.BasicSchoolIdolContext, user: main.User, unit_id: int):
     q = sqlalchemy.select(main.Album).where(main.Album.user_id == user.id, main.Album.unit_id == unit_id)
     result = await context.db.main.execute(q)
     return result.scalar() is not None
+
+
+async def get_owned_unit_ids(
+    context: idol.BasicSchoolIdolContext, user: main.User, unit_ids: collections.abc.Iterable[int]
+):
+    """Get which of `unit_ids` the user has ever got."""
+    q = sqlalchemy.select(main.Album.unit_id).where(
+        main.Album.user_id == user.id, main.Album.unit_id.in_(set(unit_ids))
+    )
+    result = await context.db.main.execute(q)
+    return set(result.scalars())
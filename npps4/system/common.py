@@ -8,9 +8,10 @@ from . import live_model
 from . import scenario_model
 from . import unit_model
 from .. import idol
+from .. import release_key
 from .. import util
 
-from typing import Callable, Hashable, cast
+from typing import Any, Callable, Hashable, cast
 
 AnyItem = unit_model.AnyUnitItem | scenario_model.ScenarioItem | live_model.LiveItem | item_model.Item
 
@@ -82,3 +83,102 @@ def context_cacheable(cache_key: str):
         return cast(type(f), wrap)  # type: ignore
 
     return wrap0
+
+
+_MASTER_CACHE: dict[str, dict[Any, Any]] = {}
+_master_cache_key: tuple[tuple[str, ...], int] | None = None
+_master_cache_generation = -1
+
+
+def refresh_master_cache():
+    """Drop the process-wide master data cache if the master databases or release keys changed."""
+    global _MASTER_CACHE, _master_cache_key, _master_cache_generation
+
+    generation = release_key.generation()
+    key = (idol.database.get_master_db_paths(), generation)
+    if key != _master_cache_key:
+        if _master_cache_key is not None:
+            util.log("Master data changed, clearing process-wide cache", severity=util.logging.INFO)
+        _MASTER_CACHE.clear()
+        _master_cache_key = key
+
+    _master_cache_generation = generation
+
+
+def _get_master_cache(key: str):
+    global _MASTER_CACHE, _master_cache_generation
+
+    if release_key.generation() != _master_cache_generation:
+        refresh_master_cache()
+
+    cache = _MASTER_CACHE.get(key)
+    if cache is None:
+        cache = {}
+        _MASTER_CACHE[key] = cache
+
+    return cache
+
+
+def set_master_cache(key: str, id: Hashable, value: Any):
+    _get_master_cache(key)[id] = value
+
+
+async def get_master_cached[T: Hashable, U](
+    context: idol.BasicSchoolIdolContext,
+    key: str,
+    id: T,
+    miss: Callable[[idol.BasicSchoolIdolContext, T], collections.abc.Awaitable[U]],
+    /,
+):
+    cache = _get_master_cache(key)
+    result: U | None = cache.get(id)
+
+    if result is None:
+        result = await miss(context, id)
+        cache[id] = result
+
+    return result
+
+
+async def get_master_cached_many[T: Hashable, U](
+    context: idol.BasicSchoolIdolContext,
+    key: str,
+    ids: collections.abc.Iterable[T],
+    miss: Callable[[idol.BasicSchoolIdolContext, list[T]], collections.abc.Awaitable[dict[T, U]]],
+    /,
+):
+    """Batch variant of get_master_cached where all cache misses are resolved with single call to `miss`."""
+    cache = _get_master_cache(key)
+    result: dict[T, U] = {}
+    missing: list[T] = []
+
+    for id in ids:
+        value: U | None = cache.get(id)
+        if value is None:
+            missing.append(id)
+        else:
+            result[id] = value
+
+    if missing:
+        for id, value in (await miss(context, missing)).items():
+            if value is not None:
+                cache[id] = value
+            result[id] = value
+
+    return result
+
+
+def master_cacheable(cache_key: str):
+    """Decorator to allow caching result of read-only master data for the lifetime of the worker process.
+
+    The returned value is shared across requests so callers must not modify it."""
+
+    def wrap0[T: Hashable, U](f: Callable[[idol.BasicSchoolIdolContext, T], collections.abc.Awaitable[U]]):
+        @functools.wraps(f)
+        async def wrap(context: idol.BasicSchoolIdolContext, identifier: T, /):
+            return await get_master_cached(context, cache_key, identifier, f)
+
+        # See context_cacheable above.
+        return cast(type(f), wrap)  # type: ignore
+
+    return wrap0
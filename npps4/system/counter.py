@@ -0,0 +1,119 @@
+import collections.abc
+
+import sqlalchemy
+import sqlalchemy.exc
+
+from .. import idol
+from ..db import main
+
+from typing import Callable
+
+ALBUM = "album"
+ALBUM_RANK_MAX = "album_rank_max"
+ALBUM_LOVE_MAX = "album_love_max"
+ALBUM_RANK_LEVEL_MAX = "album_rank_level_max"
+ACHIEVEMENT_CATEGORY_PREFIX = "achievement_category_"
+PRESENTBOX = "presentbox"
+PRESENTBOX_NEXT_EXPIRE = "presentbox_next_expire"
+
+
+def achievement_category(achievement_category_id: int):
+    return f"{ACHIEVEMENT_CATEGORY_PREFIX}{achievement_category_id}"
+
+
+def achievement_reset(reset_type: int):
+    """Last period where achievements with specified `reset_type` are reset."""
+    return f"achievement_reset_{reset_type}"
+
+
+async def _get_counters(context: idol.BasicSchoolIdolContext, user: main.User) -> dict[str, main.UserCounter]:
+    counters: dict[str, main.UserCounter] | None = context.get_cache("user_counter", user.id)
+
+    if counters is None:
+        q = sqlalchemy.select(main.UserCounter).where(main.UserCounter.user_id == user.id)
+        result = await context.db.main.execute(q)
+        counters = {c.name: c for c in result.scalars()}
+        context.set_cache("user_counter", user.id, counters)
+
+    return counters
+
+
+async def _insert(context: idol.BasicSchoolIdolContext, user: main.User, name: str, value: int):
+    """Insert new counter. If concurrent request of the same user inserted it first, that one is returned instead."""
+    counter = main.UserCounter(user_id=user.id, name=name, value=value)
+
+    try:
+        async with context.db.main.begin_nested():
+            context.db.main.add(counter)
+    except sqlalchemy.exc.IntegrityError:
+        q = sqlalchemy.select(main.UserCounter).where(
+            main.UserCounter.user_id == user.id, main.UserCounter.name == name
+        )
+        counter = (await context.db.main.execute(q)).scalar_one()
+
+    return counter
+
+
+async def get(
+    context: idol.BasicSchoolIdolContext,
+    user: main.User,
+    name: str,
+    recount: Callable[[], collections.abc.Awaitable[int]],
+    /,
+):
+    """Get counter value. `recount` is called to compute the initial value if the counter doesn't exist yet."""
+    counters = await _get_counters(context, user)
+    counter = counters.get(name)
+
+    if counter is None:
+        counter = await _insert(context, user, name, await recount())
+        counters[name] = counter
+
+    return counter.value
+
+
+async def peek(context: idol.BasicSchoolIdolContext, user: main.User, name: str, /):
+    """Get counter value without computing it. Returns None if the counter doesn't exist yet."""
+    counters = await _get_counters(context, user)
+    counter = counters.get(name)
+    return None if counter is None else counter.value
+
+
+async def store(context: idol.BasicSchoolIdolContext, user: main.User, name: str, value: int, /):
+    counters = await _get_counters(context, user)
+    counter = counters.get(name)
+
+    if counter is None:
+        counter = await _insert(context, user, name, value)
+        counters[name] = counter
+
+    counter.value = value
+
+
+async def increment(context: idol.BasicSchoolIdolContext, user: main.User, name: str, amount: int = 1, /):
+    """Increment counter. Counter that doesn't exist yet is left as-is since its recount will include the change."""
+    counters = await _get_counters(context, user)
+    counter = counters.get(name)
+
+    if counter is not None:
+        # Increment in the database so concurrent requests of the same user don't lose updates.
+        q = (
+            sqlalchemy.update(main.UserCounter)
+            .where(main.UserCounter.user_id == user.id, main.UserCounter.name == name)
+            .values(value=main.UserCounter.value + amount)
+            .execution_options(synchronize_session=False)
+        )
+        await context.db.main.execute(q)
+        await context.db.main.refresh(counter, ["value"])
+
+
+async def invalidate(context: idol.BasicSchoolIdolContext, user: main.User, prefix: str = "", /):
+    """Drop counters whose name starts with `prefix` so they're recounted on next access."""
+    counters = await _get_counters(context, user)
+
+    for name in [k for k in counters if k.startswith(prefix)]:
+        counter = counters.pop(name)
+        if counter in context.db.main.new:
+            context.db.main.expunge(counter)
+        else:
+            await context.db.main.delete(counter)
@@ -54,13 +54,13 @@ class ExchangeItemWithMaxCountAndExpiry(ExchangeItemBase):
     max_item_count: int
 
 
-@common.context_cacheable("exchange_festival_point_unit")
+@common.master_cacheable("exchange_festival_point_unit")
 async def is_festival_unit(context: idol.BasicSchoolIdolContext, unit_id: int, /):
     test = await context.db.exchange.get(exchange.ExchangeFestivalPointUnit, unit_id)
     return test is not None
 
 
-@common.context_cacheable("exchange_no_point_unit")
+@common.master_cacheable("exchange_no_point_unit")
 async def should_give_sticker(context: idol.BasicSchoolIdolContext, unit_id: int, /):
     test = await context.db.exchange.get(exchange.ExchangeNoPointUnit, unit_id)
     return test is None
@@ -155,6 +155,6 @@ async def get_recovery_items(context: idol.BasicSchoolIdolContext, /, user: main
     return [common.ItemCount(item_id=i.item_id, amount=i.amount) for i in result.scalars()]
 
 
-@common.context_cacheable("recovery_item")
+@common.master_cacheable("recovery_item")
 async def get_recovery_item_info(context: idol.BasicSchoolIdolContext, recovery_item_id: int, /):
     return await db.get_decrypted_row(context.db.item, item.RecoveryItem, recovery_item_id)
@@ -0,0 +1,114 @@
+import asyncio
+import bisect
+import collections
+import collections.abc
+import time
+
+from ..config import config
+
+from typing import Callable
+
+
+class Leaderboard:
+    """Scores sorted by rank. Users with same score are ordered by their user ID."""
+
+    __slots__ = ("keys", "scores", "loaded_at")
+
+    def __init__(self, scores: collections.abc.Iterable[tuple[int, int]]):
+        # user_id -> score
+        self.scores = dict(scores)
+        # (-score, user_id) in rank order
+        self.keys = sorted((-score, user_id) for user_id, score in self.scores.items())
+        self.loaded_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def set_score(self, user_id: int, score: int):
+        old_score = self.scores.get(user_id)
+        if old_score == score:
+            return
+
+        if old_score is not None:
+            del self.keys[bisect.bisect_left(self.keys, (-old_score, user_id))]
+        bisect.insort(self.keys, (-score, user_id))
+        self.scores[user_id] = score
+
+    def get_rank(self, user_id: int):
+        """Get 1-based rank of the user, or None if the user has no score."""
+        score = self.scores.get(user_id)
+        if score is None:
+            return None
+        return bisect.bisect_left(self.keys, (-score, user_id)) + 1
+
+    def get_range(self, offset: int, limit: int):
+        """Get (rank, user_id, score) starting at 0-based `offset`."""
+        return [
+            (rank, user_id, -neg_score)
+            for rank, (neg_score, user_id) in enumerate(self.keys[offset : offset + limit], offset + 1)
+        ]
+
+
+# Recently used leaderboards. Leaderboards are shared across requests.
+_leaderboards: collections.OrderedDict[collections.abc.Hashable, Leaderboard] = collections.OrderedDict()
+# Leaderboards currently being loaded. Concurrent requests for the same key wait for the same load.
+_loading: dict[collections.abc.Hashable, asyncio.Future[Leaderboard]] = {}
+
+
+async def get(
+    key: collections.abc.Hashable,
+    load: Callable[[], collections.abc.Awaitable[collections.abc.Iterable[tuple[int, int]]]],
+    /,
+):
+    """Get leaderboard. `load` is called to get (user_id, score) of all users if it's not in memory or outdated."""
+    global _leaderboards
+
+    leaderboard = _leaderboards.get(key)
+    if leaderboard is not None:
+        if time.monotonic() - leaderboard.loaded_at < config.get_leaderboard_refresh_interval():
+            _leaderboards.move_to_end(key)
+            return leaderboard
+
+        del _leaderboards[key]
+
+    while (future := _loading.get(key)) is not None:
+        try:
+            # Shield it so cancelling this request doesn't cancel the load other requests are waiting for.
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # Only the request that loads it was cancelled. Load it again.
+            if not future.cancelled():
+                raise
+
+    future = asyncio.get_running_loop().create_future()
+    _loading[key] = future
+    try:
+        leaderboard = Leaderboard(await load())
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as e:
+        future.set_exception(e)
+        # Retrieve the exception so asyncio doesn't complain if no one else waits for it.
+        future.exception()
+        raise
+    finally:
+        del _loading[key]
+
+    cache_size = config.get_leaderboard_cache_size()
+    if cache_size > 0:
+        _leaderboards[key] = leaderboard
+        while len(_leaderboards) > cache_size:
+            _leaderboards.popitem(last=False)
+
+    future.set_result(leaderboard)
+    return leaderboard
+
+
+def update(key: collections.abc.Hashable, user_id: int, score: int, /):
+    """Update user score in the in-memory leaderboard. Leaderboard that's not in memory reads it when it's loaded."""
+    global _leaderboards
+
+    leaderboard = _leaderboards.get(key)
+    if leaderboard is not None:
+        leaderboard.set_score(user_id, score)
@@ -11,6 +11,7 @@ from . import achievement
 from . import advanced
 from . import award
 from . import background
+from . import counter
 from . import exchange
 from . import item
 from . import item_model
@@ -570,5 +571,7 @@ async def import_user(context: idol.BasicSchoolIdolContext, serialized_data: Acc
         ach_data.is_new = bool(ach_sdata.flags & 4)
         ach_data.reset_value = ach_sdata.reset_value
 
+    # Imported data doesn't go through the counter updates.
+    await counter.invalidate(context, target)
     await context.db.main.flush()
     return target
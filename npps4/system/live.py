@@ -1,5 +1,8 @@
+import asyncio
 import binascii
+import collections
 import collections.abc
+import dataclasses
 import gzip
 import hashlib
 import json
@@ -14,6 +17,7 @@ from .. import const
 from .. import db
 from .. import idol
 from .. import util
+from ..config import cfgtype
 from ..config import config
 from ..db import main
 from ..db import live
@@ -162,7 +166,7 @@ async def get_normal_live_clear_status_of_track(
     return live_status_result
 
 
-@common.context_cacheable("live_info")
+@common.master_cacheable("live_info")
 async def get_live_info_table(context: idol.BasicSchoolIdolContext, live_difficulty_id: int, /):
     live_info = await context.db.live.get(live.SpecialLive, live_difficulty_id)
     if live_info is None:
@@ -170,12 +174,12 @@ async def get_live_info_table(context: idol.BasicSchoolIdolContext, live_difficu
     return live_info
 
 
-@common.context_cacheable("live_setting")
+@common.master_cacheable("live_setting")
 async def get_live_setting(context: idol.BasicSchoolIdolContext, live_setting_id: int, /):
     return await db.get_decrypted_row(context.db.live, live.LiveSetting, live_setting_id)
 
 
-@common.context_cacheable("live_capital_value")
+@common.master_cacheable("live_capital_value")
 async def get_live_lp(context: idol.BasicSchoolIdolContext, live_difficulty_id: int, /):
     live_info = await get_live_info_table(context, live_difficulty_id)
     if live_info is None:
@@ -184,7 +188,7 @@ async def get_live_lp(context: idol.BasicSchoolIdolContext, live_difficulty_id:
     return live_info.capital_value
 
 
-@common.context_cacheable("live_setting_from_difficulty")
+@common.master_cacheable("live_setting_from_difficulty")
 async def get_live_setting_from_difficulty_id(context: idol.BasicSchoolIdolContext, live_difficulty_id: int, /):
     live_info = await get_live_info_table(context, live_difficulty_id)
     if live_info is None:
@@ -193,30 +197,85 @@ async def get_live_setting_from_difficulty_id(context: idol.BasicSchoolIdolConte
     return await get_live_setting(context, live_info.live_setting_id)
 
 
-async def get_live_info(context: idol.BasicSchoolIdolContext, live_difficulty_id: int, live_setting: live.LiveSetting):
+@dataclasses.dataclass(slots=True)
+class Beatmap:
+    source: collections.abc.Iterable[cfgtype.BeatmapData]
+    """Beatmap data returned by the beatmap provider, used to detect changes."""
+    notes_list: list[live_model.LiveNote]
+    notes_list_json: bytes
+    notes_list_crc32: int
+    notes_list_sha256: bytes
+
+    @staticmethod
+    def from_notes_list(source: collections.abc.Iterable[cfgtype.BeatmapData], notes_list: list[live_model.LiveNote]):
+        notes_list_json = NotesListRoot(notes_list).model_dump_json().encode("utf-8")
+        return Beatmap(
+            source,
+            notes_list,
+            notes_list_json,
+            binascii.crc32(notes_list_json),
+            hashlib.sha256(notes_list_json, usedforsecurity=False).digest(),
+        )
+
+
+# Recently used beatmaps, keyed by notes_setting_asset.
+_beatmaps: collections.OrderedDict[str, Beatmap] = collections.OrderedDict()
+
+
+async def get_beatmap(context: idol.BasicSchoolIdolContext, live_setting: live.LiveSetting):
+    """Get beatmap notes of a live show. The returned value is shared across requests so it must not be modified."""
+    global _beatmaps
+
     beatmap_protocol = config.get_beatmap_provider_protocol()
     beatmap_data = await beatmap_protocol.get_beatmap_data(live_setting.notes_setting_asset, context)
     if beatmap_data is None:
         return None
 
+    # Beatmap provider that caches its beatmaps returns same object if the beatmap is unchanged.
+    beatmap = _beatmaps.get(live_setting.notes_setting_asset)
+    if beatmap is not None and beatmap.source is beatmap_data:
+        _beatmaps.move_to_end(live_setting.notes_setting_asset)
+        return beatmap
+
+    notes_list = [
+        live_model.LiveNote(
+            timing_sec=l.timing_sec,
+            notes_attribute=l.notes_attribute,
+            notes_level=l.notes_level,
+            effect=l.effect,
+            effect_value=l.effect_value,
+            position=l.position,
+            speed=l.speed,
+            vanish=l.vanish,
+        )
+        for l in beatmap_data
+    ]
+    beatmap = Beatmap.from_notes_list(beatmap_data, notes_list)
+
+    cache_size = config.get_beatmap_cache_size()
+    if cache_size > 0:
+        _beatmaps[live_setting.notes_setting_asset] = beatmap
+        while len(_beatmaps) > cache_size:
+            _beatmaps.popitem(last=False)
+
+    return beatmap
+
+
+async def get_live_info(context: idol.BasicSchoolIdolContext, live_difficulty_id: int, live_setting: live.LiveSetting):
+    beatmap = await get_beatmap(context, live_setting)
+    if beatmap is None:
+        return None
+
+    return get_live_info_with_beatmap(live_difficulty_id, live_setting, beatmap)
+
+
+def get_live_info_with_beatmap(live_difficulty_id: int, live_setting: live.LiveSetting, beatmap: Beatmap):
     # TODO: Randomize
     return live_model.LiveInfoWithNotes(
         live_difficulty_id=live_difficulty_id,
         ac_flag=live_setting.ac_flag,
         swing_flag=live_setting.swing_flag,
-        notes_list=[
-            live_model.LiveNote(
-                timing_sec=l.timing_sec,
-                notes_attribute=l.notes_attribute,
-                notes_level=l.notes_level,
-                effect=l.effect,
-                effect_value=l.effect_value,
-                position=l.position,
-                speed=l.speed,
-                vanish=l.vanish,
-            )
-            for l in beatmap_data
-        ],
+        notes_list=beatmap.notes_list,
     )
 
 
@@ -230,7 +289,7 @@ async def get_live_info_without_notes(
     )
 
 
-@common.context_cacheable("live_goal_reward")
+@common.master_cacheable("live_goal_reward")
 async def get_goal_list_by_live_difficulty_id(context: idol.BasicSchoolIdolContext, live_difficulty_id: int, /):
     q = sqlalchemy.select(live.LiveGoalReward).where(live.LiveGoalReward.live_difficulty_id == live_difficulty_id)
     result = await context.db.live.execute(q)
@@ -334,7 +393,7 @@ async def get_goal_rewards(context: idol.BasicSchoolIdolContext, goal_ids: list[
     ]
 
 
-@common.context_cacheable("live_setting_ids_from_track")
+@common.master_cacheable("live_setting_ids_from_track")
 async def get_live_setting_ids_from_track_id(context: idol.BasicSchoolIdolContext, live_track_id: int, /):
     q = sqlalchemy.select(live.LiveSetting.live_setting_id).where(live.LiveSetting.live_track_id == live_track_id)
     result = await context.db.live.execute(q)
@@ -376,22 +435,28 @@ async def register_live_in_progress(
     lp_factor: int,
     unit_deck_id: int,
     deck_data_bytes: bytes,
+    beatmap: Beatmap,
 ):
     live_in_progress = await get_live_in_progress(context, user)
     if live_in_progress is None:
-        wip = main.LiveInProgress(
+        live_in_progress = main.LiveInProgress(
             user_id=user.id,
             party_user_id=party_user.id,
             lp_factor=lp_factor,
             unit_deck_id=unit_deck_id,
             deck_data=deck_data_bytes,
         )
-        context.db.main.add(wip)
+        context.db.main.add(live_in_progress)
     else:
         live_in_progress.party_user_id = party_user.id
         live_in_progress.lp_factor = lp_factor
         live_in_progress.unit_deck_id = unit_deck_id
         live_in_progress.deck_data = deck_data_bytes
+    live_in_progress.notes_count = len(beatmap.notes_list)
+    live_in_progress.notes_crc32 = beatmap.notes_list_crc32
+    live_in_progress.notes_sha256 = beatmap.notes_list_sha256
+    # Back up the notes list now, as the beatmap may change before the live show ends.
+    await record_notes_list(context, beatmap)
     await context.db.main.flush()
 
 
@@ -443,7 +508,7 @@ async def get_special_live_status(context: idol.BasicSchoolIdolContext, /, user:
     return result
 
 
-@common.context_cacheable("live_training_from_track_id")
+@common.master_cacheable("live_training_from_track_id")
 async def get_training_live_difficulty_id_from_live_track_id(
     context: idol.BasicSchoolIdolContext, live_track_id: int, /
 ):
@@ -499,24 +564,57 @@ class NotesListRoot(pydantic.RootModel):
     root: list[live_model.LiveNote]
 
 
-async def record_notes_list(context: idol.BasicSchoolIdolContext, notes_list: list[live_model.LiveNote], /):
-    notes_list_json = NotesListRoot(notes_list).model_dump_json().encode("utf-8")
-    sha256 = hashlib.sha256(notes_list_json, usedforsecurity=False).digest()
-    crc32 = binascii.crc32(notes_list_json)
+# Recently seen (crc32, sha256) of notes list that's known to be backed up. The backup is never deleted.
+_known_notes_backup: collections.OrderedDict[tuple[int, bytes], None] = collections.OrderedDict()
+
+
+def _remember_notes_backup(key: tuple[int, bytes]):
+    global _known_notes_backup
+
+    cache_size = config.get_beatmap_cache_size()
+    if cache_size > 0:
+        _known_notes_backup[key] = None
+        while len(_known_notes_backup) > cache_size:
+            _known_notes_backup.popitem(last=False)
 
-    if config.store_backup_of_notes_list():
-        q = sqlalchemy.select(main.NotesListBackup).where(
-            main.NotesListBackup.crc32 == crc32, main.NotesListBackup.sha256 == sha256
+
+async def _has_notes_backup(context: idol.BasicSchoolIdolContext, crc32: int, sha256: bytes, /):
+    global _known_notes_backup
+
+    key = (crc32, sha256)
+    if key in _known_notes_backup:
+        _known_notes_backup.move_to_end(key)
+        return True
+
+    q = sqlalchemy.select(main.NotesListBackup.id).where(
+        main.NotesListBackup.crc32 == crc32, main.NotesListBackup.sha256 == sha256
+    )
+    result = await context.db.main.execute(q)
+    if result.scalar() is None:
+        return False
+
+    # Newly added backup is not remembered until it's seen in the database, in case the transaction is rolled back.
+    _remember_notes_backup(key)
+    return True
+
+
+async def record_notes_list(context: idol.BasicSchoolIdolContext, beatmap: Beatmap, /):
+    crc32 = beatmap.notes_list_crc32
+    sha256 = beatmap.notes_list_sha256
+    if config.store_backup_of_notes_list() and not await _has_notes_backup(context, crc32, sha256):
+        backup_notes = main.NotesListBackup(
+            crc32=crc32, sha256=sha256, notes_list=gzip.compress(beatmap.notes_list_json)
         )
-        result = await context.db.main.execute(q)
-        backup_notes = result.scalar()
+        context.db.main.add(backup_notes)
+        await context.db.main.flush()
 
-        if backup_notes is None:
-            backup_notes = main.NotesListBackup(crc32=crc32, sha256=sha256, notes_list=gzip.compress(notes_list_json))
-            context.db.main.add(backup_notes)
-            await context.db.main.flush()
 
-    return crc32, sha256
+# Members of live/preciseScore response that are spliced into the stored precise log.
+PRECISE_SCORE_RESPONSE_KEYS = ("has_record", "can_replay", "live_info", "update_date")
+
+
+def _strip_response_keys(precise_log_data: dict[str, Any]):
+    return {k: v for k, v in precise_log_data.items() if k not in PRECISE_SCORE_RESPONSE_KEYS}
 
 
 async def record_precise_score(
@@ -525,93 +623,112 @@ async def record_precise_score(
     user: main.User,
     live_difficulty_id: int,
     use_skill: bool,
-    notes_list: list[live_model.LiveNote],
+    live_setting: live.LiveSetting,
+    notes_crc32: int,
+    notes_sha256: bytes,
     precise_log_data: dict[str, Any],
 ):
     # use_skill = bool(precise_log_data.get("is_skill_on", True))
-    q = sqlalchemy.select(main.LiveReplay).where(
-        main.LiveReplay.user_id == user.id,
-        main.LiveReplay.live_difficulty_id == live_difficulty_id,
-        main.LiveReplay.use_skill == use_skill,
+    if config.store_backup_of_notes_list() and not await _has_notes_backup(context, notes_crc32, notes_sha256):
+        # Live show started before notes list is backed up on live/play.
+        beatmap = await get_beatmap(context, live_setting)
+        if beatmap is not None and beatmap.notes_list_sha256 == notes_sha256:
+            await record_notes_list(context, beatmap)
+        else:
+            util.log(
+                "Recording replay without notes list backup",
+                user.id,
+                live_difficulty_id,
+                severity=util.logging.WARNING,
+            )
+
+    values = {
+        "timestamp": util.time(),
+        "notes_crc32": notes_crc32,
+        "notes_sha256": notes_sha256,
+        "precise_log": gzip.compress(json.dumps(_strip_response_keys(precise_log_data)).encode("utf-8")),
+    }
+
+    # Update-then-insert instead of dialect-specific upsert.
+    q = (
+        sqlalchemy.update(main.LiveReplay)
+        .where(
+            main.LiveReplay.user_id == user.id,
+            main.LiveReplay.live_difficulty_id == live_difficulty_id,
+            main.LiveReplay.use_skill == use_skill,
+        )
+        .values(**values)
     )
-    result = await context.db.main.execute(q)
-    replay = result.scalar()
+    result = cast(sqlalchemy.CursorResult, await context.db.main.execute(q))
 
-    if replay is None:
-        replay = main.LiveReplay(
-            user_id=user.id,
-            live_difficulty_id=live_difficulty_id,
-            use_skill=use_skill,
-            timestamp=0,
-            notes_crc32=0,
-            notes_sha256=b"",
-            precise_log=b"",
+    if result.rowcount == 0:
+        context.db.main.add(
+            main.LiveReplay(user_id=user.id, live_difficulty_id=live_difficulty_id, use_skill=use_skill, **values)
         )
-        context.db.main.add(replay)
+        await context.db.main.flush()
+
+
+# Compressed data at least this size is decompressed in a thread so it doesn't block the event loop.
+DECOMPRESS_IN_THREAD_SIZE = 16384
 
-    replay.timestamp = util.time()
-    replay.notes_crc32, replay.notes_sha256 = await record_notes_list(context, notes_list)
-    replay.precise_log = gzip.compress(json.dumps(precise_log_data).encode("utf-8"))
-    await context.db.main.flush()
 
+async def _decompress(data: bytes):
+    if len(data) >= DECOMPRESS_IN_THREAD_SIZE:
+        return await asyncio.to_thread(gzip.decompress, data)
+    return gzip.decompress(data)
 
-async def pull_precise_score_with_beatmap(
+
+async def pull_precise_score_json(
     context: idol.BasicSchoolIdolContext, /, user: main.User, live_difficulty_id: int, use_skill: bool
 ):
-    q = sqlalchemy.select(main.LiveReplay).where(
-        main.LiveReplay.user_id == user.id,
-        main.LiveReplay.live_difficulty_id == live_difficulty_id,
-        main.LiveReplay.use_skill == use_skill,
+    """Get JSON-encoded precise log, JSON-encoded notes list, and timestamp of a replay."""
+    q = (
+        sqlalchemy.select(main.LiveReplay, main.NotesListBackup.notes_list)
+        .outerjoin(
+            main.NotesListBackup,
+            sqlalchemy.and_(
+                main.NotesListBackup.crc32 == main.LiveReplay.notes_crc32,
+                main.NotesListBackup.sha256 == main.LiveReplay.notes_sha256,
+            ),
+        )
+        .where(
+            main.LiveReplay.user_id == user.id,
+            main.LiveReplay.live_difficulty_id == live_difficulty_id,
+            main.LiveReplay.use_skill == use_skill,
+        )
     )
     result = await context.db.main.execute(q)
-    replay = result.scalar()
-    if replay is None:
+    row = result.first()
+    if row is None:
         return None
 
-    # Get notes cache
-    q = sqlalchemy.select(main.NotesListBackup.notes_list).where(
-        main.NotesListBackup.crc32 == replay.notes_crc32, main.NotesListBackup.sha256 == replay.notes_sha256
-    )
-    result = await context.db.main.execute(q)
-    notes_list_bytes = result.scalar()
-    notes_list = None
+    replay, notes_list_bytes = row.tuple()
+    notes_list_json = None
     if notes_list_bytes is not None:
-        notes_list = NotesListRoot.model_validate_json(gzip.decompress(notes_list_bytes)).root
-
-    if notes_list is None:
+        # Stored as-is from `Beatmap.notes_list_json`, no need to validate it again.
+        notes_list_json = await _decompress(notes_list_bytes)
+    else:
         # Try look at current beatmap
         live_setting = await get_live_setting_from_difficulty_id(context, live_difficulty_id)
         if live_setting is None:
             return None
 
-        beatmap_protocol = config.get_beatmap_provider_protocol()
-        beatmap_data = await beatmap_protocol.get_beatmap_data(live_setting.notes_setting_asset, context)
-        if beatmap_data is None:
+        beatmap = await get_beatmap(context, live_setting)
+        if beatmap is None:
             return None
 
-        notes_list_unprocessed = [
-            live_model.LiveNote(
-                timing_sec=l.timing_sec,
-                notes_attribute=l.notes_attribute,
-                notes_level=l.notes_level,
-                effect=l.effect,
-                effect_value=l.effect_value,
-                position=l.position,
-                speed=l.speed,
-                vanish=l.vanish,
-            )
-            for l in beatmap_data
-        ]
-        notes_list_bytes = NotesListRoot(notes_list_unprocessed).model_dump_json().encode("utf-8")
-        sha256_of_notes = hashlib.sha256(notes_list_bytes, usedforsecurity=False).digest()
-
-        if replay.notes_sha256 == sha256_of_notes:
-            notes_list = notes_list_unprocessed
+        if replay.notes_sha256 == beatmap.notes_list_sha256:
+            notes_list_json = beatmap.notes_list_json
 
-    if notes_list is None:
+    if notes_list_json is None:
         return None
 
-    return json.loads(gzip.decompress(replay.precise_log)), notes_list, replay.timestamp
+    precise_log_json = await _decompress(replay.precise_log)
+    # Replays recorded before the keys were stripped on write.
+    if any(f'"{k}"'.encode("utf-8") in precise_log_json for k in PRECISE_SCORE_RESPONSE_KEYS):
+        precise_log_json = json.dumps(_strip_response_keys(json.loads(precise_log_json))).encode("utf-8")
+
+    return precise_log_json, notes_list_json, replay.timestamp
 
 
 async def get_cleared_live_count(context: idol.BasicSchoolIdolContext, /, user: main.User) -> dict[int, int]:
@@ -622,7 +739,7 @@ async def get_cleared_live_count(context: idol.BasicSchoolIdolContext, /, user:
     return {r[0]: r[1] for r in result}
 
 
-@common.context_cacheable("adjacent_live_difficulty_id")
+@common.master_cacheable("adjacent_live_difficulty_id")
 async def get_enh_live_difficulty_ids(context: idol.BasicSchoolIdolContext, /, live_difficulty_id: int):
     output: dict[int, int] = {}
 
@@ -649,6 +766,6 @@ async def get_enh_live_difficulty_ids(context: idol.BasicSchoolIdolContext, /, l
     for live_info in live_infos:
         output[live_setting_map[live_info.live_setting_id].difficulty] = live_info.live_difficulty_id
         # Also set cache for the retrieved live difficulty ids
-        context.set_cache("adjacent_live_difficulty_id", live_info.live_difficulty_id, output)
+        common.set_master_cache("adjacent_live_difficulty_id", live_info.live_difficulty_id, output)
 
     return output
@@ -1,60 +1,82 @@
-import asyncio
+import functools
 
 import sqlalchemy
+import sqlalchemy.orm
 
+from . import leaderboard
 from .. import idol
 from .. import util
+from ..config import config
 from ..db import main
 
 QUERY_PER_PAGE = 20
 
 
-async def get_live_ranking(context: idol.BasicSchoolIdolContext, live_difficulty_id: int, page: int):
+def _use_leaderboard_cache():
+    # Without cache, loading whole leaderboard for every request is slower than letting the database page it.
+    return config.get_leaderboard_cache_size() > 0
+
+
+async def _count_ranked(context: idol.BasicSchoolIdolContext, *filters: sqlalchemy.ColumnElement[bool]):
+    q = sqlalchemy.select(sqlalchemy.func.count()).where(*filters)
+    return (await context.db.main.execute(q)).scalar_one()
+
+
+async def _get_ranked_page(
+    context: idol.BasicSchoolIdolContext,
+    user_id_column: sqlalchemy.orm.InstrumentedAttribute[int],
+    score_column: sqlalchemy.orm.InstrumentedAttribute[int],
+    page: int,
+    *filters: sqlalchemy.ColumnElement[bool],
+):
+    """Get list of (rank, user_id, score) in specified page, ordered like `leaderboard.Leaderboard`."""
+    offset = page * QUERY_PER_PAGE
     q = (
-        sqlalchemy.select(sqlalchemy.func.count())
-        .select_from(main.LiveClear)
-        .where(main.LiveClear.live_difficulty_id == live_difficulty_id, main.LiveClear.clear_cnt > 0)
+        sqlalchemy.select(user_id_column, score_column)
+        .where(*filters)
+        .order_by(score_column.desc(), user_id_column)
+        .offset(offset)
+        .limit(QUERY_PER_PAGE)
     )
     result = await context.db.main.execute(q)
-    total_cnt = result.scalar() or 0
-    player_scores: list[tuple[int, int]] = []
-
-    if total_cnt > 0:
-        q = (
-            sqlalchemy.select(main.LiveClear)
-            .where(main.LiveClear.live_difficulty_id == live_difficulty_id, main.LiveClear.clear_cnt > 0)
-            .order_by(main.LiveClear.hi_score.desc())
-            .limit(QUERY_PER_PAGE)
-            .offset(page * QUERY_PER_PAGE)
+    return [(rank, user_id, score) for rank, (user_id, score) in enumerate(result.tuples(), offset + 1)]
+
+
+def _get_live_ranking_filters(live_difficulty_id: int):
+    return (main.LiveClear.live_difficulty_id == live_difficulty_id, main.LiveClear.clear_cnt > 0)
+
+
+async def get_live_leaderboard(context: idol.BasicSchoolIdolContext, live_difficulty_id: int):
+    async def load():
+        q = sqlalchemy.select(main.LiveClear.user_id, main.LiveClear.hi_score).where(
+            *_get_live_ranking_filters(live_difficulty_id)
         )
         result = await context.db.main.execute(q)
-        for row in result.scalars():
-            player_scores.append((row.user_id, row.hi_score))
+        return result.tuples()
+
+    return await leaderboard.get(("live", live_difficulty_id), load)
 
-    return total_cnt, player_scores
 
+async def get_live_ranking(context: idol.BasicSchoolIdolContext, live_difficulty_id: int, page: int):
+    """Get total amount of ranked players and list of (rank, user_id, hi_score) in specified page."""
+    if not _use_leaderboard_cache():
+        filters = _get_live_ranking_filters(live_difficulty_id)
+        return (
+            await _count_ranked(context, *filters),
+            await _get_ranked_page(context, main.LiveClear.user_id, main.LiveClear.hi_score, page, *filters),
+        )
 
-_currently_cleaning = False
+    live_leaderboard = await get_live_leaderboard(context, live_difficulty_id)
+    return len(live_leaderboard), live_leaderboard.get_range(page * QUERY_PER_PAGE, QUERY_PER_PAGE)
 
 
-async def try_cleanup_daily_rankings(current_day_index: int):
-    global _currently_cleaning
-    if not _currently_cleaning:
-        _currently_cleaning = True
-        await asyncio.sleep(5)
-        async with idol.BasicSchoolIdolContext() as context:
-            two_days_ago = current_day_index - 2
-            q = sqlalchemy.delete(main.PlayerRanking).where(main.PlayerRanking.day <= two_days_ago)
-            await context.db.main.execute(q)
-        _currently_cleaning = False
+def update_live_ranking(context: idol.BasicSchoolIdolContext, user: main.User, live_difficulty_id: int, hi_score: int):
+    # Leaderboards are shared, so don't show the score until it's committed.
+    context.on_commit(functools.partial(leaderboard.update, ("live", live_difficulty_id), user.id, hi_score))
 
 
 async def increment_daily_score(context: idol.BasicSchoolIdolContext, user: main.User, inc_score: int):
     current_day_index = util.get_days_since_unix()
-
-    if context.support_background_task():
-        context.add_task(try_cleanup_daily_rankings, current_day_index)
-
     q = sqlalchemy.select(main.PlayerRanking).where(
         main.PlayerRanking.user_id == user.id, main.PlayerRanking.day == current_day_index
     )
@@ -66,28 +88,61 @@ async def increment_daily_score(context: idol.BasicSchoolIdolContext, user: main
 
     player_score.score = player_score.score + inc_score
     await context.db.main.flush()
+    context.on_commit(functools.partial(leaderboard.update, ("daily", current_day_index), user.id, player_score.score))
+
+
+async def get_daily_leaderboard(context: idol.BasicSchoolIdolContext, yesterday: bool):
+    day_index = util.get_days_since_unix() - yesterday
+
+    async def load():
+        q = sqlalchemy.select(main.PlayerRanking.user_id, main.PlayerRanking.score).where(
+            main.PlayerRanking.day == day_index
+        )
+        result = await context.db.main.execute(q)
+        return result.tuples()
+
+    return await leaderboard.get(("daily", day_index), load)
 
 
 async def get_daily_ranking(context: idol.BasicSchoolIdolContext, page: int, yesterday: bool):
-    """Pagination is hardcoded to 20 entries per page."""
+    """Get list of (rank, user_id, score) in specified page and total amount of ranked players.
 
-    day_index = util.get_days_since_unix() - yesterday
+    Pagination is hardcoded to 20 entries per page."""
 
-    # Count
-    q = (
-        sqlalchemy.select(sqlalchemy.func.count())
-        .select_from(main.PlayerRanking)
-        .where(main.PlayerRanking.day == day_index)
-    )
-    total_rankings = (await context.db.main.execute(q)).scalar() or 0
+    if not _use_leaderboard_cache():
+        day_filter = main.PlayerRanking.day == util.get_days_since_unix() - yesterday
+        return (
+            await _get_ranked_page(context, main.PlayerRanking.user_id, main.PlayerRanking.score, page, day_filter),
+            await _count_ranked(context, day_filter),
+        )
 
-    q = (
-        sqlalchemy.select(main.PlayerRanking)
-        .where(main.PlayerRanking.day == day_index)
-        .order_by(main.PlayerRanking.score.desc(), main.PlayerRanking.user_id)
-        .offset(page * 20)
-        .limit(20)
-    )
-    result = await context.db.main.execute(q)
+    daily_leaderboard = await get_daily_leaderboard(context, yesterday)
+    return daily_leaderboard.get_range(page * QUERY_PER_PAGE, QUERY_PER_PAGE), len(daily_leaderboard)
+
+
+async def get_daily_rank(context: idol.BasicSchoolIdolContext, user_id: int, yesterday: bool):
+    """Get 1-based rank of the user, or None if the user has no score."""
+    if not _use_leaderboard_cache():
+        day_index = util.get_days_since_unix() - yesterday
+        q = sqlalchemy.select(main.PlayerRanking.score).where(
+            main.PlayerRanking.user_id == user_id, main.PlayerRanking.day == day_index
+        )
+        score = (await context.db.main.execute(q)).scalar()
+        if score is None:
+            return None
+
+        # Users with same score are ordered by their user ID.
+        return (
+            await _count_ranked(
+                context,
+                main.PlayerRanking.day == day_index,
+                sqlalchemy.or_(
+                    main.PlayerRanking.score > score,
+                    sqlalchemy.and_(main.PlayerRanking.score == score, main.PlayerRanking.user_id < user_id),
+                ),
+            )
+            + 1
+        )
 
-    return result.scalars().all(), total_rankings
+    daily_leaderboard = await get_daily_leaderboard(context, yesterday)
+    return daily_leaderboard.get_rank(user_id)
@@ -1,5 +1,5 @@
-import asyncio
 import collections.abc
+import dataclasses
 import enum
 import json
 
@@ -7,9 +7,12 @@ import pydantic
 import sqlalchemy
 
 from . import advanced
+from . import common
+from . import counter
 from . import item_model
 from . import live
 from . import live_model
+from . import unit
 from . import unit_model
 from .. import const
 from .. import idol
@@ -32,28 +35,6 @@ class FilterConfig(pydantic.BaseModel):
     category: RewardCategory
 
 
-async def cleanup_incentive(context: idol.BasicSchoolIdolContext, time: int = 0):
-    if time == 0:
-        time = util.time()
-
-    q = sqlalchemy.delete(main.Incentive).where(main.Incentive.expire_date != 0, main.Incentive.expire_date < time)
-    await context.db.main.execute(q)
-    await context.db.main.flush()
-
-
-_currently_cleaning = False
-
-
-async def try_cleanup_incentive():
-    global _currently_cleaning
-    if not _currently_cleaning:
-        _currently_cleaning = True
-        await asyncio.sleep(5)
-        async with idol.BasicSchoolIdolContext() as context:
-            await cleanup_incentive(context)
-        _currently_cleaning = False
-
-
 async def add_item(
     context: idol.BasicSchoolIdolContext,
     user: main.User,
@@ -62,9 +43,6 @@ async def add_item(
     reason_en: str | None = None,
     expire: int = 0,
 ):
-    if context.support_background_task():
-        context.add_task(try_cleanup_incentive)
-
     extra_data = item_data.get_extra_data()
     incentive = main.Incentive(
         user_id=user.id,
@@ -84,6 +62,12 @@ async def add_item(
         incentive.unit_rarity = item_data.unit_rarity_id
 
     context.db.main.add(incentive)
+    await counter.increment(context, user, counter.PRESENTBOX)
+    if expire > 0:
+        next_expire = await counter.peek(context, user, counter.PRESENTBOX_NEXT_EXPIRE)
+        if next_expire is not None and (next_expire == 0 or expire < next_expire):
+            await counter.store(context, user, counter.PRESENTBOX_NEXT_EXPIRE, expire)
+
     await context.db.main.flush()
     return incentive
 
@@ -106,6 +90,79 @@ def apply_filter[T: sqlalchemy.Select](q: T, filter_config: FilterConfig, /) ->
     return q
 
 
+@dataclasses.dataclass(frozen=True, slots=True)
+class PresentBoxCursor:
+    """Position right after an incentive in the present box, for keyset pagination."""
+
+    segment: int
+    date: int
+    id: int
+
+
+def _get_presentbox_segments(t: int, order_ascending: bool, order_expiry_date: bool):
+    """Split present box ordering to index-friendly (criteria, date column, date ascending, id ascending) segments."""
+    if order_expiry_date:
+        expiring = (main.Incentive.expire_date >= t, main.Incentive.expire_date, order_ascending, order_ascending)
+        no_expiry = (main.Incentive.expire_date == 0, main.Incentive.expire_date, order_ascending, order_ascending)
+        # No expiration is shown last when ascending, first when descending.
+        return (expiring, no_expiry) if order_ascending else (no_expiry, expiring)
+
+    return (
+        (
+            (main.Incentive.expire_date == 0) | (main.Incentive.expire_date >= t),
+            main.Incentive.insert_date,
+            order_ascending,
+            False,
+        ),
+    )
+
+
+def make_presentbox_cursor(incentive: main.Incentive, order_ascending: bool, order_expiry_date: bool):
+    if order_expiry_date:
+        no_expiry = incentive.expire_date == 0
+        return PresentBoxCursor(int(no_expiry == order_ascending), incentive.expire_date, incentive.id)
+
+    return PresentBoxCursor(0, incentive.insert_date, incentive.id)
+
+
+async def get_presentbox_after(
+    context: idol.BasicSchoolIdolContext,
+    user: main.User,
+    filter_config: FilterConfig,
+    cursor: PresentBoxCursor | None,
+    limit: int = 1000,
+    order_ascending: bool = False,
+    order_expiry_date: bool = False,
+):
+    """Get incentives after `cursor` (or from the start if it's None) using keyset pagination."""
+    segments = _get_presentbox_segments(util.time(), order_ascending, order_expiry_date)
+    incentives: list[main.Incentive] = []
+
+    for segment in range(0 if cursor is None else cursor.segment, len(segments)):
+        criteria, date_column, date_ascending, id_ascending = segments[segment]
+        q = sqlalchemy.select(main.Incentive).where(main.Incentive.user_id == user.id, criteria)
+        q = apply_filter(q, filter_config)
+
+        if cursor is not None and segment == cursor.segment:
+            date_after = date_column > cursor.date if date_ascending else date_column < cursor.date
+            id_after = main.Incentive.id > cursor.id if id_ascending else main.Incentive.id < cursor.id
+            q = q.where(date_after | ((date_column == cursor.date) & id_after))
+
+        q = q.order_by(
+            date_column.asc() if date_ascending else date_column.desc(),
+            main.Incentive.id.asc() if id_ascending else main.Incentive.id.desc(),
+        )
+        if limit > 0:
+            q = q.limit(limit - len(incentives))
+
+        result = await context.db.main.execute(q)
+        incentives.extend(result.scalars())
+        if limit > 0 and len(incentives) >= limit:
+            break
+
+    return incentives
+
+
 async def get_presentbox(
     context: idol.BasicSchoolIdolContext,
     user: main.User,
@@ -115,8 +172,8 @@ async def get_presentbox(
     order_ascending: bool = False,
     order_expiry_date: bool = False,
 ) -> collections.abc.Sequence[main.Incentive]:
-    if context.support_background_task():
-        context.add_task(try_cleanup_incentive)
+    if offset == 0:
+        return await get_presentbox_after(context, user, filter_config, None, limit, order_ascending, order_expiry_date)
 
     t = util.time()
 
@@ -158,9 +215,6 @@ async def get_presentbox(
 async def get_presentbox_simple(
     context: idol.BasicSchoolIdolContext, user: main.User, /
 ) -> collections.abc.Iterable[main.Incentive]:
-    if context.support_background_task():
-        context.add_task(try_cleanup_incentive)
-
     t = util.time()
 
     # Query non-expire incentives.
@@ -171,12 +225,9 @@ async def get_presentbox_simple(
     return result.scalars()
 
 
-async def count_presentbox(
+async def _count_presentbox_query(
     context: idol.BasicSchoolIdolContext, /, user: main.User, filter_config: FilterConfig | None = None
 ):
-    if context.support_background_task():
-        context.add_task(try_cleanup_incentive)
-
     t = util.time()
 
     q = (
@@ -191,6 +242,33 @@ async def count_presentbox(
     return qc.scalar() or 0
 
 
+async def _recount_presentbox(context: idol.BasicSchoolIdolContext, /, user: main.User):
+    t = util.time()
+
+    q = sqlalchemy.select(
+        sqlalchemy.func.count(), sqlalchemy.func.min(sqlalchemy.func.nullif(main.Incentive.expire_date, 0))
+    ).where(main.Incentive.user_id == user.id, (main.Incentive.expire_date == 0) | (main.Incentive.expire_date >= t))
+    result = await context.db.main.execute(q)
+    count, next_expire = result.one().tuple()
+
+    await counter.store(context, user, counter.PRESENTBOX_NEXT_EXPIRE, next_expire or 0)
+    return count or 0
+
+
+async def count_presentbox(
+    context: idol.BasicSchoolIdolContext, /, user: main.User, filter_config: FilterConfig | None = None
+):
+    if filter_config is not None and filter_config.category != RewardCategory.ALL:
+        return await _count_presentbox_query(context, user, filter_config)
+
+    # Unfiltered count is kept in user counter. It's recounted when an incentive expires.
+    next_expire = await counter.peek(context, user, counter.PRESENTBOX_NEXT_EXPIRE)
+    if next_expire is not None and next_expire > 0 and next_expire < util.time():
+        await counter.store(context, user, counter.PRESENTBOX, await _recount_presentbox(context, user))
+
+    return await counter.get(context, user, counter.PRESENTBOX, lambda: _recount_presentbox(context, user))
+
+
 async def resolve_incentive(context: idol.BasicSchoolIdolContext, user: main.User, incentive: main.Incentive):
     extra_data = json.loads(incentive.extra_data) if incentive.extra_data is not None else None
     item_data = await advanced.deserialize_item_data(
@@ -213,26 +291,102 @@ async def resolve_incentive(context: idol.BasicSchoolIdolContext, user: main.Use
 
 
 async def get_incentive(context: idol.BasicSchoolIdolContext, user: main.User, incentive_id: int):
-    if context.support_background_task():
-        context.add_task(try_cleanup_incentive)
-
     q = sqlalchemy.select(main.Incentive).where(main.Incentive.user_id == user.id, main.Incentive.id == incentive_id)
     result = await context.db.main.execute(q)
     return result.scalar()
 
 
-async def remove_incentive(context: idol.BasicSchoolIdolContext, incentive: main.Incentive):
+async def remove_incentive(context: idol.BasicSchoolIdolContext, user: main.User, incentive: main.Incentive):
     # TODO: Move to incentive history
     await context.db.main.delete(incentive)
+    # Expired incentives are not in the present box count.
+    if incentive.expire_date == 0 or incentive.expire_date >= util.time():
+        await counter.increment(context, user, counter.PRESENTBOX, -1)
+    await context.db.main.flush()
+
+
+# Items whose effect only depends on their add type, item ID, and amount, so same items can be added at once.
+_STACKABLE_ADD_TYPES = frozenset(
+    (
+        const.ADD_TYPE.ITEM,
+        const.ADD_TYPE.GAME_COIN,
+        const.ADD_TYPE.LOVECA,
+        const.ADD_TYPE.SOCIAL_POINT,
+        const.ADD_TYPE.UNIT_MAX,
+        const.ADD_TYPE.EXCHANGE_POINT,
+        const.ADD_TYPE.SCHOOL_IDOL_SKILL,
+        const.ADD_TYPE.RECOVER_LP_ITEM,
+    )
+)
+
+
+async def claim_incentives(
+    context: idol.BasicSchoolIdolContext, user: main.User, incentives: collections.abc.Sequence[main.Incentive], /
+):
+    """Give incentives to the user and remove the claimed ones.
+
+    Same stackable items are added once with their total amount, new units are inserted together, and claimed
+    incentives are removed in single statement. Returns (incentive_id, item) of claimed incentives in same order as
+    `incentives`."""
+
+    resolved = [(incentive.id, await resolve_incentive(context, user, incentive)) for incentive in incentives]
+    stacks: dict[tuple[int, int], tuple[common.AnyItem, list[int]]] = {}
+    units: list[tuple[int, unit_model.UnitItem]] = []
+    others: list[tuple[int, common.AnyItem]] = []
+    claimed_ids: set[int] = set()
+
+    for incentive_id, item_data in resolved:
+        if isinstance(item_data, unit_model.UnitItem):
+            units.append((incentive_id, item_data))
+        elif item_data.add_type in _STACKABLE_ADD_TYPES or isinstance(item_data, unit_model.UnitSupportItem):
+            key = (item_data.add_type, item_data.item_id)
+            stack = stacks.get(key)
+            if stack is None:
+                stacks[key] = (item_data.model_copy(), [incentive_id])
+            else:
+                stack[0].amount = stack[0].amount + item_data.amount
+                stack[1].append(incentive_id)
+        else:
+            others.append((incentive_id, item_data))
+
+    # Stacks go first so unit slot expansion applies to the units below.
+    for item_data, incentive_ids in stacks.values():
+        if await advanced.add_item(context, user, item_data):
+            claimed_ids.update(incentive_ids)
+
+    for incentive_id, item_data in others:
+        if await advanced.add_item(context, user, item_data):
+            claimed_ids.add(incentive_id)
+
+    new_units: list[tuple[unit_model.UnitItem, main.Unit]] = []
+    if units:
+        unit_count = await unit.count_units(context, user, True)
+
+        for incentive_id, unit_item in units:
+            if (unit_count + unit_item.amount) < user.unit_max:
+                for _ in range(unit_item.amount):
+                    new_units.append((unit_item, await unit.create_unit_data(context, user, unit_item, True)))
+                unit_count = unit_count + unit_item.amount
+                claimed_ids.add(incentive_id)
+
+    if claimed_ids:
+        # TODO: Move to incentive history
+        q = sqlalchemy.delete(main.Incentive).where(main.Incentive.id.in_(claimed_ids))
+        await context.db.main.execute(q)
+        await counter.increment(context, user, counter.PRESENTBOX, -len(claimed_ids))
+
+    if new_units:
+        await unit.add_units_by_object(context, user, [u[1] for u in new_units], flush=False)
     await context.db.main.flush()
+    for unit_item, unit_data in new_units:
+        unit_item.unit_owning_user_id = unit_data.id
+
+    return [(incentive_id, item_data) for incentive_id, item_data in resolved if incentive_id in claimed_ids]
 
 
 async def has_at_least_one(
     context: idol.BasicSchoolIdolContext, user: main.User, add_type: const.ADD_TYPE, item_id: int
 ):
-    if context.support_background_task():
-        context.add_task(try_cleanup_incentive)
-
     q = (
         sqlalchemy.select(sqlalchemy.func.count())
         .select_from(main.Incentive)
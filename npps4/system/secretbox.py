@@ -1,3 +1,8 @@
+import collections
+import dataclasses
+import itertools
+import random
+
 from . import item
 from . import secretbox_model
 from . import user
@@ -158,6 +163,67 @@ def get_secretbox_data(secretbox_id: int):
     return server_data.secretbox_data[secretbox_id]
 
 
+@dataclasses.dataclass(frozen=True)
+class CompiledSecretbox:
+    """Rarity rates of a scouting pool as cumulative weights, searched by bisection when rolling."""
+
+    rarity_indices: range
+    cum_weights: list[int]
+    rarity_pools: list[list[int]]
+
+    def roll_rarities(
+        self, amount: int, /, *, guarantee_rarity: int = 0, guarantee_amount: int = 0, rng: random.Random = util.SYSRAND
+    ):
+        picked_rarity_index = rng.choices(self.rarity_indices, cum_weights=self.cum_weights, k=amount)
+
+        if guarantee_rarity > 0 and guarantee_amount > 0:
+            rindex = guarantee_rarity - 1
+            below = [i for i, k in enumerate(picked_rarity_index) if k < rindex]
+            missing = min(guarantee_amount - (amount - len(below)), len(below))
+            if missing > 0:
+                for i in rng.sample(below, missing):
+                    picked_rarity_index[i] = rindex
+
+        return picked_rarity_index
+
+    def roll_units(
+        self, amount: int, /, *, guarantee_rarity: int = 0, guarantee_amount: int = 0, rng: random.Random = util.SYSRAND
+    ):
+        picked_rarity_index = self.roll_rarities(
+            amount, guarantee_rarity=guarantee_rarity, guarantee_amount=guarantee_amount, rng=rng
+        )
+        return [rng.choice(self.rarity_pools[i]) for i in picked_rarity_index]
+
+
+# Compiled pools of the currently loaded server data, keyed by (secretbox ID, rate modifier).
+_compiled_server_data: data.ServerData | None = None
+_compiled_secretbox: dict[tuple[int, tuple[int, ...] | None], CompiledSecretbox] = {}
+
+
+def compile_secretbox(secretbox_id: int, rate_modifier: list[int] | None = None):
+    global _compiled_server_data, _compiled_secretbox
+
+    server_data = data.get()
+    if server_data is not _compiled_server_data:
+        _compiled_server_data = server_data
+        _compiled_secretbox = {}
+
+    key = (secretbox_id, None if rate_modifier is None else tuple(rate_modifier))
+    compiled = _compiled_secretbox.get(key)
+
+    if compiled is None:
+        secretbox_data = server_data.secretbox_data[secretbox_id]
+        rates = rate_modifier if rate_modifier is not None else secretbox_data.rarity_rates
+        compiled = CompiledSecretbox(
+            rarity_indices=range(len(secretbox_data.rarity_rates)),
+            cum_weights=list(itertools.accumulate(rates)),
+            rarity_pools=secretbox_data.rarity_pools,
+        )
+        _compiled_secretbox[key] = compiled
+
+    return compiled
+
+
 def roll_units(
     secretbox_id: int,
     amount: int,
@@ -167,21 +233,39 @@ def roll_units(
     guarantee_amount: int = 0,
     rate_modifier: list[int] | None = None,
 ):
-    secretbox_data = get_secretbox_data(secretbox_id)
-    # Calculate weighted probabilities
-    rates = rate_modifier if rate_modifier is not None else secretbox_data.rarity_rates
-    picked_rarity_index = util.SYSRAND.choices(range(len(secretbox_data.rarity_rates)), rates, k=amount)
-
-    if guarantee_rarity > 0 and guarantee_amount > 0:
-        rindex = guarantee_rarity - 1
-        indices = range(amount)
-        while sum(k >= rindex for k in picked_rarity_index) < guarantee_amount:
-            random_index = util.SYSRAND.choice(indices)
-            if picked_rarity_index[random_index] < rindex:
-                picked_rarity_index[random_index] = rindex
-
-    # Start rolling
-    return [util.SYSRAND.choice(secretbox_data.rarity_pools[i]) for i in picked_rarity_index]
+    compiled = compile_secretbox(secretbox_id, rate_modifier)
+    return compiled.roll_units(amount, guarantee_rarity=guarantee_rarity, guarantee_amount=guarantee_amount)
+
+
+def simulate_rolls(
+    secretbox_id: int,
+    amount: int,
+    rolls: int,
+    /,
+    *,
+    guarantee_rarity: int = 0,
+    guarantee_amount: int = 0,
+    rate_modifier: list[int] | None = None,
+    seed: int | None = None,
+):
+    """Simulate `rolls` scouting of `amount` units each for rate verification.
+
+    Returns amount of units rolled per rarity index and per unit ID. A seeded PRNG is used instead of system
+    randomness so millions of rolls finish quickly and the result is reproducible."""
+    compiled = compile_secretbox(secretbox_id, rate_modifier)
+    rng = random.Random(seed)
+    rarity_count = [0] * len(compiled.rarity_indices)
+    unit_count: collections.Counter[int] = collections.Counter()
+
+    for _ in range(rolls):
+        picked_rarity_index = compiled.roll_rarities(
+            amount, guarantee_rarity=guarantee_rarity, guarantee_amount=guarantee_amount, rng=rng
+        )
+        for i in picked_rarity_index:
+            rarity_count[i] = rarity_count[i] + 1
+            unit_count[rng.choice(compiled.rarity_pools[i])] += 1
+
+    return rarity_count, unit_count
 
 
 def get_secretbox_button(secretbox_data: int | data.schema.SecretboxData, button_index: int):
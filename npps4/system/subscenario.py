@@ -31,7 +31,7 @@ async def get_all(context: idol.BasicSchoolIdolContext, user: main.User):
     return list(result.scalars())
 
 
-@common.context_cacheable("subscenario_valid")
+@common.master_cacheable("subscenario_valid")
 async def valid(context: idol.BasicSchoolIdolContext, subscenario_id: int):
     subscenario_data = await context.db.subscenario.get(subscenario.SubScenario, subscenario_id)
     return subscenario_data is not None
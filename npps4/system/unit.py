@@ -1,7 +1,11 @@
+import array
+import bisect
+import collections
 import collections.abc
 import dataclasses
 import itertools
 import math
+import time
 
 import pydantic
 import sqlalchemy
@@ -17,6 +21,7 @@ from .. import db
 from .. import idol
 from .. import idoltype
 from .. import util
+from ..config import config
 from ..db import main
 from ..db import unit
 
@@ -144,6 +149,54 @@ async def add_unit_by_object(context: idol.BasicSchoolIdolContext, user: main.Us
     await context.db.main.flush()
 
 
+async def add_units_by_object(
+    context: idol.BasicSchoolIdolContext,
+    user: main.User,
+    units: collections.abc.Sequence[main.Unit],
+    /,
+    *,
+    flush: bool = True,
+):
+    """Batch variant of add_unit_by_object. The album is updated in single query."""
+    stats = [
+        await get_unit_stats_from_unit_data(context, UnitStatsCalculationID.from_unit_data(unit_data))
+        for unit_data in units
+    ]
+    await _add_units_with_stats(context, user, units, stats, flush=flush)
+
+
+async def _add_units_with_stats(
+    context: idol.BasicSchoolIdolContext,
+    user: main.User,
+    units: collections.abc.Sequence[main.Unit],
+    stats: collections.abc.Sequence[UnitStatsResult],
+    /,
+    *,
+    flush: bool,
+):
+    unit_infos = await get_unit_info_many(context, (u.unit_id for u in units))
+    album_flags: dict[int, tuple[bool, bool, bool]] = {}
+
+    for unit_data, unit_stats in zip(units, stats):
+        unit_info = unit_infos[unit_data.unit_id]
+        rarity = await get_unit_rarity(context, unit_info.rarity)
+        if rarity is None:
+            raise ValueError("unit rarity not found")
+
+        rank_max, love_max, rank_level_max = album_flags.get(unit_data.unit_id, (False, False, False))
+        album_flags[unit_data.unit_id] = (
+            rank_max or unit_data.rank >= unit_info.rank_max,
+            love_max or unit_data.love >= rarity.after_love_max,
+            rank_level_max or unit_stats.level >= rarity.after_level_max,
+        )
+
+    context.db.main.add_all(units)
+    await album.update_many(context, user, album_flags, flush=False)
+
+    if flush:
+        await context.db.main.flush()
+
+
 async def add_unit_simple(
     context: idol.BasicSchoolIdolContext,
     user: main.User,
@@ -243,7 +296,7 @@ async def get_unit_support_list_response(context: idol.BasicSchoolIdolContext, /
     return [unit_model.SupporterInfoResponse(unit_id=supp[0], amount=supp[1]) for supp in supp_units]
 
 
-@common.context_cacheable("unit")
+@common.master_cacheable("unit")
 async def get_unit_info(context: idol.BasicSchoolIdolContext, unit_id: int, /):
     unit_info = await db.get_decrypted_row(context.db.unit, unit.Unit, unit_id)
     if unit_info is None:
@@ -251,12 +304,33 @@ async def get_unit_info(context: idol.BasicSchoolIdolContext, unit_id: int, /):
     return unit_info
 
 
-@common.context_cacheable("unit_rarity")
+async def _get_unit_info_many(context: idol.BasicSchoolIdolContext, unit_ids: list[int], /):
+    q = sqlalchemy.select(unit.Unit).where(unit.Unit.unit_id.in_(unit_ids))
+    result = await context.db.unit.execute(q)
+    unit_infos: dict[int, unit.Unit] = {}
+
+    for unit_info in result.scalars():
+        decrypted_unit_info = db.decrypt_row(context.db.unit, unit_info)
+        if decrypted_unit_info is not None:
+            unit_infos[decrypted_unit_info.unit_id] = decrypted_unit_info
+
+    for unit_id in unit_ids:
+        if unit_id not in unit_infos:
+            raise ValueError(f"info on unit_id {unit_id} does not exist")
+
+    return unit_infos
+
+
+async def get_unit_info_many(context: idol.BasicSchoolIdolContext, unit_ids: collections.abc.Iterable[int], /):
+    return await common.get_master_cached_many(context, "unit", set(unit_ids), _get_unit_info_many)
+
+
+@common.master_cacheable("unit_rarity")
 def get_unit_rarity(context: idol.BasicSchoolIdolContext, rarity: int, /):
     return context.db.unit.get(unit.Rarity, rarity)
 
 
-@common.context_cacheable("unit_by_number")
+@common.master_cacheable("unit_by_number")
 async def get_unit_info_from_unit_number(context: idol.BasicSchoolIdolContext, unit_number: int, /):
     q = sqlalchemy.select(unit.Unit).where(unit.Unit.unit_number == unit_number)
     result = await context.db.unit.execute(q)
@@ -275,7 +349,7 @@ async def get_unit_info_from_unit_number(context: idol.BasicSchoolIdolContext, u
     return unit_info
 
 
-@common.context_cacheable("unit_level_up_pattern")
+@common.master_cacheable("unit_level_up_pattern")
 async def get_unit_level_up_pattern(context: idol.BasicSchoolIdolContext, unit_level_up_pattern_id: int, /):
     q = sqlalchemy.select(unit.UnitLevelUpPattern).where(
         unit.UnitLevelUpPattern.unit_level_up_pattern_id == unit_level_up_pattern_id
@@ -284,14 +358,14 @@ async def get_unit_level_up_pattern(context: idol.BasicSchoolIdolContext, unit_l
     return list(result.scalars())
 
 
-@common.context_cacheable("unit_level_limit_pattern")
+@common.master_cacheable("unit_level_limit_pattern")
 async def get_unit_level_limit_pattern(context: idol.BasicSchoolIdolContext, level_limit_id: int, /):
     q = sqlalchemy.select(unit.LevelLimitPattern).where(unit.LevelLimitPattern.unit_level_limit_id == level_limit_id)
     result = await context.db.unit.execute(q)
     return list(result.scalars())
 
 
-@common.context_cacheable("unit_skill")
+@common.master_cacheable("unit_skill")
 async def get_unit_skill(context: idol.BasicSchoolIdolContext, default_unit_skill_id: int | None, /):
     if default_unit_skill_id is None or default_unit_skill_id == 0:
         return None
@@ -299,7 +373,7 @@ async def get_unit_skill(context: idol.BasicSchoolIdolContext, default_unit_skil
     return await db.get_decrypted_row(context.db.unit, unit.UnitSkill, default_unit_skill_id)
 
 
-@common.context_cacheable("unit_skill_level_up_pattern")
+@common.master_cacheable("unit_skill_level_up_pattern")
 async def get_unit_skill_level_up_pattern(context: idol.BasicSchoolIdolContext, unit_skill: int, /):
     q = (
         sqlalchemy.select(unit.UnitSkillLevelUpPattern)
@@ -310,6 +384,98 @@ async def get_unit_skill_level_up_pattern(context: idol.BasicSchoolIdolContext,
     return list(result.scalars())
 
 
+@dataclasses.dataclass(frozen=True, kw_only=True)
+class LevelPatternTable:
+    """Columnar form of a unit level up (or level limit) pattern, ordered by level."""
+
+    unit_level: array.array[int]
+    next_exp: array.array[int]
+    # Running maximum of next_exp so the first level which next_exp exceeds the EXP can be bisected.
+    search_exp: array.array[int]
+    hp_diff: array.array[int]
+    smile_diff: array.array[int]
+    pure_diff: array.array[int]
+    cool_diff: array.array[int]
+    merge_exp: array.array[int]
+    merge_cost: array.array[int]
+    sale_price: array.array[int]
+
+    @staticmethod
+    def from_rows(rows: collections.abc.Iterable[unit.UnitLevelUpPattern | unit.LevelLimitPattern], /):
+        rows = sorted(rows, key=lambda r: r.unit_level)
+        search_exp = array.array("q", itertools.accumulate((r.next_exp for r in rows), max))
+        return LevelPatternTable(
+            unit_level=array.array("q", (r.unit_level for r in rows)),
+            next_exp=array.array("q", (r.next_exp for r in rows)),
+            search_exp=search_exp,
+            hp_diff=array.array("q", (r.hp_diff for r in rows)),
+            smile_diff=array.array("q", (r.smile_diff for r in rows)),
+            pure_diff=array.array("q", (r.pure_diff for r in rows)),
+            cool_diff=array.array("q", (r.cool_diff for r in rows)),
+            merge_exp=array.array("q", (r.merge_exp for r in rows)),
+            merge_cost=array.array("q", (r.merge_cost for r in rows)),
+            sale_price=array.array("q", (r.sale_price for r in rows)),
+        )
+
+    def find(self, exp: int, /):
+        """Index of the first level which next_exp exceeds the EXP, or the last level."""
+        return min(bisect.bisect_right(self.search_exp, exp), len(self.search_exp) - 1)
+
+
+@dataclasses.dataclass(frozen=True, kw_only=True)
+class SkillPatternTable:
+    """Columnar form of a unit skill level up pattern, ordered by skill level."""
+
+    skill_level: array.array[int]
+    next_exp: array.array[int]
+    search_exp: array.array[int]
+
+    @staticmethod
+    def from_rows(rows: collections.abc.Iterable[unit.UnitSkillLevelUpPattern], /):
+        rows = sorted(rows, key=lambda r: r.skill_level)
+        return SkillPatternTable(
+            skill_level=array.array("q", (r.skill_level for r in rows)),
+            next_exp=array.array("q", (r.next_exp for r in rows)),
+            search_exp=array.array("q", itertools.accumulate((r.next_exp for r in rows), max)),
+        )
+
+
+@common.master_cacheable("unit_level_up_table")
+async def get_unit_level_up_table(context: idol.BasicSchoolIdolContext, unit_level_up_pattern_id: int, /):
+    return LevelPatternTable.from_rows(await get_unit_level_up_pattern(context, unit_level_up_pattern_id))
+
+
+@common.master_cacheable("unit_level_limit_table")
+async def get_unit_level_limit_table(context: idol.BasicSchoolIdolContext, level_limit_id: int, /):
+    return LevelPatternTable.from_rows(await get_unit_level_limit_pattern(context, level_limit_id))
+
+
+@common.master_cacheable("unit_skill_level_up_table")
+async def get_unit_skill_level_up_table(context: idol.BasicSchoolIdolContext, unit_skill: int, /):
+    return SkillPatternTable.from_rows(await get_unit_skill_level_up_pattern(context, unit_skill))
+
+
+async def preload_pattern_tables(context: idol.BasicSchoolIdolContext, /):
+    """Load all unit level up, level limit, and skill level up patterns into the process-wide cache."""
+
+    q = sqlalchemy.select(unit.UnitLevelUpPattern).order_by(unit.UnitLevelUpPattern.unit_level_up_pattern_id)
+    result = await context.db.unit.execute(q)
+    for pattern_id, rows in itertools.groupby(result.scalars(), lambda r: r.unit_level_up_pattern_id):
+        common.set_master_cache("unit_level_up_table", pattern_id, LevelPatternTable.from_rows(rows))
+
+    q = sqlalchemy.select(unit.LevelLimitPattern).order_by(unit.LevelLimitPattern.unit_level_limit_id)
+    result = await context.db.unit.execute(q)
+    for pattern_id, rows in itertools.groupby(result.scalars(), lambda r: r.unit_level_limit_id):
+        common.set_master_cache("unit_level_limit_table", pattern_id, LevelPatternTable.from_rows(rows))
+
+    q = sqlalchemy.select(unit.UnitSkillLevelUpPattern).order_by(
+        unit.UnitSkillLevelUpPattern.unit_skill_level_up_pattern_id
+    )
+    result = await context.db.unit.execute(q)
+    for pattern_id, rows in itertools.groupby(result.scalars(), lambda r: r.unit_skill_level_up_pattern_id):
+        common.set_master_cache("unit_skill_level_up_table", pattern_id, SkillPatternTable.from_rows(rows))
+
+
 def detach_from_deck_2(unit_owning_user_id: int, deck: main.UnitDeck):
     has = False
     if deck.unit_owning_user_id_1 == unit_owning_user_id:
@@ -488,6 +654,7 @@ async def set_unit_center(context: idol.BasicSchoolIdolContext, user: main.User,
     validate_unit(user, unit_data)
     user.center_unit_owning_user_id = unit_data.id
     await context.db.main.flush()
+    _center_unit_cards.pop(user.id, None)
 
 
 async def get_unit_center(
@@ -638,6 +805,21 @@ def calculate_unit_stats(
     return result
 
 
+def calculate_unit_stats_from_table(unit_info: unit.Unit, table: LevelPatternTable, exp: int):
+    i = table.find(exp)
+    return UnitStatsResult(
+        level=table.unit_level[i],
+        smile=unit_info.smile_max - table.smile_diff[i],
+        pure=unit_info.pure_max - table.pure_diff[i],
+        cool=unit_info.cool_max - table.cool_diff[i],
+        hp=unit_info.hp_max - table.hp_diff[i],
+        next_exp=table.next_exp[i],
+        merge_exp=table.merge_exp[i],
+        merge_cost=table.merge_cost[i],
+        sale_price=table.sale_price[i],
+    )
+
+
 def get_exp_for_target_level(
     unit_info: unit.Unit, patterns: list[unit.UnitLevelUpPattern] | list[unit.LevelLimitPattern], level: int
 ):
@@ -665,49 +847,64 @@ def calculate_unit_skill_stats(
     return (last.skill_level, 0)
 
 
-@common.context_cacheable("unit_stats_calculated")
-async def get_unit_stats_from_unit_data(context: idol.BasicSchoolIdolContext, calckey: UnitStatsCalculationID):
-    unit_info = await get_unit_info(context, calckey.unit_id)
-    assert unit_info is not None
-    unit_rarity = await get_unit_rarity(context, unit_info.rarity)
-    assert unit_rarity is not None
+def calculate_unit_skill_stats_from_table(unit_skill: unit.UnitSkill | None, table: SkillPatternTable | None, exp: int):
+    if unit_skill is None or table is None:
+        return (1, 0)
+
+    i = bisect.bisect_right(table.search_exp, exp)
+    if i < len(table.search_exp):
+        return (table.skill_level[i], table.next_exp[i])
 
-    levelup_pattern = await get_unit_level_up_pattern(context, unit_info.unit_level_up_pattern_id)
-    stats = calculate_unit_stats(unit_info, levelup_pattern, calckey.exp)
+    return (table.skill_level[-1], 0)
+
+
+def _calculate_unit_stats_with_limit(
+    unit_info: unit.Unit,
+    unit_rarity: unit.Rarity,
+    levelup_table: LevelPatternTable,
+    level_limit_table: LevelPatternTable | None,
+    calckey: UnitStatsCalculationID,
+):
+    stats = calculate_unit_stats_from_table(unit_info, levelup_table, calckey.exp)
 
     if (
-        calckey.level_limit_id > 0
+        level_limit_table is not None
         and stats.level >= unit_rarity.after_level_max
         and calckey.max_level > unit_rarity.after_level_max
     ):
         # Use level_limit pattern
-        levelup_pattern = await get_unit_level_limit_pattern(context, calckey.level_limit_id)
-        stats = calculate_unit_stats(unit_info, levelup_pattern, calckey.exp)
+        stats = calculate_unit_stats_from_table(unit_info, level_limit_table, calckey.exp)
 
     return stats
 
 
-async def get_unit_data_full_info(context: idol.BasicSchoolIdolContext, unit_data: main.Unit):
-    unit_info = await get_unit_info(context, unit_data.unit_id)
-    if unit_info is None:
-        raise ValueError("unit_info is none")
-
-    # Calculate unit level
+@common.context_cacheable("unit_stats_calculated")
+async def get_unit_stats_from_unit_data(context: idol.BasicSchoolIdolContext, calckey: UnitStatsCalculationID):
+    unit_info = await get_unit_info(context, calckey.unit_id)
+    assert unit_info is not None
     unit_rarity = await get_unit_rarity(context, unit_info.rarity)
-    if unit_rarity is None:
-        raise RuntimeError("unit_rarity is none")
+    assert unit_rarity is not None
 
-    stats = await get_unit_stats_from_unit_data(context, UnitStatsCalculationID.from_unit_data(unit_data))
+    levelup_table = await get_unit_level_up_table(context, unit_info.unit_level_up_pattern_id)
+    level_limit_table = None
+    if calckey.level_limit_id > 0:
+        level_limit_table = await get_unit_level_limit_table(context, calckey.level_limit_id)
+
+    return _calculate_unit_stats_with_limit(unit_info, unit_rarity, levelup_table, level_limit_table, calckey)
 
+
+def _make_unit_info_data(
+    unit_data: main.Unit,
+    unit_info: unit.Unit,
+    unit_rarity: unit.Rarity,
+    stats: UnitStatsResult,
+    skill: unit.UnitSkill | None,
+    skill_table: SkillPatternTable | None,
+    signed_variant: bool,
+):
     # Calculate unit skill level
-    skill = await get_unit_skill(context, unit_info.default_unit_skill_id)
     if skill is not None:
-        skill_levels = await get_unit_skill_level_up_pattern(
-            context,
-            skill.unit_skill_level_up_pattern_id,
-        )
-
-        skill_stats = calculate_unit_skill_stats(skill, skill_levels, unit_data.skill_exp)
+        skill_stats = calculate_unit_skill_stats_from_table(skill, skill_table, unit_data.skill_exp)
         skill_max = skill_stats[0] == skill.max_level
         skill_level = skill_stats[0]
     else:
@@ -720,38 +917,198 @@ async def get_unit_data_full_info(context: idol.BasicSchoolIdolContext, unit_dat
     real_max_exp = 0 if stats.level == unit_rarity.before_level_max and not idolized else stats.next_exp
     removable_skill_max = unit_data.unit_removable_skill_capacity == unit_info.max_removable_skill_capacity
 
-    return (
-        unit_model.UnitInfoData(
-            unit_owning_user_id=unit_data.id or 0,
-            unit_id=unit_data.unit_id,
-            unit_rarity_id=unit_info.rarity,
-            exp=unit_data.exp,
-            next_exp=real_max_exp,
-            level=stats.level,
-            max_level=max_level,
-            level_limit_id=unit_data.level_limit_id,
-            rank=unit_data.rank,
-            max_rank=unit_info.rank_max,
-            love=unit_data.love,
-            max_love=max_love,
-            unit_skill_exp=unit_data.skill_exp,
-            unit_skill_level=skill_level,
-            max_hp=stats.hp,
-            unit_removable_skill_capacity=unit_data.unit_removable_skill_capacity,
-            favorite_flag=unit_data.favorite_flag,
-            display_rank=unit_data.display_rank,
-            is_rank_max=idolized,
-            is_love_max=unit_data.love >= unit_rarity.after_love_max,
-            is_level_max=stats.level >= unit_rarity.after_level_max,
-            is_signed=unit_data.is_signed and await has_signed_variant(context, unit_data.unit_id),
-            is_skill_level_max=skill_max,
-            is_removable_skill_capacity_max=removable_skill_max,
-            insert_date=util.timestamp_to_datetime(unit_data.insert_date),
-        ),
-        stats,
+    return unit_model.UnitInfoData(
+        unit_owning_user_id=unit_data.id or 0,
+        unit_id=unit_data.unit_id,
+        unit_rarity_id=unit_info.rarity,
+        exp=unit_data.exp,
+        next_exp=real_max_exp,
+        level=stats.level,
+        max_level=max_level,
+        level_limit_id=unit_data.level_limit_id,
+        rank=unit_data.rank,
+        max_rank=unit_info.rank_max,
+        love=unit_data.love,
+        max_love=max_love,
+        unit_skill_exp=unit_data.skill_exp,
+        unit_skill_level=skill_level,
+        max_hp=stats.hp,
+        unit_removable_skill_capacity=unit_data.unit_removable_skill_capacity,
+        favorite_flag=unit_data.favorite_flag,
+        display_rank=unit_data.display_rank,
+        is_rank_max=idolized,
+        is_love_max=unit_data.love >= unit_rarity.after_love_max,
+        is_level_max=stats.level >= unit_rarity.after_level_max,
+        is_signed=unit_data.is_signed and signed_variant,
+        is_skill_level_max=skill_max,
+        is_removable_skill_capacity_max=removable_skill_max,
+        insert_date=util.timestamp_to_datetime(unit_data.insert_date),
     )
 
 
+async def get_unit_data_full_info(context: idol.BasicSchoolIdolContext, unit_data: main.Unit):
+    unit_info = await get_unit_info(context, unit_data.unit_id)
+    if unit_info is None:
+        raise ValueError("unit_info is none")
+
+    # Calculate unit level
+    unit_rarity = await get_unit_rarity(context, unit_info.rarity)
+    if unit_rarity is None:
+        raise RuntimeError("unit_rarity is none")
+
+    stats = await get_unit_stats_from_unit_data(context, UnitStatsCalculationID.from_unit_data(unit_data))
+
+    skill = await get_unit_skill(context, unit_info.default_unit_skill_id)
+    skill_table = None
+    if skill is not None:
+        skill_table = await get_unit_skill_level_up_table(context, skill.unit_skill_level_up_pattern_id)
+
+    signed_variant = unit_data.is_signed and await has_signed_variant(context, unit_data.unit_id)
+    return _make_unit_info_data(unit_data, unit_info, unit_rarity, stats, skill, skill_table, signed_variant), stats
+
+
+async def get_unit_data_full_info_batch(
+    context: idol.BasicSchoolIdolContext, units: collections.abc.Iterable[main.Unit], /
+):
+    """Batch variant of get_unit_data_full_info.
+
+    Master data needed by all the units is resolved first, then every unit is computed in single pass. The result is
+    in same order as `units`."""
+
+    units = list(units)
+    unit_infos = await get_unit_info_many(context, (u.unit_id for u in units))
+    signed_variants = await has_signed_variant_many(context, (u.unit_id for u in units if u.is_signed))
+
+    unit_rarities: dict[int, unit.Rarity] = {}
+    levelup_tables: dict[int, LevelPatternTable] = {}
+    skills: dict[int, unit.UnitSkill | None] = {}
+    for unit_info in unit_infos.values():
+        if unit_info.rarity not in unit_rarities:
+            unit_rarity = await get_unit_rarity(context, unit_info.rarity)
+            if unit_rarity is None:
+                raise RuntimeError("unit_rarity is none")
+            unit_rarities[unit_info.rarity] = unit_rarity
+        if unit_info.unit_level_up_pattern_id not in levelup_tables:
+            levelup_tables[unit_info.unit_level_up_pattern_id] = await get_unit_level_up_table(
+                context, unit_info.unit_level_up_pattern_id
+            )
+        skill_id = unit_info.default_unit_skill_id or 0
+        if skill_id not in skills:
+            skills[skill_id] = await get_unit_skill(context, skill_id)
+
+    level_limit_tables: dict[int, LevelPatternTable] = {}
+    for level_limit_id in set(u.level_limit_id for u in units if u.level_limit_id > 0):
+        level_limit_tables[level_limit_id] = await get_unit_level_limit_table(context, level_limit_id)
+
+    skill_tables: dict[int, SkillPatternTable] = {}
+    for skill in skills.values():
+        if skill is not None and skill.unit_skill_level_up_pattern_id not in skill_tables:
+            skill_tables[skill.unit_skill_level_up_pattern_id] = await get_unit_skill_level_up_table(
+                context, skill.unit_skill_level_up_pattern_id
+            )
+
+    result: list[tuple[unit_model.UnitInfoData, UnitStatsResult]] = []
+    for unit_data in units:
+        unit_info = unit_infos[unit_data.unit_id]
+        unit_rarity = unit_rarities[unit_info.rarity]
+        stats = _calculate_unit_stats_with_limit(
+            unit_info,
+            unit_rarity,
+            levelup_tables[unit_info.unit_level_up_pattern_id],
+            level_limit_tables.get(unit_data.level_limit_id),
+            UnitStatsCalculationID.from_unit_data(unit_data),
+        )
+        skill = skills[unit_info.default_unit_skill_id or 0]
+        skill_table = None if skill is None else skill_tables[skill.unit_skill_level_up_pattern_id]
+        signed_variant = unit_data.is_signed and signed_variants[unit_data.unit_id]
+        result.append(
+            (_make_unit_info_data(unit_data, unit_info, unit_rarity, stats, skill, skill_table, signed_variant), stats)
+        )
+
+    return result
+
+
+@dataclasses.dataclass(slots=True)
+class CenterUnitCard:
+    """User and their center unit, as shown to other players. Contains no database objects so it can be shared."""
+
+    user_id: int
+    name: str
+    level: int
+    setting_award_id: int
+    unit_data: unit_model.UnitInfoData
+    attribute_id: int
+    stats: UnitStatsResult
+    removable_skill_ids: list[int]
+
+
+# user_id -> (expiry time, card), in expiry order.
+_center_unit_cards: collections.OrderedDict[int, tuple[float, CenterUnitCard]] = collections.OrderedDict()
+
+
+async def get_center_unit_cards(context: idol.BasicSchoolIdolContext, user_ids: collections.abc.Iterable[int], /):
+    """Get center unit card of multiple users using few queries. Users without valid center unit are left out."""
+    global _center_unit_cards
+
+    now = time.monotonic()
+    while _center_unit_cards and next(iter(_center_unit_cards.values()))[0] <= now:
+        _center_unit_cards.popitem(last=False)
+
+    cards: dict[int, CenterUnitCard] = {}
+    missing_user_ids: list[int] = []
+    for user_id in user_ids:
+        cached = _center_unit_cards.get(user_id)
+        if cached is None:
+            missing_user_ids.append(user_id)
+        else:
+            cards[user_id] = cached[1]
+
+    if not missing_user_ids:
+        return cards
+
+    q = sqlalchemy.select(main.User).where(main.User.id.in_(missing_user_ids))
+    result = await context.db.main.execute(q)
+    users = {u.id: u for u in result.scalars()}
+    center_unit_ids = [u.center_unit_owning_user_id for u in users.values() if u.center_unit_owning_user_id > 0]
+    if not center_unit_ids:
+        return cards
+
+    q = sqlalchemy.select(main.Unit).where(main.Unit.id.in_(center_unit_ids))
+    result = await context.db.main.execute(q)
+    units = [u for u in result.scalars() if u.user_id in users and users[u.user_id].center_unit_owning_user_id == u.id]
+
+    q = sqlalchemy.select(
+        main.UnitRemovableSkill.unit_owning_user_id, main.UnitRemovableSkill.unit_removable_skill_id
+    ).where(main.UnitRemovableSkill.unit_owning_user_id.in_(center_unit_ids))
+    result = await context.db.main.execute(q)
+    removable_skills: dict[int, list[int]] = {}
+    for unit_owning_user_id, unit_removable_skill_id in result.tuples():
+        removable_skills.setdefault(unit_owning_user_id, []).append(unit_removable_skill_id)
+
+    unit_infos = await get_unit_info_many(context, (u.unit_id for u in units))
+    unit_full_infos = await get_unit_data_full_info_batch(context, units)
+    ttl = config.get_center_unit_cache_ttl()
+
+    for unit_data, (unit_full_data, stats) in zip(units, unit_full_infos):
+        target_user = users[unit_data.user_id]
+        card = CenterUnitCard(
+            user_id=target_user.id,
+            name=target_user.name,
+            level=target_user.level,
+            setting_award_id=target_user.active_award,
+            unit_data=unit_full_data,
+            attribute_id=unit_infos[unit_data.unit_id].attribute_id,
+            stats=stats,
+            removable_skill_ids=removable_skills.get(unit_data.id, []),
+        )
+        cards[target_user.id] = card
+
+        if ttl > 0:
+            _center_unit_cards[target_user.id] = (now + ttl, card)
+
+    return cards
+
+
 def calculate_bonus_stat_of_removable_skill(removable_skill: unit.RemovableSkill, stats: tuple[int, int, int]):
     result: list[int] = [0, 0, 0]
 
@@ -766,7 +1123,7 @@ def calculate_bonus_stat_of_removable_skill(removable_skill: unit.RemovableSkill
     return result[0], result[1], result[2]
 
 
-@common.context_cacheable("unit_type_member_tag")
+@common.master_cacheable("unit_type_member_tag")
 async def _unit_type_has_tag_impl(context: idol.BasicSchoolIdolContext, unit_type_member_tag_ids: tuple[int, int], /):
     q = sqlalchemy.select(unit.UnitTypeMemberTag).where(
         unit.UnitTypeMemberTag.unit_type_id == unit_type_member_tag_ids[0],
@@ -780,12 +1137,12 @@ async def unit_type_has_tag(context: idol.BasicSchoolIdolContext, unit_type_id:
     return await _unit_type_has_tag_impl(context, (unit_type_id, member_tag_id))
 
 
-@common.context_cacheable("unit_leader_skill")
+@common.master_cacheable("unit_leader_skill")
 def get_leader_skill(context: idol.BasicSchoolIdolContext, leader_skill: int, /):
     return db.get_decrypted_row(context.db.unit, unit.LeaderSkill, leader_skill)
 
 
-@common.context_cacheable("unit_extra_leader_skill")
+@common.master_cacheable("unit_extra_leader_skill")
 def get_extra_leader_skill(context: idol.BasicSchoolIdolContext, leader_skill: int, /):
     return context.db.unit.get(unit.ExtraLeaderSkill, leader_skill)
 
@@ -799,7 +1156,7 @@ async def get_removable_skill_info(context: idol.BasicSchoolIdolContext, user: m
     return result.scalar()
 
 
-@common.context_cacheable("unit_removable_skill")
+@common.master_cacheable("unit_removable_skill")
 async def get_removable_skill_game_info(context: idol.BasicSchoolIdolContext, removable_skill_id: int, /):
     return await db.get_decrypted_row(context.db.unit, unit.RemovableSkill, removable_skill_id)
 
@@ -934,7 +1291,7 @@ async def unit_to_item[_T: unit_model.UnitSupportItem](
     )
 
 
-@common.context_cacheable("unit_support_member")
+@common.master_cacheable("unit_support_member")
 async def is_support_member(context: idol.BasicSchoolIdolContext, unit_id: int, /):
     unit_info = await context.db.unit.get(unit.Unit, unit_id)
     if unit_info is None:
@@ -961,38 +1318,94 @@ class QuickAddResult:
 async def quick_create_by_unit_add(
     context: idol.BasicSchoolIdolContext, user: main.User, unit_id: int, *, level: int = 1
 ):
-    new_unit_flag = not await album.has_ever_got_unit(context, user, unit_id)
-    if await is_support_member(context, unit_id):
-        unit_info = await get_unit_info(context, unit_id)
-        assert unit_info is not None
-        return QuickAddResult(
-            unit_id,
-            unit_model.UnitSupportItem(
-                item_id=unit_id,
-                is_support_member=True,
-                new_unit_flag=new_unit_flag,
-                unit_rarity_id=unit_info.rarity,
-                attribute=unit_info.attribute_id,
-            ),
-        )
-    else:
-        unit_data = await create_unit(context, user, unit_id, True, level=level)
-        assert unit_data is not None
-        unit_info = await get_unit_info(context, unit_id)
-        assert unit_info is not None
-        unit_full_info = await get_unit_data_full_info(context, unit_data)
-        return QuickAddResult(
-            unit_id=unit_id,
-            as_item_reward=unit_model.UnitItem(
-                item_id=unit_id,
-                new_unit_flag=new_unit_flag,
-                attribute=unit_info.attribute_id,
-                **util.shallow_dump(unit_full_info[0]),
-            ),
-            unit_data=unit_data,
-            full_info=unit_full_info[0],
-            stats=unit_full_info[1],
-        )
+    return (await quick_create_many(context, user, [unit_id], level=level))[0]
+
+
+async def quick_create_many(
+    context: idol.BasicSchoolIdolContext,
+    user: main.User,
+    unit_ids: collections.abc.Sequence[int],
+    /,
+    *,
+    level: int = 1,
+):
+    """Batch variant of quick_create_by_unit_add. The result is in same order as `unit_ids`.
+
+    Only the first of duplicated unit IDs that the user never got is flagged as new unit."""
+    unit_infos = await get_unit_info_many(context, unit_ids)
+    owned_unit_ids = await album.get_owned_unit_ids(context, user, unit_ids)
+
+    new_unit_flags: list[bool] = []
+    units: dict[int, main.Unit] = {}
+    for i, unit_id in enumerate(unit_ids):
+        new_unit_flags.append(unit_id not in owned_unit_ids)
+        owned_unit_ids.add(unit_id)
+
+        if unit_infos[unit_id].disable_rank_up == 0:
+            unit_data = await create_unit(context, user, unit_id, True, level=level)
+            assert unit_data is not None
+            units[i] = unit_data
+
+    full_infos = dict(zip(units.keys(), await get_unit_data_full_info_batch(context, units.values())))
+    result: list[QuickAddResult] = []
+
+    for i, unit_id in enumerate(unit_ids):
+        unit_info = unit_infos[unit_id]
+        unit_data = units.get(i)
+
+        if unit_data is None:
+            quick_add_result = QuickAddResult(
+                unit_id,
+                unit_model.UnitSupportItem(
+                    item_id=unit_id,
+                    is_support_member=True,
+                    new_unit_flag=new_unit_flags[i],
+                    unit_rarity_id=unit_info.rarity,
+                    attribute=unit_info.attribute_id,
+                ),
+            )
+        else:
+            full_info, stats = full_infos[i]
+            quick_add_result = QuickAddResult(
+                unit_id=unit_id,
+                as_item_reward=unit_model.UnitItem(
+                    item_id=unit_id,
+                    new_unit_flag=new_unit_flags[i],
+                    attribute=unit_info.attribute_id,
+                    **util.shallow_dump(full_info),
+                ),
+                unit_data=unit_data,
+                full_info=full_info,
+                stats=stats,
+            )
+
+        result.append(quick_add_result)
+
+    return result
+
+
+async def add_units(
+    context: idol.BasicSchoolIdolContext,
+    user: main.User,
+    unit_items: collections.abc.Sequence[QuickAddResult],
+    /,
+):
+    """Add regular units created by `quick_create_many` to the user's member list with single flush.
+
+    Returns their unit items, with `unit_owning_user_id` assigned."""
+    units: list[main.Unit] = []
+    stats: list[UnitStatsResult] = []
+    for quick_add_result in unit_items:
+        if quick_add_result.unit_data is None or quick_add_result.stats is None:
+            raise ValueError(f"unit_id {quick_add_result.unit_id} is not a regular unit")
+        units.append(quick_add_result.unit_data)
+        stats.append(quick_add_result.stats)
+
+    await _add_units_with_stats(context, user, units, stats, flush=True)
+
+    for quick_add_result in unit_items:
+        quick_add_result.update_unit_owning_user_id()
+    return [quick_add_result.as_item_reward for quick_add_result in unit_items]
 
 
 async def process_quick_add(
@@ -1027,11 +1440,54 @@ async def process_quick_add(
     return current_unit_count
 
 
-@common.context_cacheable("has_signed_variant")
+async def process_quick_add_many(
+    context: idol.BasicSchoolIdolContext,
+    /,
+    user: main.User,
+    quick_add_results: collections.abc.Iterable[QuickAddResult],
+    *,
+    current_unit_count: int,
+    reason_jp: str = "Reward",
+    reason_en: str = "Reward",
+    expire: int = 0,
+):
+    """Batch variant of process_quick_add. Units that fit the member list are added with single flush."""
+    add_directly: list[QuickAddResult] = []
+
+    for quick_add_result in quick_add_results:
+        if quick_add_result.unit_data:
+            if current_unit_count >= user.unit_max:
+                # Move to present box
+                quick_add_result.as_item_reward.reward_box_flag = True
+                await reward.add_item(context, user, quick_add_result.as_item_reward, reason_jp, reason_en, expire)
+            else:
+                add_directly.append(quick_add_result)
+                current_unit_count = current_unit_count + 1
+        else:
+            await add_supporter_unit(context, user, quick_add_result.unit_id)
+
+    if add_directly:
+        await add_units(context, user, add_directly)
+
+    return current_unit_count
+
+
+@common.master_cacheable("has_signed_variant")
 async def has_signed_variant(context: idol.BasicSchoolIdolContext, unit_id: int):
     return await context.db.unit.get(unit.SignAsset, unit_id) is not None
 
 
+async def _has_signed_variant_many(context: idol.BasicSchoolIdolContext, unit_ids: list[int], /):
+    q = sqlalchemy.select(unit.SignAsset.unit_id).where(unit.SignAsset.unit_id.in_(unit_ids))
+    result = await context.db.unit.execute(q)
+    signed = set(result.scalars())
+    return {unit_id: unit_id in signed for unit_id in unit_ids}
+
+
+async def has_signed_variant_many(context: idol.BasicSchoolIdolContext, unit_ids: collections.abc.Iterable[int], /):
+    return await common.get_master_cached_many(context, "has_signed_variant", set(unit_ids), _has_signed_variant_many)
+
+
 async def is_unit_max(context: idol.BasicSchoolIdolContext, user: main.User):
     unit_count = await count_units(context, user, True)
     return unit_count >= user.unit_max
@@ -1087,11 +1543,11 @@ async def get_max_exp(
     target_level = min(unit_data.max_level, 500) if use_user_rank else normal_target_level
 
     if use_user_rank:
-        levelup_pattern = await get_unit_level_limit_pattern(context, unit_data.level_limit_id)
-        return levelup_pattern[target_level - 100].next_exp
+        levelup_table = await get_unit_level_limit_table(context, unit_data.level_limit_id)
+        return levelup_table.next_exp[target_level - 100]
     else:
-        levelup_pattern = await get_unit_level_up_pattern(context, unit_info.unit_level_up_pattern_id)
-        return levelup_pattern[target_level - 2].next_exp
+        levelup_table = await get_unit_level_up_table(context, unit_info.unit_level_up_pattern_id)
+        return levelup_table.next_exp[target_level - 2]
 
 
 async def get_unit_skill_level_data(context: idol.BasicSchoolIdolContext, /, unit_skill_id: int, level: int):
@@ -1105,9 +1561,9 @@ async def get_unit_skill_level_data(context: idol.BasicSchoolIdolContext, /, uni
 async def get_max_skill_exp(context: idol.BasicSchoolIdolContext, /, unit_info: unit.Unit):
     skill = await get_unit_skill(context, unit_info.default_unit_skill_id)
     if skill is not None:
-        skill_levels = await get_unit_skill_level_up_pattern(context, skill.unit_skill_level_up_pattern_id)
-        if len(skill_levels) > 1:
-            return skill_levels[-2].next_exp
+        skill_table = await get_unit_skill_level_up_table(context, skill.unit_skill_level_up_pattern_id)
+        if len(skill_table.next_exp) > 1:
+            return skill_table.next_exp[-2]
 
     return 0
 
@@ -1168,12 +1624,8 @@ async def create_unit_item(
     # Calculate unit skill level
     skill = await get_unit_skill(context, unit_info.default_unit_skill_id)
     if skill is not None:
-        skill_levels = await get_unit_skill_level_up_pattern(
-            context,
-            skill.unit_skill_level_up_pattern_id,
-        )
-
-        skill_stats = calculate_unit_skill_stats(skill, skill_levels, extra_data.skill_exp)
+        skill_table = await get_unit_skill_level_up_table(context, skill.unit_skill_level_up_pattern_id)
+        skill_stats = calculate_unit_skill_stats_from_table(skill, skill_table, extra_data.skill_exp)
         skill_max = skill_stats[0] == skill.max_level
         skill_level = skill_stats[0]
     else:
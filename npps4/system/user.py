@@ -75,8 +75,6 @@ async def get_current(context: idol.SchoolIdolUserParams):
     if result is None:
         raise ValueError("logic error, user is None")
 
-    context.add_task(session.try_cleanup_tokens)
-
     if result.locked:
         raise idol.error.locked()
 
@@ -312,10 +310,12 @@ async def delete_user(context: idol.BasicSchoolIdolContext, user_id: int):
     await _clean_table(context, main.Award, user_id)
     await _clean_table(context, main.Background, user_id)
     await _clean_table(context, main.RequestCache, user_id)
+    await _clean_table(context, main.UserCounter, user_id)
 
     # Delete session
     q = sqlalchemy.delete(main.Session).where(main.Session.user_id == user_id)
     await context.db.main.execute(q)
+    session.forget_user_sessions(user_id)
 
     # Perform failsafe on party_user_id
     q = (
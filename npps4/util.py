@@ -37,12 +37,25 @@ def sif_version_string(version: tuple[int, int]):
     return "%d.%d" % version
 
 
-def sign_message(content: bytes, request_xmc_hex: str | None):
+def message_digest(content: bytes, request_xmc_hex: str | None):
     sha1 = Cryptodome.Hash.SHA1.new(content)
     if request_xmc_hex is not None:
         sha1.update(request_xmc_hex.encode("UTF-8"))
-    sign = Cryptodome.Signature.pkcs1_15.new(config.get_server_rsa())
-    return str(base64.b64encode(sign.sign(sha1)), "UTF-8")
+    return sha1
+
+
+_signer: Cryptodome.Signature.pkcs1_15.PKCS115_SigScheme | None = None
+
+
+def sign_digest(sha1: Cryptodome.Hash.SHA1.SHA1Hash):
+    global _signer
+    if _signer is None:
+        _signer = Cryptodome.Signature.pkcs1_15.new(config.get_server_rsa())
+    return str(base64.b64encode(_signer.sign(sha1)), "UTF-8")
+
+
+def sign_message(content: bytes, request_xmc_hex: str | None):
+    return sign_digest(message_digest(content, request_xmc_hex))
 
 
 def decrypt_rsa(data: bytes):
@@ -132,7 +145,7 @@ class _MeasureClass:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        t = ((self.t - timelib.perf_counter_ns()) // 1000) / 1000000
+        t = ((timelib.perf_counter_ns() - self.t) // 1000) / 1000000
 
         if exc_type is None:
             log(f"Measuring performance of '{self.name}' took {t} seconds.", severity=self.severity)
@@ -1,3 +1,4 @@
 from . import index
 from . import list_users
+from . import metrics
 from . import unlock_backgrounds
@@ -0,0 +1,49 @@
+import fastapi
+
+from .. import template
+from ... import metrics
+from ...app import webui
+
+
+@webui.app.get("/metrics.html")
+async def metrics_page(request: fastapi.Request):
+    families = {family.name: family for family in metrics.load_snapshots()}
+    durations = families[metrics.ENDPOINT_DURATION.name].values
+    sql_statements = families[metrics.ENDPOINT_SQL_STATEMENTS.name].values
+
+    endpoints = []
+    for name, histogram in durations.items():
+        assert isinstance(histogram, metrics.Histogram)
+        if histogram.count > 0:
+            endpoints.append(
+                {
+                    "name": name,
+                    "count": histogram.count,
+                    "total": histogram.sum,
+                    "average": histogram.sum * 1000 / histogram.count,
+                    "p50": histogram.quantile(0.5) * 1000,
+                    "p95": histogram.quantile(0.95) * 1000,
+                    "p99": histogram.quantile(0.99) * 1000,
+                    "sql": sql_statements.get(name, 0) / histogram.count,
+                }
+            )
+    endpoints.sort(key=lambda e: e["total"], reverse=True)
+
+    timings = []
+    for family in (metrics.SERIALIZATION_DURATION, metrics.SIGNING_DURATION):
+        histogram = families[family.name].values.get("")
+        if isinstance(histogram, metrics.Histogram) and histogram.count > 0:
+            timings.append(
+                {"name": family.help, "count": histogram.count, "average": histogram.sum * 1000 / histogram.count}
+            )
+
+    return template.template.TemplateResponse(
+        request,
+        "metrics.html",
+        {
+            "endpoints": endpoints,
+            "timings": timings,
+            "databases": sorted(families[metrics.SQL_STATEMENTS.name].values.items()),
+            "signing_cache_hits": families[metrics.SIGNING_CACHE_HITS.name].values.get("", 0),
+        },
+    )
@@ -0,0 +1,60 @@
+import argparse
+import json
+import time
+
+import npps4.game.unit
+import npps4.idol
+import npps4.idol.serializer
+import npps4.release_key
+import npps4.scriptutils.user
+import npps4.system.unit
+
+
+def encode_stdlib(response: npps4.game.unit.UnitAllInfoResponse):
+    response_data = {
+        "response_data": response.model_dump(),
+        "release_info": npps4.release_key.formatted(),
+        "status_code": 200,
+    }
+    return json.dumps(response_data).encode("UTF-8")
+
+
+def encode_serializer(response: npps4.game.unit.UnitAllInfoResponse):
+    return npps4.idol.serializer.encode_envelope(npps4.idol.serializer.encode_model(response), 200)
+
+
+def bench(name: str, func, response: npps4.game.unit.UnitAllInfoResponse, iterations: int):
+    size = len(func(response))
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(response)
+    duration = time.perf_counter() - start
+    print(f"{name}: {duration * 1000 / iterations:.3f}ms/call, {size} bytes")
+
+
+async def run_script(arg: list[str]):
+    parser = argparse.ArgumentParser(__file__, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    group = parser.add_mutually_exclusive_group(required=True)
+    npps4.scriptutils.user.register_args(group)
+    parser.add_argument("-n", "--iterations", type=int, default=100, help="Amount of encoding per backend.")
+    args = parser.parse_args(arg)
+
+    async with npps4.idol.BasicSchoolIdolContext(lang=npps4.idol.Language.en) as context:
+        target_user = await npps4.scriptutils.user.from_args(context, args)
+        all_units = list(await npps4.system.unit.get_all_units(context, target_user))
+        all_units_full_info = await npps4.system.unit.get_unit_data_full_info_batch(context, all_units)
+
+    unit_result: dict[bool, list] = {False: [], True: []}
+    for unit_data, (unit_serialized_data, _) in zip(all_units, all_units_full_info):
+        unit_result[unit_data.active].append(unit_serialized_data)
+
+    response = npps4.game.unit.UnitAllInfoResponse(active=unit_result[True], waiting=unit_result[False])
+    print(f"unit/unitAll payload of {len(all_units)} units")
+    bench("model_dump + json.dumps", encode_stdlib, response, args.iterations)
+    bench("serializer", encode_serializer, response, args.iterations)
+
+
+if __name__ == "__main__":
+    import npps4.scriptutils.boot
+
+    npps4.scriptutils.boot.start(run_script)
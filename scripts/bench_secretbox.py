@@ -0,0 +1,86 @@
+import argparse
+import random
+import time
+
+import npps4.data
+import npps4.system.secretbox
+
+
+def roll_legacy(
+    secretbox_data: npps4.data.schema.SecretboxData,
+    button: npps4.data.schema.SecretboxButton,
+    rng: random.Random,
+):
+    rates = button.rate_modifier if button.rate_modifier is not None else secretbox_data.rarity_rates
+    picked_rarity_index = rng.choices(range(len(secretbox_data.rarity_rates)), rates, k=button.unit_count)
+
+    if button.guaranteed_rarity > 0 and button.guarantee_specific_rarity_amount > 0:
+        rindex = button.guaranteed_rarity - 1
+        indices = range(button.unit_count)
+        while sum(k >= rindex for k in picked_rarity_index) < button.guarantee_specific_rarity_amount:
+            random_index = rng.choice(indices)
+            if picked_rarity_index[random_index] < rindex:
+                picked_rarity_index[random_index] = rindex
+
+    return [rng.choice(secretbox_data.rarity_pools[i]) for i in picked_rarity_index]
+
+
+def find_secretbox(secretbox: str):
+    server_data = npps4.data.get()
+    for secretbox_id, secretbox_data in server_data.secretbox_data.items():
+        if secretbox_data.id_string == secretbox or str(secretbox_id) == secretbox:
+            return secretbox_id, secretbox_data
+    raise SystemExit(f"Secretbox '{secretbox}' not found")
+
+
+async def run_script(arg: list[str]):
+    parser = argparse.ArgumentParser(__file__, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("secretbox", help="Secretbox ID string or ID number.")
+    parser.add_argument("-b", "--button", type=int, default=1, help="Secretbox button index (1-based).")
+    parser.add_argument("-n", "--rolls", type=int, default=1000000, help="Amount of scouting to simulate.")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="PRNG seed.")
+    args = parser.parse_args(arg)
+
+    secretbox_id, secretbox_data = find_secretbox(args.secretbox)
+    button = npps4.system.secretbox.get_secretbox_button(secretbox_data, args.button)
+    print(f"Simulating {args.rolls} scouting of {button.unit_count} units in '{secretbox_data.id_string}'")
+
+    rng = random.Random(args.seed)
+    iterations = min(args.rolls, 100000)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        roll_legacy(secretbox_data, button, rng)
+    duration = time.perf_counter() - start
+    print(f"legacy: {duration * 1000000 / iterations:.3f}us/roll")
+
+    start = time.perf_counter()
+    rarity_count, unit_count = npps4.system.secretbox.simulate_rolls(
+        secretbox_id,
+        button.unit_count,
+        args.rolls,
+        guarantee_rarity=button.guaranteed_rarity,
+        guarantee_amount=button.guarantee_specific_rarity_amount,
+        rate_modifier=button.rate_modifier,
+        seed=args.seed,
+    )
+    duration = time.perf_counter() - start
+    print(f"compiled: {duration * 1000000 / args.rolls:.3f}us/roll")
+
+    # Expected rate excludes the guarantee, so guaranteed rarity and above will be higher than listed.
+    rates = button.rate_modifier if button.rate_modifier is not None else secretbox_data.rarity_rates
+    total_rate = sum(rates)
+    total_units = sum(rarity_count)
+    print("Rarity       Expected   Observed   Units")
+    for name, rate, count, pool in zip(secretbox_data.rarity_names, rates, rarity_count, secretbox_data.rarity_pools):
+        print(f"{name:<12} {rate * 100 / total_rate:>7.3f}%  {count * 100 / total_units:>7.3f}%  {len(pool)}")
+
+    if unit_count:
+        least, least_count = min(unit_count.items(), key=lambda k: k[1])
+        most, most_count = max(unit_count.items(), key=lambda k: k[1])
+        print(f"Least rolled unit: {least} ({least_count}x), most rolled unit: {most} ({most_count}x)")
+
+
+if __name__ == "__main__":
+    import npps4.scriptutils.boot
+
+    npps4.scriptutils.boot.start(run_script)
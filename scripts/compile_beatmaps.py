@@ -0,0 +1,38 @@
+import argparse
+import os
+
+import npps4.beatmap
+import npps4.config.config
+
+
+async def run_script(arg: list[str]):
+    default_directory = os.path.join(npps4.config.config.ROOT_DIR, "beatmaps")
+    parser = argparse.ArgumentParser(__file__, formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("-d", "--directory", default=default_directory, help="Beatmap directory.")
+    parser.add_argument(
+        "-o", "--output", default=os.path.join(default_directory, "beatmaps.pack"), help="Packed beatmaps output."
+    )
+    args = parser.parse_args(arg)
+
+    beatmaps = []
+
+    for name in sorted(os.listdir(args.directory)):
+        if not name.endswith(".json"):
+            continue
+
+        path = os.path.join(args.directory, name)
+        notes = npps4.beatmap.load_json(path)
+        if notes is None:
+            print("Skipping invalid beatmap", name)
+            continue
+
+        beatmaps.append((name, os.stat(path).st_mtime_ns, notes))
+
+    npps4.beatmap.write_pack(args.output, beatmaps)
+    print(f"Packed {len(beatmaps)} beatmaps to {args.output}")
+
+
+if __name__ == "__main__":
+    import npps4.scriptutils.boot
+
+    npps4.scriptutils.boot.start(run_script)